@@ -71,8 +71,14 @@ def line_intersection(p1, p2, p3, p4):
     return [x, y]
 
 import math
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import repeat
+from operator import add, mul, sub
 
 class Point:
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x, y, z=0):
         self.x = x
         self.y = y
@@ -91,6 +97,8 @@ class Point:
         return f"Point({self.x}, {self.y}, {self.z})"
 
 class Vector:
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x, y, z=0):
         self.x = x
         self.y = y
@@ -120,6 +128,8 @@ class Vector:
         return f"Vector({self.x}, {self.y}, {self.z})"
 
 class Line:
+    __slots__ = ('p1', 'p2', 'direction')
+
     def __init__(self, p1, p2):
         self.p1 = p1
         self.p2 = p2
@@ -148,6 +158,8 @@ class Line:
         return f"Line({self.p1}, {self.p2})"
 
 class Polygon:
+    __slots__ = ('points',)
+
     def __init__(self, points):
         self.points = points
 
@@ -156,26 +168,8 @@ class Polygon:
         return 0.5 * abs(sum(self.points[i].x * self.points[(i + 1) % n].y - self.points[(i + 1) % n].x * self.points[i].y for i in range(n)))
 
     def convex_hull(self):
-        points = sorted(self.points, key=lambda p: (p.x, p.y))
-        if len(points) <= 1:
-            return points
-
-        def cross(o, a, b):
-            return (a.x - o.x)*(b.y - o.y) - (a.y - o.y)*(b.x - o.x)
-
-        lower = []
-        for p in points:
-            while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
-                lower.pop()
-            lower.append(p)
-
-        upper = []
-        for p in reversed(points):
-            while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
-                upper.pop()
-            upper.append(p)
-
-        return lower[:-1] + upper[:-1]
+        from hull import convex_hull
+        return [self.points[i] for i in convex_hull(self.points)]
 
     def contains_point(self, point):
         # Ray casting algorithm for point in polygon
@@ -192,10 +186,15 @@ class Polygon:
                 inside = not inside
         return inside
 
+    def prepare(self):
+        return PreparedPolygon(self)
+
     def __repr__(self):
         return f"Polygon({self.points})"
 
 class Circle:
+    __slots__ = ('center', 'radius')
+
     def __init__(self, center, radius):
         self.center = center
         self.radius = radius
@@ -234,20 +233,54 @@ class Circle:
             intersections.append(Point(line.p1.x + t2 * dx, line.p1.y + t2 * dy))
         return intersections
 
+    def intersect_lines(self, lines):
+        # intersect_line for many lines at once (same results, one list per
+        # line), in a single pass with the circle's terms hoisted out of the
+        # loop; lines whose discriminant is negative cost one comparison.
+        cx, cy, r2 = self.center.x, self.center.y, self.radius**2
+        results = []
+        for line in lines:
+            p1, p2 = line.p1, line.p2
+            x, y = p1.x, p1.y
+            dx, dy = p2.x - x, p2.y - y
+            fx, fy = x - cx, y - cy
+            a = dx**2 + dy**2
+            b = 2 * (fx * dx + fy * dy)
+            discriminant = b**2 - 4 * a * (fx**2 + fy**2 - r2)
+            if discriminant < 0:
+                results.append([])
+                continue
+            discriminant = math.sqrt(discriminant)
+            t1 = (-b - discriminant) / (2 * a)
+            t2 = (-b + discriminant) / (2 * a)
+            hits = []
+            if 0 <= t1 <= 1:
+                hits.append(Point(x + t1 * dx, y + t1 * dy))
+            if 0 <= t2 <= 1:
+                hits.append(Point(x + t2 * dx, y + t2 * dy))
+            results.append(hits)
+        return results
+
     def __repr__(self):
         return f"Circle({self.center}, {self.radius})"
 
 class Rectangle:
+    __slots__ = ('p1', 'p2', 'width', 'height')
+
     def __init__(self, p1, p2):
         self.p1 = p1
         self.p2 = p2
         self.width = abs(p2.x - p1.x)
         self.height = abs(p2.y - p1.y)
-        self.points = [
-            p1,
-            Point(p2.x, p1.y),
-            p2,
-            Point(p1.x, p2.y)
+
+    @property
+    def points(self):
+        # Built on demand rather than stored: most rectangles never need their corners.
+        return [
+            self.p1,
+            Point(self.p2.x, self.p1.y),
+            self.p2,
+            Point(self.p1.x, self.p2.y)
         ]
 
     def area(self):
@@ -264,6 +297,8 @@ class Rectangle:
         return f"Rectangle({self.p1}, {self.p2})"
 
 class Triangle:
+    __slots__ = ('p1', 'p2', 'p3')
+
     def __init__(self, p1, p2, p3):
         self.p1 = p1
         self.p2 = p2
@@ -325,3 +360,197 @@ class Transformation:
             2 * dot_prod * axis_vector.y - point.y,
             2 * dot_prod * axis_vector.z - point.z
         )
+
+class PointRef(Point):
+    # A Point backed by one entry of a PointArray: reads and writes go
+    # straight to the array, so handing these out costs no copying.
+    __slots__ = ('_points', '_index')
+
+    def __init__(self, points, index):
+        self._points = points
+        self._index = index
+
+    @property
+    def x(self):
+        return self._points.x[self._index]
+
+    @x.setter
+    def x(self, value):
+        self._points.x[self._index] = value
+
+    @property
+    def y(self):
+        return self._points.y[self._index]
+
+    @y.setter
+    def y(self, value):
+        self._points.y[self._index] = value
+
+    @property
+    def z(self):
+        return self._points.z[self._index]
+
+    @z.setter
+    def z(self, value):
+        self._points.z[self._index] = value
+
+class PointArray:
+    # Many points stored as three contiguous arrays of doubles (x, y, z)
+    # instead of one object each. The methods mirror Point and
+    # Transformation.scale_point but run over every point at once; other
+    # can be a single Point or a PointArray of the same length.
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, points=()):
+        self.x = array('d')
+        self.y = array('d')
+        self.z = array('d')
+        self.extend(points)
+
+    @staticmethod
+    def from_coordinates(xs, ys, zs=None):
+        if len(xs) != len(ys) or (zs is not None and len(zs) != len(xs)):
+            raise ValueError("Coordinate arrays must have the same length.")
+        points = PointArray()
+        points.x = array('d', xs)
+        points.y = array('d', ys)
+        points.z = array('d', zs) if zs is not None else array('d', bytes(8 * len(xs)))
+        return points
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray.from_coordinates(self.x[index], self.y[index], self.z[index])
+        if index < 0:
+            index += len(self.x)
+        if not 0 <= index < len(self.x):
+            raise IndexError("PointArray index out of range.")
+        return PointRef(self, index)
+
+    def __iter__(self):
+        return (PointRef(self, i) for i in range(len(self.x)))
+
+    def append(self, point):
+        self.x.append(point.x)
+        self.y.append(point.y)
+        self.z.append(point.z)
+
+    def extend(self, points):
+        for point in points:
+            self.append(point)
+
+    def to_points(self):
+        return [Point(x, y, z) for x, y, z in zip(self.x, self.y, self.z)]
+
+    def _columns(self, other):
+        if isinstance(other, PointArray):
+            if len(other) != len(self):
+                raise ValueError("PointArrays must have the same length.")
+            return other.x, other.y, other.z
+        return repeat(other.x), repeat(other.y), repeat(other.z)
+
+    def distance_to(self, other):
+        ox, oy, oz = self._columns(other)
+        return array('d', map(math.hypot, map(sub, self.x, ox), map(sub, self.y, oy), map(sub, self.z, oz)))
+
+    def translate(self, vector):
+        vx, vy, vz = self._columns(vector)
+        return PointArray.from_coordinates(
+            array('d', map(add, self.x, vx)),
+            array('d', map(add, self.y, vy)),
+            array('d', map(add, self.z, vz))
+        )
+
+    def midpoint(self, other):
+        ox, oy, oz = self._columns(other)
+        return PointArray.from_coordinates(
+            array('d', map(mul, map(add, self.x, ox), repeat(0.5))),
+            array('d', map(mul, map(add, self.y, oy), repeat(0.5))),
+            array('d', map(mul, map(add, self.z, oz), repeat(0.5)))
+        )
+
+    def scale_point(self, factor, origin=None):
+        origin = origin or Point(0, 0, 0)
+        return PointArray.from_coordinates(*(
+            array('d', map(add, map(mul, map(sub, column, repeat(o)), repeat(factor)), repeat(o)))
+            for column, o in ((self.x, origin.x), (self.y, origin.y), (self.z, origin.z))
+        ))
+
+    def __repr__(self):
+        return f"PointArray({len(self)} points)"
+
+class PreparedPolygon:
+    # A Polygon set up for many contains_point queries. The plane is cut
+    # into horizontal slabs at every vertex y; each slab keeps the edges
+    # spanning it, sorted left to right. A query rejects on the bounding
+    # box, finds its slab by bisection and then counts the edges to its
+    # right by binary search, so it costs O(log n). The answers are those
+    # of Polygon.contains_point (same half-open ray-casting rule, without
+    # its 1e-10 fudge term). Slabs whose edges cross, as in
+    # self-intersecting polygons, fall back to counting every edge.
+    # Storage is the total number of edge-slab overlaps: O(n) for most
+    # shapes, O(n^2) at worst.
+    __slots__ = ('polygon', 'min_x', 'min_y', 'max_x', 'max_y', '_ys', '_slabs')
+
+    def __init__(self, polygon):
+        self.polygon = polygon
+        points = polygon.points
+        n = len(points)
+        self.min_x = min((p.x for p in points), default=0)
+        self.max_x = max((p.x for p in points), default=0)
+        self.min_y = min((p.y for p in points), default=0)
+        self.max_y = max((p.y for p in points), default=0)
+        self._ys = sorted(set(p.y for p in points))
+        buckets = [[] for _ in range(max(len(self._ys) - 1, 0))]
+        for i in range(n):
+            pi, pj = points[i], points[i + 1 if i + 1 < n else 0]
+            if pi.y == pj.y:
+                continue  # Horizontal edges never cross a horizontal ray.
+            edge = (pi.x, pi.y, pj.x - pi.x, pj.y - pi.y)
+            for slab in range(bisect_left(self._ys, min(pi.y, pj.y)), bisect_left(self._ys, max(pi.y, pj.y))):
+                buckets[slab].append(edge)
+        self._slabs = []
+        for slab, edges in enumerate(buckets):
+            bottom, top = self._ys[slab], self._ys[slab + 1]
+            edges.sort(key=lambda e: PreparedPolygon._x_at(e, (bottom + top) / 2))
+            ordered = all(
+                all(a <= b for a, b in zip(xs, xs[1:]))
+                for xs in ([self._x_at(e, bottom) for e in edges], [self._x_at(e, top) for e in edges])
+            )
+            self._slabs.append((ordered, edges))
+
+    @staticmethod
+    def _x_at(edge, y):
+        xi, yi, dx, dy = edge
+        return dx * (y - yi) / dy + xi
+
+    def _contains(self, x, y):
+        if not (self.min_y <= y < self.max_y and self.min_x <= x < self.max_x):
+            return False
+        ordered, edges = self._slabs[bisect_right(self._ys, y) - 1]
+        if not ordered:
+            return sum(x < dx * (y - yi) / dy + xi for xi, yi, dx, dy in edges) % 2 == 1
+        # Edges are sorted by x within the slab: find the first one right of x.
+        lo, hi = 0, len(edges)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            xi, yi, dx, dy = edges[mid]
+            if x < dx * (y - yi) / dy + xi:
+                hi = mid
+            else:
+                lo = mid + 1
+        return (len(edges) - lo) % 2 == 1
+
+    def contains_point(self, point):
+        return self._contains(point.x, point.y)
+
+    def contains_points(self, points):
+        # One bool per point of a PointArray (or any iterable of Points).
+        if isinstance(points, PointArray):
+            return [self._contains(x, y) for x, y in zip(points.x, points.y)]
+        return [self._contains(p.x, p.y) for p in points]
+
+    def __repr__(self):
+        return f"PreparedPolygon({len(self.polygon.points)} points)"
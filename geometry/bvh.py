@@ -0,0 +1,216 @@
+from array import array
+
+from basics import Circle, Line, Point, Polygon, Rectangle, Triangle
+
+# Shapes per leaf below which a node is never split, and above which it
+# always is.
+LEAF_SIZE = 4
+MAX_LEAF_SIZE = 16
+# Centroid bins tried per split by the SAH builder.
+BINS = 16
+
+
+def bounds(shape):
+    """Axis-aligned bounding box (min_x, min_y, max_x, max_y) of a shape."""
+    if isinstance(shape, Circle):
+        x, y, r = shape.center.x, shape.center.y, shape.radius
+        return x - r, y - r, x + r, y + r
+    if isinstance(shape, Point):
+        return shape.x, shape.y, shape.x, shape.y
+    if isinstance(shape, (Rectangle, Line)):
+        points = (shape.p1, shape.p2)
+    elif isinstance(shape, Triangle):
+        points = (shape.p1, shape.p2, shape.p3)
+    elif isinstance(shape, Polygon):
+        points = shape.points
+    else:
+        raise TypeError("Invalid shape type.")
+    xs = [p.x for p in points]
+    ys = [p.y for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _half_perimeter(box):
+    # The 2-D stand-in for surface area in the SAH cost.
+    return (box[2] - box[0]) + (box[3] - box[1])
+
+
+def _union(a, b):
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+class BVH:
+    """
+    Bounding-volume hierarchy of axis-aligned boxes over Circles,
+    Rectangles, Triangles, Polygons, Lines and Points.
+
+    It is built top down with the binned surface-area heuristic: each node
+    is split where the sum over both halves of (half perimeter x shape
+    count) is least, or kept as a leaf when no split beats that. After
+    shapes move, refit() recomputes every box bottom up without changing
+    the tree. overlapping_pairs() walks the tree against itself and only
+    hands pairs with overlapping boxes to the exact test.
+
+    Nodes live in flat arrays; a node's children always come after it.
+    """
+
+    def __init__(self, shapes):
+        self.shapes = list(shapes)
+        self._boxes = [bounds(s) for s in self.shapes]
+        self._order = list(range(len(self.shapes)))
+        self._node_boxes = []
+        # Inner nodes: left and right child; leaves: left = -1 and
+        # right = count, with the shapes at _order[first:first + count].
+        self._left = array('l')
+        self._right = array('l')
+        self._first = array('l')
+        if self.shapes:
+            self._build(0, len(self.shapes))
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def _node(self):
+        self._node_boxes.append(None)
+        self._left.append(-1)
+        self._right.append(0)
+        self._first.append(0)
+        return len(self._node_boxes) - 1
+
+    def _build(self, lo, hi):
+        node = self._node()
+        order, boxes = self._order, self._boxes
+        box = boxes[order[lo]]
+        for i in order[lo + 1:hi]:
+            box = _union(box, boxes[i])
+        self._node_boxes[node] = box
+        count = hi - lo
+        split = self._split(lo, hi, box) if count > LEAF_SIZE else None
+        if split is None:
+            self._first[node] = lo
+            self._right[node] = count
+            return node
+        self._left[node] = self._build(lo, split)
+        self._right[node] = self._build(split, hi)
+        return node
+
+    def _split(self, lo, hi, box):
+        """Partition _order[lo:hi] at the best SAH bin boundary; returns the split index or None for a leaf."""
+        order, boxes = self._order, self._boxes
+        centers = {i: ((boxes[i][0] + boxes[i][2]) / 2, (boxes[i][1] + boxes[i][3]) / 2) for i in order[lo:hi]}
+        low = [min(c[a] for c in centers.values()) for a in (0, 1)]
+        high = [max(c[a] for c in centers.values()) for a in (0, 1)]
+        axis = 0 if high[0] - low[0] >= high[1] - low[1] else 1
+        extent = high[axis] - low[axis]
+        if extent == 0:
+            # All centers coincide: no split separates them, so halve the range.
+            return (lo + hi) // 2
+        scale = BINS / extent
+        bin_of = {i: min(int((c[axis] - low[axis]) * scale), BINS - 1) for i, c in centers.items()}
+        counts = [0] * BINS
+        bin_boxes = [None] * BINS
+        for i, b in bin_of.items():
+            counts[b] += 1
+            bin_boxes[b] = boxes[i] if bin_boxes[b] is None else _union(bin_boxes[b], boxes[i])
+        # Sweep from the right to get the cost of each right-hand side, then from the left.
+        right_costs = [0.0] * BINS
+        acc, n = None, 0
+        for b in range(BINS - 1, 0, -1):
+            if bin_boxes[b] is not None:
+                acc = bin_boxes[b] if acc is None else _union(acc, bin_boxes[b])
+                n += counts[b]
+            right_costs[b] = _half_perimeter(acc) * n if n else 0.0
+        best, best_cost = None, _half_perimeter(box) * (hi - lo) if hi - lo <= MAX_LEAF_SIZE else float("inf")
+        acc, n = None, 0
+        for b in range(BINS - 1):
+            if bin_boxes[b] is not None:
+                acc = bin_boxes[b] if acc is None else _union(acc, bin_boxes[b])
+                n += counts[b]
+            if 0 < n < hi - lo and _half_perimeter(acc) * n + right_costs[b + 1] < best_cost:
+                best, best_cost = b, _half_perimeter(acc) * n + right_costs[b + 1]
+        if best is None:
+            return None
+        left = [i for i in order[lo:hi] if bin_of[i] <= best]
+        right = [i for i in order[lo:hi] if bin_of[i] > best]
+        order[lo:hi] = left + right
+        return lo + len(left)
+
+    def refit(self):
+        """Recompute every box after shapes have moved or changed size."""
+        self._boxes = [bounds(s) for s in self.shapes]
+        boxes = self._boxes
+        for node in range(len(self._node_boxes) - 1, -1, -1):
+            if self._left[node] < 0:
+                first = self._first[node]
+                members = self._order[first:first + self._right[node]]
+                box = boxes[members[0]]
+                for i in members[1:]:
+                    box = _union(box, boxes[i])
+            else:
+                box = _union(self._node_boxes[self._left[node]], self._node_boxes[self._right[node]])
+            self._node_boxes[node] = box
+
+    def _members(self, node):
+        first = self._first[node]
+        return self._order[first:first + self._right[node]]
+
+    def query(self, box):
+        """Indices of the shapes whose boxes overlap box (min_x, min_y, max_x, max_y)."""
+        found = []
+        stack = [0] if self.shapes else []
+        while stack:
+            node = stack.pop()
+            if not _overlaps(self._node_boxes[node], box):
+                continue
+            if self._left[node] < 0:
+                found.extend(i for i in self._members(node) if _overlaps(self._boxes[i], box))
+            else:
+                stack += (self._left[node], self._right[node])
+        return found
+
+    def candidate_pairs(self):
+        """Every pair (i, j), i < j, of shapes whose boxes overlap."""
+        pairs = []
+        stack = [(0, 0)] if self.shapes else []
+        boxes, left, right = self._boxes, self._left, self._right
+        while stack:
+            a, b = stack.pop()
+            if a == b:
+                if left[a] < 0:
+                    members = self._members(a)
+                    pairs.extend((min(i, j), max(i, j)) for k, i in enumerate(members) for j in members[k + 1:]
+                                 if _overlaps(boxes[i], boxes[j]))
+                else:
+                    stack += ((left[a], left[a]), (right[a], right[a]), (left[a], right[a]))
+                continue
+            if not _overlaps(self._node_boxes[a], self._node_boxes[b]):
+                continue
+            if left[a] < 0 and left[b] < 0:
+                pairs.extend((min(i, j), max(i, j)) for i in self._members(a) for j in self._members(b)
+                             if _overlaps(boxes[i], boxes[j]))
+            elif left[a] < 0 or (left[b] >= 0 and _half_perimeter(self._node_boxes[b]) > _half_perimeter(self._node_boxes[a])):
+                # Descend into the larger node.
+                stack += ((a, left[b]), (a, right[b]))
+            else:
+                stack += ((left[a], b), (right[a], b))
+        return pairs
+
+    def overlapping_pairs(self, test):
+        """The candidate pairs (i, j) for which test(shape_i, shape_j) is true."""
+        shapes = self.shapes
+        return [(i, j) for i, j in self.candidate_pairs() if test(shapes[i], shapes[j])]
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+# import random
+# shapes = [Circle(Point(random.random() * 100, random.random() * 100), 1) for _ in range(1000)]
+# tree = BVH(shapes)
+# touching = tree.overlapping_pairs(lambda a, b: a.center.distance_to(b.center) <= a.radius + b.radius)
+# print(len(touching))
+# for circle in shapes:
+#     circle.center = circle.center.translate(Point(0.5, 0))
+# tree.refit()
+# print(len(tree.candidate_pairs()))
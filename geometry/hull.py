@@ -0,0 +1,288 @@
+import math
+from itertools import compress, repeat
+from multiprocessing import Pool
+from operator import add, and_, gt, mul, not_, sub
+
+from basics import Point, PointArray
+
+# Below this many points the worker processes cost more than they save.
+PARALLEL_THRESHOLD = 200000
+
+
+def _columns(points):
+    if isinstance(points, PointArray):
+        return points.x, points.y, points.z
+    points = list(points)
+    return [p.x for p in points], [p.y for p in points], [p.z for p in points]
+
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def _chain(vertices):
+    """Andrew's monotone chain over (x, y, index) tuples, as in Polygon.convex_hull."""
+    vertices = sorted(vertices)
+    if len(vertices) <= 1:
+        return vertices
+    lower, upper = [], []
+    for v in vertices:
+        while len(lower) >= 2 and _cross(lower[-2], lower[-1], v) <= 0:
+            lower.pop()
+        lower.append(v)
+    for v in reversed(vertices):
+        while len(upper) >= 2 and _cross(upper[-2], upper[-1], v) <= 0:
+            upper.pop()
+        upper.append(v)
+    return lower[:-1] + upper[:-1]
+
+
+def _survivors(xs, ys, ids):
+    """
+    Akl-Toussaint filter: drop every point strictly inside the polygon
+    spanned by the extremes in x, y, x + y and x - y. The inside test runs
+    one edge at a time over whole columns through map, so the per-point
+    work stays in C.
+    """
+    if len(ids) < 8:
+        return list(ids)
+    sums = list(map(add, xs, ys))
+    diffs = list(map(sub, xs, ys))
+    # Counter-clockwise: left, lower left, bottom, lower right, right, upper right, top, upper left.
+    picks = [min(ids, key=xs.__getitem__), min(ids, key=sums.__getitem__), min(ids, key=ys.__getitem__),
+             max(ids, key=diffs.__getitem__), max(ids, key=xs.__getitem__), max(ids, key=sums.__getitem__),
+             max(ids, key=ys.__getitem__), min(ids, key=diffs.__getitem__)]
+    corners = []
+    for i in picks:
+        if not corners or (xs[i], ys[i]) != corners[-1]:
+            corners.append((xs[i], ys[i]))
+    if len(corners) > 1 and corners[0] == corners[-1]:
+        corners.pop()
+    if len(corners) < 3:
+        return list(ids)
+    if len(ids) == len(xs):
+        cx, cy = xs, ys
+    else:
+        cx, cy = [xs[i] for i in ids], [ys[i] for i in ids]
+    inside = repeat(True)
+    for (ox, oy), (ax, ay) in zip(corners, corners[1:] + corners[:1]):
+        # cross(o, a, p) > 0  <=>  (ax - ox) * py - (ay - oy) * px > (ax - ox) * oy - (ay - oy) * ox
+        dx, dy = ax - ox, ay - oy
+        values = map(add, map(mul, cy, repeat(dx)), map(mul, cx, repeat(-dy)))
+        inside = map(and_, inside, map(gt, values, repeat(dx * oy - dy * ox)))
+    return list(compress(ids, map(not_, inside)))
+
+
+def _hull(xs, ys, ids, offset=0):
+    kept = _survivors(xs, ys, ids)
+    return [(xs[i], ys[i], i + offset) for i in kept]
+
+
+def _chunk_hull(args):
+    xs, ys, offset = args
+    return _chain(_hull(xs, ys, range(len(xs)), offset))
+
+
+def convex_hull(points, workers=None):
+    """
+    Indices of the 2-D convex hull of points (a PointArray or Points),
+    counter-clockwise from the leftmost, with collinear points left out:
+    the same hull Polygon.convex_hull gives. Interior points are discarded
+    up front by the Akl-Toussaint filter, so the sort only sees the few
+    that can be on the hull.
+
+    With workers > 1 and at least PARALLEL_THRESHOLD points, chunks of the
+    input are hulled in separate processes and the partial hulls merged.
+    """
+    xs, ys, _ = _columns(points)
+    n = len(xs)
+    if workers and workers > 1 and n >= PARALLEL_THRESHOLD:
+        step = -(-n // workers)
+        chunks = [(xs[lo:lo + step], ys[lo:lo + step], lo) for lo in range(0, n, step)]
+        with Pool(workers) as pool:
+            partial = pool.map(_chunk_hull, chunks)
+        return [v[2] for v in _chain([v for hull in partial for v in hull])]
+    return [v[2] for v in _chain(_hull(xs, ys, range(n)))]
+
+
+class IncrementalHull:
+    """
+    A 2-D convex hull kept up to date as points stream in. Each add() is
+    O(h) for a hull of h vertices; points inside the current hull are
+    rejected without changing it. Points are numbered in the order they
+    were added.
+    """
+
+    def __init__(self, points=()):
+        self._vertices = []
+        self.count = 0
+        self.extend(points)
+
+    def add(self, point):
+        """Add one point; returns True if the hull changed."""
+        v = (point.x, point.y, self.count)
+        self.count += 1
+        hull = self._vertices
+        if len(hull) < 3:
+            self._vertices = _chain(hull + [v])
+            return self._vertices != hull
+        n = len(hull)
+        visible = [_cross(hull[i], hull[(i + 1) % n], v) < 0 for i in range(n)]
+        if not any(visible):
+            return False
+        # The visible edges form one run; find where it starts and ends.
+        start = next(i for i in range(n) if visible[i] and not visible[i - 1])
+        end = start
+        while visible[(end + 1) % n]:
+            end += 1
+        # Keep the vertices from the end of the run round to its start, then v.
+        kept = [hull[(end + 1 + k) % n] for k in range(n - (end - start))]
+        # v may line up with the vertices next to it; drop those, as _chain does.
+        while len(kept) >= 2 and _cross(kept[-2], kept[-1], v) <= 0:
+            kept.pop()
+        while len(kept) >= 2 and _cross(v, kept[0], kept[1]) <= 0:
+            kept.pop(0)
+        self._vertices = kept + [v]
+        return True
+
+    def extend(self, points):
+        if isinstance(points, PointArray):
+            points = points.to_points()
+        for point in points:
+            self.add(point)
+
+    def vertices(self):
+        """Indices of the hull vertices, counter-clockwise."""
+        return [v[2] for v in self._vertices]
+
+    def points(self):
+        return [Point(x, y) for x, y, _ in self._vertices]
+
+    def __len__(self):
+        return len(self._vertices)
+
+
+def _subtract(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+
+def _cross3(u, v):
+    return (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+
+
+def _dot3(u, v):
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def _norm2(v):
+    return _dot3(v, v)
+
+
+class _Face:
+    __slots__ = ('vertices', 'normal', 'offset', 'outside', 'alive')
+
+    def __init__(self, a, b, c, coords):
+        self.vertices = (a, b, c)
+        normal = _cross3(_subtract(coords[b], coords[a]), _subtract(coords[c], coords[a]))
+        length = math.sqrt(_dot3(normal, normal)) or 1.0
+        self.normal = (normal[0] / length, normal[1] / length, normal[2] / length)
+        self.offset = _dot3(self.normal, coords[a])
+        self.outside = []
+        self.alive = True
+
+    def distance(self, p):
+        return _dot3(self.normal, p) - self.offset
+
+
+def convex_hull_3d(points):
+    """
+    Quickhull in 3-D. Returns the hull's triangles as index triples,
+    counter-clockwise seen from outside. Coplanar input has no 3-D hull and
+    raises ValueError.
+    """
+    xs, ys, zs = _columns(points)
+    coords = list(zip(xs, ys, zs))
+    n = len(coords)
+    if n < 4:
+        raise ValueError("A 3-D hull needs at least four points.")
+    scale = max(max(map(abs, c)) for c in (xs, ys, zs)) or 1.0
+    eps = 1e-12 * scale
+    # Initial tetrahedron: the farthest pair of axis extremes, the point
+    # farthest from their line, then the point farthest from that plane.
+    extremes = {min(range(n), key=lambda i: coords[i][a]) for a in range(3)}
+    extremes |= {max(range(n), key=lambda i: coords[i][a]) for a in range(3)}
+    a, b = max(((i, j) for i in extremes for j in extremes),
+               key=lambda e: _norm2(_subtract(coords[e[0]], coords[e[1]])))
+    ab = _subtract(coords[b], coords[a])
+    c = max(range(n), key=lambda i: _norm2(_cross3(ab, _subtract(coords[i], coords[a]))))
+    plane = _Face(a, b, c, coords)
+    d = max(range(n), key=lambda i: abs(plane.distance(coords[i])))
+    if abs(plane.distance(coords[d])) <= eps:
+        raise ValueError("Points are coplanar.")
+    # Orient every face of the tetrahedron away from its centroid.
+    center = tuple(sum(coords[i][axis] for i in (a, b, c, d)) / 4 for axis in range(3))
+    faces = []
+    for i, j, k in ((a, b, c), (a, c, d), (a, d, b), (b, d, c)):
+        face = _Face(i, j, k, coords)
+        faces.append(face if face.distance(center) < 0 else _Face(i, k, j, coords))
+    edges = {}
+
+    def attach(face):
+        i, j, k = face.vertices
+        for edge in ((i, j), (j, k), (k, i)):
+            edges[edge] = face
+
+    def assign(candidates, new_faces):
+        for i in candidates:
+            p = coords[i]
+            for face in new_faces:
+                if face.distance(p) > eps:
+                    face.outside.append(i)
+                    break
+
+    for face in faces:
+        attach(face)
+    assign((i for i in range(n) if i not in (a, b, c, d)), faces)
+    pending = [face for face in faces if face.outside]
+    while pending:
+        face = pending.pop()
+        if not face.alive or not face.outside:
+            continue
+        eye = max(face.outside, key=lambda i: face.distance(coords[i]))
+        p = coords[eye]
+        # Every face the eye point can see, found by walking across edges.
+        visible, stack = [], [face]
+        face.alive = False
+        while stack:
+            f = stack.pop()
+            visible.append(f)
+            i, j, k = f.vertices
+            for u, v in ((i, j), (j, k), (k, i)):
+                g = edges[(v, u)]
+                if g.alive and g.distance(p) > eps:
+                    g.alive = False
+                    stack.append(g)
+        horizon = [(u, v) for f in visible for u, v in zip(f.vertices, f.vertices[1:] + f.vertices[:1])
+                   if edges[(v, u)].alive]
+        orphans = [i for f in visible for i in f.outside if i != eye]
+        for f in visible:
+            i, j, k = f.vertices
+            for edge in ((i, j), (j, k), (k, i)):
+                if edges.get(edge) is f:
+                    del edges[edge]
+        new_faces = [_Face(u, v, eye, coords) for u, v in horizon]
+        for f in new_faces:
+            attach(f)
+        assign(orphans, new_faces)
+        faces.extend(new_faces)
+        pending.extend(f for f in new_faces if f.outside)
+    return [f.vertices for f in faces if f.alive]
+
+
+# import random
+# points = PointArray([Point(random.random(), random.random()) for _ in range(1000)])
+# print(convex_hull(points))
+# stream = IncrementalHull(Point(random.random(), random.random()) for _ in range(100))
+# print(stream.vertices())
+# cube = [Point(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)]
+# print(convex_hull_3d(cube))
@@ -0,0 +1,365 @@
+import random
+from array import array
+from fractions import Fraction
+
+from basics import PointArray, Triangle
+
+# Shewchuk's error bounds for the float orientation and incircle
+# determinants; results closer to zero than this are redone exactly.
+_ORIENT_BOUND = 3.3306690738754716e-16
+_INCIRCLE_BOUND = 1.1102230246251577e-15
+# Bits per axis of the Hilbert curve used to order insertions.
+_HILBERT_BITS = 16
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+    """Positive if a, b, c turn counter-clockwise, negative if clockwise, 0 if collinear."""
+    left = (ax - cx) * (by - cy)
+    right = (ay - cy) * (bx - cx)
+    det = left - right
+    if abs(det) > _ORIENT_BOUND * (abs(left) + abs(right)):
+        return det
+    ax, ay, bx, by, cx, cy = map(Fraction, (ax, ay, bx, by, cx, cy))
+    return (ax - cx) * (by - cy) - (ay - cy) * (bx - cx)
+
+
+def _incircle(ax, ay, bx, by, cx, cy, dx, dy):
+    """Positive if d is inside the circle through the counter-clockwise a, b, c."""
+    adx, ady, bdx, bdy, cdx, cdy = ax - dx, ay - dy, bx - dx, by - dy, cx - dx, cy - dy
+    alift, blift, clift = adx * adx + ady * ady, bdx * bdx + bdy * bdy, cdx * cdx + cdy * cdy
+    det = (alift * (bdx * cdy - cdx * bdy) + blift * (cdx * ady - adx * cdy) + clift * (adx * bdy - bdx * ady))
+    permanent = (alift * (abs(bdx * cdy) + abs(cdx * bdy)) + blift * (abs(cdx * ady) + abs(adx * cdy))
+                 + clift * (abs(adx * bdy) + abs(bdx * ady)))
+    if abs(det) > _INCIRCLE_BOUND * permanent:
+        return det
+    adx, ady, bdx, bdy, cdx, cdy = (Fraction(a) - Fraction(b) for a, b in
+                                    ((ax, dx), (ay, dy), (bx, dx), (by, dy), (cx, dx), (cy, dy)))
+    return ((adx * adx + ady * ady) * (bdx * cdy - cdx * bdy) + (bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy)
+            + (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady))
+
+
+def _hilbert(x, y):
+    """Position of the cell (x, y) along a Hilbert curve over a 2^_HILBERT_BITS grid."""
+    d = 0
+    s = 1 << (_HILBERT_BITS - 1)
+    while s:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = s - 1 - x, s - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+class TriangleMesh:
+    """
+    An index-based triangle mesh: `vertices` is a PointArray and
+    `triangles` a flat array of vertex indices, three per triangle,
+    counter-clockwise. neighbors[3 * t + k] is the triangle across the edge
+    opposite corner k of triangle t, or -1 on the boundary.
+    """
+    __slots__ = ('vertices', 'triangles', 'neighbors')
+
+    def __init__(self, vertices, triangles):
+        self.vertices = vertices
+        self.triangles = array('l', triangles)
+        self.neighbors = array('l', [-1]) * len(self.triangles)
+        # Each directed edge (a, b) belongs to one triangle; its twin (b, a)
+        # to the neighbor on the other side.
+        edges = {}
+        tris = self.triangles
+        for t in range(len(tris) // 3):
+            for k in range(3):
+                edges[(tris[3 * t + (k + 1) % 3], tris[3 * t + (k + 2) % 3])] = 3 * t + k
+        for (a, b), slot in edges.items():
+            twin = edges.get((b, a))
+            if twin is not None:
+                self.neighbors[slot] = twin // 3
+
+    def __len__(self):
+        return len(self.triangles) // 3
+
+    def corners(self, t):
+        return tuple(self.triangles[3 * t:3 * t + 3])
+
+    def adjacent(self, t):
+        """Indices of the triangles sharing an edge with triangle t."""
+        return [n for n in self.neighbors[3 * t:3 * t + 3] if n >= 0]
+
+    def triangle(self, t):
+        """Triangle t as a basics.Triangle."""
+        return Triangle(*(self.vertices[i] for i in self.corners(t)))
+
+    def locate(self, point, start=0):
+        """
+        The triangle containing point, found by walking across edges from
+        `start`, or -1 if the walk leaves the mesh. The walk is exact on a
+        convex mesh such as a Delaunay triangulation.
+        """
+        xs, ys = self.vertices.x, self.vertices.y
+        px, py = point.x, point.y
+        t, steps = start, 0
+        while 0 <= t and steps <= len(self):
+            steps += 1
+            for k in range(3):
+                a = self.triangles[3 * t + (k + 1) % 3]
+                b = self.triangles[3 * t + (k + 2) % 3]
+                if _orient(xs[a], ys[a], xs[b], ys[b], px, py) < 0:
+                    t = self.neighbors[3 * t + k]
+                    break
+            else:
+                return t
+        return -1
+
+    def __repr__(self):
+        return f"TriangleMesh({len(self.vertices)} vertices, {len(self)} triangles)"
+
+
+# The vertex at infinity: the ghost triangle (a, b, GHOST) sits outside
+# the hull edge b -> a, so the hull is exactly the set of real triangles.
+GHOST = -1
+
+
+class _Delaunay:
+    """
+    Bowyer-Watson insertion into a triangle list with neighbor links.
+    Triangle t has corners v[3t:3t+3] (counter-clockwise) and n[3t + k] is
+    the triangle across the edge opposite corner k. Every hull edge has a
+    ghost triangle on its outer side with GHOST as third corner, so points
+    outside the hull are inserted like any other and no finite
+    super-triangle can distort the hull.
+    """
+
+    def __init__(self, xs, ys, a, b, c):
+        self.xs, self.ys = xs, ys
+        self.v, self.n = [], []
+        self.alive = []
+        self.free = []
+        # The first triangle and the ghosts round it, linked through their
+        # shared directed edges.
+        if _orient(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c]) < 0:
+            b, c = c, b
+        for corners in ((a, b, c), (b, a, GHOST), (c, b, GHOST), (a, c, GHOST)):
+            self._new(*corners)
+        edges = {(self.v[3 * t + (k + 1) % 3], self.v[3 * t + (k + 2) % 3]): 3 * t + k
+                 for t in range(4) for k in range(3)}
+        for (p, q), slot in edges.items():
+            self.n[slot] = edges[(q, p)] // 3
+        self.last = 0
+
+    def _new(self, a, b, c):
+        if self.free:
+            t = self.free.pop()
+            self.v[3 * t:3 * t + 3] = [a, b, c]
+            self.alive[t] = True
+        else:
+            t = len(self.alive)
+            self.v += [a, b, c]
+            self.n += [-1, -1, -1]
+            self.alive.append(True)
+        return t
+
+    def _hull_edge(self, t):
+        """(a, b, k) for a ghost triangle t: its hull edge a -> b and the index k of its GHOST corner."""
+        v = self.v
+        k = v.index(GHOST, 3 * t, 3 * t + 3) - 3 * t
+        return v[3 * t + (k + 1) % 3], v[3 * t + (k + 2) % 3], k
+
+    def _conflicts(self, t, px, py):
+        """True if p is inside the circumcircle of t; for a ghost, if p is beyond or on its hull edge."""
+        xs, ys, v = self.xs, self.ys, self.v
+        a, b, c = v[3 * t:3 * t + 3]
+        if GHOST not in (a, b, c):
+            return _incircle(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], px, py) > 0
+        a, b, _ = self._hull_edge(t)
+        det = _orient(xs[a], ys[a], xs[b], ys[b], px, py)
+        if det:
+            return det > 0
+        # On the line through the edge: a conflict only strictly between its ends.
+        return (px - xs[a]) * (xs[b] - px) + (py - ys[a]) * (ys[b] - py) > 0
+
+    def _locate(self, px, py):
+        """A triangle in conflict with p: the real triangle holding it, or a ghost it lies beyond."""
+        xs, ys, v, n = self.xs, self.ys, self.v, self.n
+        t = self.last
+        if GHOST in v[3 * t:3 * t + 3]:
+            if self._conflicts(t, px, py):
+                return t
+            t = n[3 * t + self._hull_edge(t)[2]]
+        while True:
+            # Start from a random edge so the walk cannot cycle.
+            k0 = random.randrange(3)
+            for j in range(3):
+                k = (k0 + j) % 3
+                a, b = v[3 * t + (k + 1) % 3], v[3 * t + (k + 2) % 3]
+                if _orient(xs[a], ys[a], xs[b], ys[b], px, py) < 0:
+                    t = n[3 * t + k]
+                    break
+            else:
+                return t
+            if GHOST in v[3 * t:3 * t + 3]:
+                return t
+
+    def insert(self, p):
+        xs, ys, v, n = self.xs, self.ys, self.v, self.n
+        px, py = xs[p], ys[p]
+        start = self._locate(px, py)
+        if any(c != GHOST and xs[c] == px and ys[c] == py for c in v[3 * start:3 * start + 3]):
+            return False  # A duplicate of an existing vertex.
+        # The cavity: every triangle in conflict with p. It is connected and
+        # star-shaped around p, so a search from `start` finds it.
+        cavity = {start}
+        stack = [start]
+        while stack:
+            t = stack.pop()
+            for k in range(3):
+                u = n[3 * t + k]
+                if u not in cavity and self._conflicts(u, px, py):
+                    cavity.add(u)
+                    stack.append(u)
+        # Boundary edges (a, b) with the slot of the outside triangle that
+        # points back into the cavity; found before any slot is reused.
+        boundary = [(v[3 * t + (k + 1) % 3], v[3 * t + (k + 2) % 3], n[3 * t + k],
+                     n.index(t, 3 * n[3 * t + k], 3 * n[3 * t + k] + 3))
+                    for t in cavity for k in range(3) if n[3 * t + k] not in cavity]
+        for t in cavity:
+            self.alive[t] = False
+            self.free.append(t)
+        by_start, by_end = {}, {}
+        for a, b, outside, slot in boundary:
+            t = self._new(a, b, p)
+            n[3 * t + 2] = outside
+            n[slot] = t
+            by_start[a] = t
+            by_end[b] = t
+        for a, b, _, _ in boundary:
+            t = by_start[a]
+            n[3 * t] = by_start[b]      # across (b, p)
+            n[3 * t + 1] = by_end[a]    # across (p, a)
+        self.last = t
+        return True
+
+
+def delaunay(points):
+    """
+    Delaunay triangulation of a PointArray (or Points) in the xy-plane, as
+    a TriangleMesh over the same vertex indices; its triangles cover the
+    convex hull exactly.
+
+    Points are inserted one at a time (Bowyer-Watson) in Hilbert-curve
+    order, so each point is located by a short walk from the previous
+    one; orientation and incircle tests fall back to exact arithmetic when
+    the float result is too close to call, so grids and cocircular points
+    are handled. Duplicate points are left out of the triangles, and
+    collinear input gives an empty mesh.
+    """
+    vertices = points if isinstance(points, PointArray) else PointArray(points)
+    count = len(vertices)
+    xs, ys = vertices.x, vertices.y
+    if count < 3:
+        return TriangleMesh(vertices, [])
+    min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+    span = max(max_x - min_x, max_y - min_y) or 1.0
+    scale = ((1 << _HILBERT_BITS) - 1) / span
+    order = sorted(range(count), key=lambda i: _hilbert(int((xs[i] - min_x) * scale), int((ys[i] - min_y) * scale)))
+    # Seed with the first two distinct points in that order and the first
+    # point off their line.
+    a = order[0]
+    b = next((i for i in order if (xs[i], ys[i]) != (xs[a], ys[a])), None)
+    c = None if b is None else next(
+        (i for i in order if _orient(xs[a], ys[a], xs[b], ys[b], xs[i], ys[i]) != 0), None)
+    if c is None:
+        return TriangleMesh(vertices, [])
+    state = _Delaunay(xs, ys, a, b, c)
+    for i in order:
+        if i not in (a, b, c):
+            state.insert(i)
+    triangles = []
+    for t, alive in enumerate(state.alive):
+        corners = state.v[3 * t:3 * t + 3]
+        if alive and GHOST not in corners:
+            triangles += corners
+    return TriangleMesh(vertices, triangles)
+
+
+def triangulate_polygon(polygon):
+    """
+    Triangulate a simple Polygon (either orientation) by ear clipping, as
+    a TriangleMesh over the polygon's points in order. O(n^2) in the worst
+    case; only reflex vertices are tested against each candidate ear.
+    Raises ValueError when no ear is left, which happens only for polygons
+    that are not simple (not every self-intersecting polygon is caught).
+    """
+    vertices = PointArray(polygon.points)
+    count = len(vertices)
+    if count < 3:
+        raise ValueError("A polygon needs at least three points.")
+    xs, ys = vertices.x, vertices.y
+    area = sum(xs[i] * ys[(i + 1) % count] - xs[(i + 1) % count] * ys[i] for i in range(count))
+    ring = list(range(count)) if area > 0 else list(range(count - 1, -1, -1))
+    prev = {ring[i]: ring[i - 1] for i in range(count)}
+    next_ = {ring[i]: ring[(i + 1) % count] for i in range(count)}
+
+    def turn(i):
+        a, c = prev[i], next_[i]
+        return _orient(xs[a], ys[a], xs[i], ys[i], xs[c], ys[c])
+
+    def is_ear(i):
+        a, c = prev[i], next_[i]
+        if turn(i) <= 0:
+            return False
+        for r in reflex:
+            if r in (a, i, c):
+                continue
+            if (_orient(xs[a], ys[a], xs[i], ys[i], xs[r], ys[r]) >= 0 and
+                    _orient(xs[i], ys[i], xs[c], ys[c], xs[r], ys[r]) >= 0 and
+                    _orient(xs[c], ys[c], xs[a], ys[a], xs[r], ys[r]) >= 0):
+                return False
+        return True
+
+    reflex = {i for i in ring if turn(i) <= 0}
+    triangles = []
+    remaining = count
+    i, misses = ring[0], 0
+    while remaining > 3:
+        if is_ear(i):
+            a, c = prev[i], next_[i]
+            triangles += [a, i, c]
+        elif misses > remaining:
+            # No ear left: a collinear vertex can go without a triangle; otherwise the polygon is not simple.
+            i = next((j for j in prev if turn(j) == 0), None)
+            if i is None:
+                raise ValueError("Polygon is not simple.")
+            a, c = prev[i], next_[i]
+        else:
+            i = next_[i]
+            misses += 1
+            continue
+        next_[a], prev[c] = c, a
+        del prev[i], next_[i]
+        reflex.discard(i)
+        remaining -= 1
+        misses = 0
+        for j in (a, c):
+            if turn(j) > 0:
+                reflex.discard(j)
+            else:
+                reflex.add(j)
+        i = c
+    a = next(iter(prev))
+    b = next_[a]
+    c = next_[b]
+    if _orient(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c]) > 0:
+        triangles += [a, b, c]
+    return TriangleMesh(vertices, triangles)
+
+
+# from basics import Point, Polygon
+# points = PointArray([Point(random.random(), random.random()) for _ in range(1000)])
+# mesh = delaunay(points)
+# print(mesh, mesh.adjacent(0), mesh.locate(Point(0.5, 0.5)))
+# square = Polygon([Point(0, 0), Point(2, 0), Point(2, 2), Point(1, 1), Point(0, 2)])
+# print(triangulate_polygon(square).triangles)
@@ -0,0 +1,142 @@
+import math
+from array import array
+from itertools import repeat
+from operator import add, mul, sub
+
+from basics import Point, PointArray, Vector
+
+_AXES = {'x': (1, 0, 0), 'y': (0, 1, 0), 'z': (0, 0, 1)}
+
+
+class Rotation:
+    """
+    A 3-D rotation stored as a unit quaternion (w, x, y, z) together with
+    its 3x3 matrix, which is computed once when the rotation is made, so
+    applying it costs no trig calls. Angles are in degrees and follow the
+    right-hand rule, as in Transformation.rotate_point.
+
+    r1 * r2 is the rotation that applies r2 first, then r1.
+    """
+    __slots__ = ('quaternion', 'matrix')
+
+    def __init__(self, w, x, y, z):
+        n = math.sqrt(w * w + x * x + y * y + z * z)
+        if n == 0:
+            raise ValueError("A rotation quaternion cannot be zero.")
+        w, x, y, z = w / n, x / n, y / n, z / n
+        self.quaternion = (w, x, y, z)
+        self.matrix = (
+            (1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)),
+            (2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)),
+            (2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)),
+        )
+
+    @staticmethod
+    def identity():
+        return Rotation(1, 0, 0, 0)
+
+    @staticmethod
+    def from_quaternion(w, x, y, z):
+        """From any nonzero quaternion; it is normalized."""
+        return Rotation(w, x, y, z)
+
+    @staticmethod
+    def from_axis_angle(axis, angle):
+        """Rotate by angle degrees about axis: 'x', 'y', 'z' or a Vector through the origin."""
+        ax, ay, az = _AXES[axis] if isinstance(axis, str) else (axis.x, axis.y, axis.z)
+        n = math.sqrt(ax * ax + ay * ay + az * az)
+        if n == 0:
+            raise ValueError("Rotation axis cannot be the zero vector.")
+        half = math.radians(angle) / 2
+        s = math.sin(half) / n
+        return Rotation(math.cos(half), ax * s, ay * s, az * s)
+
+    @staticmethod
+    def from_euler(angles, order='xyz'):
+        """
+        Rotations about the fixed axes in `order`, applied in that order:
+        from_euler((a, b, c), 'xyz') turns by a about x, then b about y, then
+        c about z.
+        """
+        if len(angles) != len(order) or any(axis not in _AXES for axis in order):
+            raise ValueError("order must name one of 'x', 'y', 'z' per angle.")
+        rotation = Rotation.identity()
+        for axis, angle in zip(order, angles):
+            rotation = Rotation.from_axis_angle(axis, angle) * rotation
+        return rotation
+
+    def __mul__(self, other):
+        if not isinstance(other, Rotation):
+            return NotImplemented
+        w1, x1, y1, z1 = self.quaternion
+        w2, x2, y2, z2 = other.quaternion
+        return Rotation(
+            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+        )
+
+    def inverse(self):
+        w, x, y, z = self.quaternion
+        return Rotation(w, -x, -y, -z)
+
+    def axis_angle(self):
+        """(axis Vector, angle in degrees between 0 and 180); the axis is x for the identity."""
+        w, x, y, z = self.quaternion
+        if w < 0:
+            w, x, y, z = -w, -x, -y, -z
+        s = math.sqrt(x * x + y * y + z * z)
+        if s == 0:
+            return Vector(1, 0, 0), 0.0
+        return Vector(x / s, y / s, z / s), math.degrees(2 * math.atan2(s, w))
+
+    def apply(self, points, origin=None):
+        """Rotate a Point or every point of a PointArray about origin (default: the origin)."""
+        origin = origin or Point(0, 0, 0)
+        (a, b, c), (d, e, f), (g, h, i) = self.matrix
+        x0, y0, z0 = origin.x, origin.y, origin.z
+        if not isinstance(points, PointArray):
+            x, y, z = points.x - x0, points.y - y0, points.z - z0
+            return Point(x0 + a * x + b * y + c * z, y0 + d * x + e * y + f * z, z0 + g * x + h * y + i * z)
+        # Whole columns at a time: each output coordinate is one row of the
+        # matrix against (x, y, z), evaluated through map in C.
+        xs = array('d', map(sub, points.x, repeat(x0))) if x0 else points.x
+        ys = array('d', map(sub, points.y, repeat(y0))) if y0 else points.y
+        zs = array('d', map(sub, points.z, repeat(z0))) if z0 else points.z
+
+        def row(r0, r1, r2, shift):
+            terms = map(add, map(mul, xs, repeat(r0)), map(mul, ys, repeat(r1)))
+            return array('d', map(add, map(add, terms, map(mul, zs, repeat(r2))), repeat(shift)))
+
+        return PointArray.from_coordinates(row(a, b, c, x0), row(d, e, f, y0), row(g, h, i, z0))
+
+    def slerp(self, other, t):
+        """Spherical linear interpolation: self at t = 0, other at t = 1, along the shorter arc."""
+        w1, x1, y1, z1 = self.quaternion
+        w2, x2, y2, z2 = other.quaternion
+        cos_theta = w1 * w2 + x1 * x2 + y1 * y2 + z1 * z2
+        if cos_theta < 0:
+            # q and -q are the same rotation; take the one on the near side.
+            w2, x2, y2, z2, cos_theta = -w2, -x2, -y2, -z2, -cos_theta
+        if cos_theta > 0.9995:
+            # Nearly equal: plain interpolation (renormalized by the constructor) is accurate.
+            s1, s2 = 1 - t, t
+        else:
+            theta = math.acos(cos_theta)
+            sin_theta = math.sin(theta)
+            s1 = math.sin((1 - t) * theta) / sin_theta
+            s2 = math.sin(t * theta) / sin_theta
+        return Rotation(s1 * w1 + s2 * w2, s1 * x1 + s2 * x2, s1 * y1 + s2 * y2, s1 * z1 + s2 * z2)
+
+    def __repr__(self):
+        return "Rotation({}, {}, {}, {})".format(*self.quaternion)
+
+
+# quarter = Rotation.from_axis_angle('z', 90)
+# print(quarter.apply(Point(1, 0, 0)))
+# tilt = Rotation.from_euler((30, 45, 60), 'xyz')
+# print((tilt * tilt.inverse()).apply(Point(1, 2, 3)))
+# print(quarter.slerp(tilt, 0.5))
+# mesh = PointArray([Point(1, 0, 0), Point(0, 1, 0), Point(0, 0, 1)])
+# print(quarter.apply(mesh, origin=Point(1, 1, 0)).to_points())
@@ -0,0 +1,193 @@
+import heapq
+from fractions import Fraction
+
+from basics import Line, Point
+
+
+def _exact(segment):
+    """Endpoints as Fractions (exact for floats), ordered left to right, then bottom to top."""
+    a = (Fraction(segment.p1.x), Fraction(segment.p1.y))
+    b = (Fraction(segment.p2.x), Fraction(segment.p2.y))
+    return (a, b) if a <= b else (b, a)
+
+
+def _crossing(s, t):
+    """The single point where segments s and t meet, or None (also for parallel pairs)."""
+    (ax, ay), (bx, by) = s
+    (cx, cy), (dx, dy) = t
+    rx, ry, qx, qy = bx - ax, by - ay, dx - cx, dy - cy
+    d = rx * qy - ry * qx
+    if d == 0:
+        return None
+    u = ((cx - ax) * qy - (cy - ay) * qx) / d
+    v = ((cx - ax) * ry - (cy - ay) * rx) / d
+    if 0 <= u <= 1 and 0 <= v <= 1:
+        return ax + u * rx, ay + u * ry
+    return None
+
+
+def _overlap(s, t):
+    """The shared piece of two collinear segments as (start, end), or None if they are not collinear."""
+    if s[0] == s[1]:
+        s, t = t, s
+    (ax, ay), (bx, by) = s
+    (cx, cy), (dx, dy) = t
+    rx, ry = bx - ax, by - ay
+    if rx * (dy - cy) - ry * (dx - cx) != 0 or rx * (cy - ay) - ry * (cx - ax) != 0:
+        return None
+    start, end = max(s[0], t[0]), min(s[1], t[1])
+    return (start, end) if start <= end else None
+
+
+def _point(p):
+    return Point(float(p[0]), float(p[1]))
+
+
+def _direction(segment):
+    """Direction scaled so its first nonzero component is 1; segments are parallel when these match."""
+    d = [Fraction(segment.p2.x) - Fraction(segment.p1.x), Fraction(segment.p2.y) - Fraction(segment.p1.y),
+         Fraction(segment.p2.z) - Fraction(segment.p1.z)]
+    lead = next((c for c in d if c != 0), None)
+    return None if lead is None else tuple(c / lead for c in d)
+
+
+def parallel_pairs(segments):
+    """
+    Every pair (i, j), i < j, for which Line.is_parallel holds (evaluated
+    exactly), found by grouping on direction. A zero-length segment is
+    parallel to everything. There can be O(n^2) pairs.
+    """
+    groups, points = {}, []
+    for i, segment in enumerate(segments):
+        key = _direction(segment)
+        if key is None:
+            points.append(i)
+        else:
+            groups.setdefault(key, []).append(i)
+    pairs = {(i, j) for group in groups.values() for a, i in enumerate(group) for j in group[a + 1:]}
+    pairs.update((min(i, j), max(i, j)) for i in points for j in range(len(segments)) if j != i)
+    return sorted(pairs)
+
+
+class _Sweep:
+    """
+    Bentley-Ottmann sweep (in the formulation of de Berg et al., which
+    handles several segments through one point) from left to right, in
+    exact rational arithmetic so that ties and degeneracies are decided
+    correctly.
+
+    The status is a Python list kept in bottom-to-top order at the sweep
+    line and searched by bisection; insertions and removals shift the list
+    in C, which beats a pure-Python balanced tree at any size this will
+    see.
+    """
+
+    def __init__(self, segments):
+        self.segments = [_exact(s) for s in segments]
+        self.slopes = [(b[1] - a[1]) / (b[0] - a[0]) if a[0] != b[0] else None for a, b in self.segments]
+        self.status = []
+        self.events = []
+        self.queued = set()
+        self.starts = {}
+        self.points = []
+        self.overlaps = {}
+        for i, (a, b) in enumerate(self.segments):
+            self.starts.setdefault(a, []).append(i)
+            self._push(a)
+            self._push(b)
+
+    def _push(self, p):
+        if p not in self.queued:
+            self.queued.add(p)
+            heapq.heappush(self.events, p)
+
+    def _y(self, i, p):
+        """Height of segment i at the sweep position p; vertical segments in the status all contain p."""
+        slope = self.slopes[i]
+        if slope is None:
+            return p[1]
+        (x0, y0), _ = self.segments[i]
+        return y0 + (p[0] - x0) * slope
+
+    def _bisect(self, p, right):
+        lo, hi = 0, len(self.status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            y = self._y(self.status[mid], p)
+            if y < p[1] or (right and y == p[1]):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _check(self, i, j, p):
+        q = _crossing(self.segments[i], self.segments[j])
+        if q is not None and q > p:
+            self._push(q)
+
+    def _report(self, ids, p):
+        ids = sorted(ids)
+        for a, i in enumerate(ids):
+            for j in ids[a + 1:]:
+                shared = _overlap(self.segments[i], self.segments[j])
+                if shared is not None and shared[0] != shared[1]:
+                    self.overlaps.setdefault((i, j), shared)
+                else:
+                    self.points.append((i, j, p))
+
+    def run(self):
+        while self.events:
+            p = heapq.heappop(self.events)
+            self._handle(p)
+        return self.points, self.overlaps
+
+    def _handle(self, p):
+        upper = self.starts.get(p, [])
+        lo, hi = self._bisect(p, False), self._bisect(p, True)
+        through = self.status[lo:hi]
+        continuing = [i for i in through if self.segments[i][1] != p]
+        if len(upper) + len(through) > 1:
+            self._report(upper + through, p)
+        # Zero-length segments are reported above but never enter the status.
+        entering = continuing + [i for i in upper if self.segments[i][1] != p]
+        # Just right of p, segments through it are ordered by slope, verticals last.
+        entering.sort(key=lambda i: (self.slopes[i] is None, self.slopes[i] or 0))
+        self.status[lo:hi] = entering
+        below = self.status[lo - 1] if lo > 0 else None
+        above_at = lo + len(entering)
+        above = self.status[above_at] if above_at < len(self.status) else None
+        if not entering:
+            if below is not None and above is not None:
+                self._check(below, above, p)
+            return
+        if below is not None:
+            self._check(below, entering[0], p)
+        if above is not None:
+            self._check(entering[-1], above, p)
+
+
+def all_intersections(segments):
+    """
+    All intersections among segments (Lines), in O((n + k) log n) for k
+    intersecting pairs. Returns (crossings, parallel):
+
+    crossings is a list of (i, j, where) with i < j, where `where` is the
+    Point at which segments i and j meet, or for collinear segments that
+    overlap along a stretch, a Line covering the shared piece. Shared
+    endpoints, touching and vertical segments are all included.
+
+    parallel lists the pairs (i, j) for which Line.is_parallel holds; see
+    parallel_pairs.
+    """
+    points, overlaps = _Sweep(segments).run()
+    crossings = [(i, j, _point(p)) for i, j, p in points]
+    crossings += [(i, j, Line(_point(a), _point(b))) for (i, j), (a, b) in overlaps.items()]
+    crossings.sort(key=lambda c: (c[0], c[1]))
+    return crossings, parallel_pairs(segments)
+
+
+# segments = [Line(Point(0, 0), Point(4, 4)), Line(Point(0, 4), Point(4, 0)),
+#             Line(Point(2, -1), Point(2, 5)), Line(Point(1, 1), Point(3, 3))]
+# crossings, parallel = all_intersections(segments)
+# print(crossings)
+# print(parallel)
@@ -0,0 +1,320 @@
+import heapq
+import math
+from itertools import product
+
+from basics import PointArray
+
+# Points a KD-tree leaf holds before it is split.
+LEAF_SIZE = 16
+
+
+def _copy(points):
+    if isinstance(points, PointArray):
+        return PointArray.from_coordinates(points.x, points.y, points.z)
+    return PointArray(points)
+
+
+def _query(point, dims):
+    return (point.x, point.y, point.z)[:dims]
+
+
+def _box(rectangle, dims):
+    """Per-axis (low, high) bounds of a Rectangle; z is unbounded."""
+    p1, p2 = rectangle.p1, rectangle.p2
+    bounds = [(min(p1.x, p2.x), max(p1.x, p2.x)), (min(p1.y, p2.y), max(p1.y, p2.y))]
+    return bounds + [(-math.inf, math.inf)] * (dims - 2)
+
+
+class _Index:
+    """Point storage shared by KDTree and UniformGrid; indices into `points` never change."""
+
+    def __init__(self, points, dims):
+        if dims not in (2, 3):
+            raise ValueError("dims must be 2 or 3.")
+        self.dims = dims
+        self.points = _copy(points)
+        self._columns = (self.points.x, self.points.y, self.points.z)[:dims]
+        self._size = len(self.points)
+
+    def __len__(self):
+        return self._size
+
+    def _distance2(self, i, q):
+        return sum((column[i] - c) ** 2 for column, c in zip(self._columns, q))
+
+    def _offer(self, heap, k, ids, q):
+        """Push ids into a max-heap (negated squared distances) of the k nearest so far."""
+        for i in ids:
+            d = self._distance2(i, q)
+            if len(heap) < k:
+                heapq.heappush(heap, (-d, i))
+            elif d < -heap[0][0]:
+                heapq.heapreplace(heap, (-d, i))
+
+    @staticmethod
+    def _ranked(heap):
+        return [(math.sqrt(-d), i) for d, i in sorted(heap, reverse=True)]
+
+    def _in_box(self, ids, bounds):
+        return [i for i in ids if all(lo <= column[i] <= hi for column, (lo, hi) in zip(self._columns, bounds))]
+
+    def _in_circle(self, ids, q, radius):
+        return [i for i in ids if math.sqrt(self._distance2(i, q)) <= radius]
+
+    def insert(self, point):
+        """Add a point; returns its index."""
+        self.points.append(point)
+        self._size += 1
+        index = len(self.points) - 1
+        self._add(index)
+        return index
+
+    def delete(self, index):
+        """Remove the point with this index."""
+        if not 0 <= index < len(self.points) or not self._remove(index):
+            raise ValueError("Point is not in the index.")
+        self._size -= 1
+
+    def within_radius(self, circle):
+        """Indices of the points inside circle (as Circle.contains_point, in the first dims axes)."""
+        q = _query(circle.center, self.dims)
+        bounds = [(c - circle.radius, c + circle.radius) for c in q]
+        return self._in_circle(self._candidates(bounds), q, circle.radius)
+
+    def within_box(self, rectangle):
+        """Indices of the points inside rectangle (as Rectangle.contains_point)."""
+        bounds = _box(rectangle, self.dims)
+        return self._in_box(self._candidates(bounds), bounds)
+
+
+class _Node:
+    # A leaf holds point indices in items; an inner node splits on axis at
+    # split, with left <= split <= right.
+    __slots__ = ('axis', 'split', 'left', 'right', 'items')
+
+    def __init__(self, items=None, axis=None, split=None, left=None, right=None):
+        self.items = items
+        self.axis = axis
+        self.split = split
+        self.left = left
+        self.right = right
+
+
+class KDTree(_Index):
+    """
+    KD-tree over x, y (and z with dims=3) with bucketed leaves.
+
+    Bulk construction presorts the points once per axis and keeps those
+    orders through every split, so building costs O(n log n). Each split
+    is at the median of the axis with the widest spread. insert() and
+    delete() update the tree in place; once as many points have been
+    inserted as the tree was built with, it is rebuilt to stay balanced.
+    """
+
+    def __init__(self, points=(), dims=2, leaf_size=LEAF_SIZE):
+        super().__init__(points, dims)
+        self.leaf_size = leaf_size
+        self._build_ids(range(len(self.points)))
+
+    def _build_ids(self, ids):
+        orders = [sorted(ids, key=column.__getitem__) for column in self._columns]
+        # Scratch flags for _build, one byte per point index.
+        self._mark = bytearray(len(self.points))
+        self.root = self._build(orders)
+        self._budget = max(len(orders[0]), self.leaf_size)
+
+    def _build(self, orders):
+        ids = orders[0]
+        if len(ids) <= self.leaf_size:
+            return _Node(list(ids))
+        # Each order is sorted, so the spread of an axis is last minus first.
+        axis = max(range(self.dims), key=lambda a: self._columns[a][orders[a][-1]] - self._columns[a][orders[a][0]])
+        order = orders[axis]
+        mid = len(order) // 2
+        mark = self._mark
+        for i in order[:mid]:
+            mark[i] = 1
+        left = [order[:mid] if a == axis else [i for i in orders[a] if mark[i]] for a in range(self.dims)]
+        right = [order[mid:] if a == axis else [i for i in orders[a] if not mark[i]] for a in range(self.dims)]
+        for i in order[:mid]:
+            mark[i] = 0
+        return _Node(axis=axis, split=self._columns[axis][order[mid]],
+                     left=self._build(left), right=self._build(right))
+
+    def _ids(self):
+        ids = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.items is not None:
+                ids.extend(node.items)
+            else:
+                stack += (node.left, node.right)
+        return ids
+
+    def rebuild(self):
+        """Rebalance from the points currently in the tree."""
+        self._build_ids(self._ids())
+
+    def _add(self, index):
+        self._budget -= 1
+        if self._budget < 0:
+            self._build_ids(self._ids() + [index])
+            return
+        node = self.root
+        while node.items is None:
+            node = node.left if self._columns[node.axis][index] < node.split else node.right
+        node.items.append(index)
+        if len(node.items) > 2 * self.leaf_size:
+            orders = [sorted(node.items, key=column.__getitem__) for column in self._columns]
+            self._mark.extend(bytes(len(self.points) - len(self._mark)))
+            built = self._build(orders)
+            node.items, node.axis, node.split, node.left, node.right = (
+                built.items, built.axis, built.split, built.left, built.right)
+
+    def _remove(self, index):
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.items is not None:
+                if index in node.items:
+                    node.items.remove(index)
+                    return True
+                continue
+            # Points equal to the split value can sit on either side.
+            c = self._columns[node.axis][index]
+            if c <= node.split:
+                stack.append(node.left)
+            if c >= node.split:
+                stack.append(node.right)
+        return False
+
+    def _candidates(self, bounds):
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.items is not None:
+                found.extend(node.items)
+                continue
+            lo, hi = bounds[node.axis]
+            if lo <= node.split:
+                stack.append(node.left)
+            if hi >= node.split:
+                stack.append(node.right)
+        return found
+
+    def nearest(self, point, k=1):
+        """The k nearest points as (distance, index) pairs, nearest first."""
+        q = _query(point, self.dims)
+        heap = []
+        self._nearest(self.root, q, k, heap)
+        return self._ranked(heap)
+
+    def _nearest(self, node, q, k, heap):
+        if node.items is not None:
+            self._offer(heap, k, node.items, q)
+            return
+        diff = q[node.axis] - node.split
+        near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+        self._nearest(near, q, k, heap)
+        if len(heap) < k or diff * diff < -heap[0][0]:
+            self._nearest(far, q, k, heap)
+
+
+class UniformGrid(_Index):
+    """
+    Hashed uniform grid: a dict from integer cell coordinates to the point
+    indices in that cell. Construction, insert and delete are O(1) per
+    point. Queries only visit the cells their bounds overlap, which works
+    best when points are spread fairly evenly at about the cell size.
+    With cell_size=None it is chosen for roughly two points per cell.
+    """
+
+    def __init__(self, points=(), cell_size=None, dims=2):
+        super().__init__(points, dims)
+        self.cell_size = cell_size or self._default_cell_size()
+        if self.cell_size <= 0:
+            raise ValueError("cell_size must be positive.")
+        self._cells = {}
+        for i in range(len(self.points)):
+            self._add(i)
+
+    def _default_cell_size(self):
+        n = len(self.points)
+        extents = [max(column) - min(column) for column in self._columns] if n else []
+        extents = [e for e in extents if e > 0]
+        if not extents:
+            return 1.0
+        return (2 * math.prod(extents) / n) ** (1 / len(extents))
+
+    def _key(self, q):
+        return tuple(math.floor(c / self.cell_size) for c in q)
+
+    def _add(self, index):
+        key = self._key([column[index] for column in self._columns])
+        self._cells.setdefault(key, []).append(index)
+
+    def _remove(self, index):
+        key = self._key([column[index] for column in self._columns])
+        cell = self._cells.get(key)
+        if not cell or index not in cell:
+            return False
+        cell.remove(index)
+        if not cell:
+            del self._cells[key]
+        return True
+
+    def _candidates(self, bounds):
+        ranges = []
+        for lo, hi in bounds:
+            if math.isinf(lo) or math.isinf(hi):
+                ranges.append(None)
+            else:
+                ranges.append(range(math.floor(lo / self.cell_size), math.floor(hi / self.cell_size) + 1))
+        count = math.prod(len(r) if r is not None else math.inf for r in ranges)
+        found = []
+        if count > len(self._cells):
+            # Fewer occupied cells than cells in range: filter the occupied ones.
+            for key, ids in self._cells.items():
+                if all(r is None or k in r for k, r in zip(key, ranges)):
+                    found.extend(ids)
+            return found
+        for key in product(*ranges):
+            found.extend(self._cells.get(key, ()))
+        return found
+
+    def nearest(self, point, k=1):
+        """The k nearest points as (distance, index) pairs, nearest first."""
+        q = _query(point, self.dims)
+        center = self._key(q)
+        heap = []
+        ring = 0
+        while True:
+            # Cells at Chebyshev distance `ring` from the query's cell.
+            cells = (2 * ring + 1) ** self.dims
+            if cells > 2 * len(self._cells):
+                # The rings are now larger than the occupied grid: finish by brute force.
+                heap = []
+                for ids in self._cells.values():
+                    self._offer(heap, k, ids, q)
+                return self._ranked(heap)
+            for offset in product(range(-ring, ring + 1), repeat=self.dims):
+                if max(map(abs, offset)) == ring:
+                    ids = self._cells.get(tuple(c + o for c, o in zip(center, offset)))
+                    if ids:
+                        self._offer(heap, k, ids, q)
+            # Anything outside the rings seen so far is at least ring * cell_size away.
+            if len(heap) == k and -heap[0][0] <= (ring * self.cell_size) ** 2:
+                return self._ranked(heap)
+            ring += 1
+
+
+# from basics import Circle, Point, Rectangle
+# import random
+# points = [Point(random.random(), random.random()) for _ in range(10000)]
+# tree = KDTree(points)
+# print(tree.nearest(Point(0.5, 0.5), k=3))
+# print(len(tree.within_radius(Circle(Point(0.5, 0.5), 0.1))))
+# grid = UniformGrid(points)
+# print(len(grid.within_box(Rectangle(Point(0.2, 0.2), Point(0.4, 0.3)))))
@@ -0,0 +1,24 @@
+"""
+Storage helpers shared by matmul, matrix, tensor and sparse: whether a value
+fits in an array('d') exactly, and packing values into that array or a list.
+"""
+from array import array
+
+# Integers beyond this magnitude are not exactly representable as doubles.
+_EXACT_INT_LIMIT = 2 ** 53
+
+
+def _is_double(x):
+    """True if x can be stored in an array('d') without losing information."""
+    t = type(x)
+    return t is float or ((t is int or t is bool) and -_EXACT_INT_LIMIT <= x <= _EXACT_INT_LIMIT)
+
+
+def _pack(values, typed):
+    """Store values in a contiguous array('d') when typed, else in a flat list."""
+    return array('d', values) if typed else list(values)
+
+
+def _like(buf, values):
+    """Pack values using the same kind of storage as buf."""
+    return array('d', values) if isinstance(buf, array) else list(values)
@@ -0,0 +1,54 @@
+"""
+Timing of the matrix multiplication kernels in matmul.py.
+
+Run `python benchmark_matmul.py` from this directory. For each size it
+prints the time of the old column-indexing comprehension, the blocked
+transposed-operand kernel, and one level of Strassen on top of it. The size
+where Strassen starts winning is the value to use for STRASSEN_THRESHOLD;
+the best tile edge for TILE_SIZE is found the same way.
+"""
+from array import array
+import random
+import time
+
+from matmul import blocked_matmul, matmul
+
+
+def naive_matmul(a, b, n, m, p):
+    """The original triple comprehension, indexing down the columns of B."""
+    return [sum(a[i * m + k] * b[k * p + j] for k in range(m)) for i in range(n) for j in range(p)]
+
+
+def random_buffer(size):
+    return array('d', (random.random() for _ in range(size)))
+
+
+def best_time(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare_kernels(sizes, naive_limit=200):
+    print(f"{'n':>6} {'naive':>10} {'blocked':>10} {'strassen':>10}")
+    for n in sizes:
+        a, b = random_buffer(n * n), random_buffer(n * n)
+        naive = best_time(lambda: naive_matmul(a, b, n, n, n), 1) if n <= naive_limit else float("nan")
+        blocked = best_time(lambda: blocked_matmul(a, b, n, n, n))
+        # threshold=n forces exactly one Strassen level before the blocked kernel.
+        strassen = best_time(lambda: matmul(a, b, n, n, n, threshold=n))
+        print(f"{n:>6} {naive:>10.4f} {blocked:>10.4f} {strassen:>10.4f}")
+
+
+def compare_tiles(n, tiles):
+    a, b = random_buffer(n * n), random_buffer(n * n)
+    print(f"tile sweep at n={n}")
+    for tile in tiles:
+        print(f"{tile:>6} {best_time(lambda: blocked_matmul(a, b, n, n, n, tile)):>10.4f}")
+
+
+compare_kernels([32, 64, 128, 192, 256, 384, 512])
+compare_tiles(256, [16, 32, 64, 128, 256])
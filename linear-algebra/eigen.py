@@ -1,40 +1,632 @@
-
-
-
-
-
 from matrix import Matrix
-from vector import gram_schmidt
+from matmul import matmul
+from solvers import as_operator, gmres, ilu0
+from sparse import COOMatrix, SparseMatrix
+from operator import mul
+import cmath
+import math
+import random
 
 def power_iteration(A, num_iter=100, tol=1e-10):
-    rows, cols = A.dimension
-    if rows != cols:
-        raise ValueError("Matrix must be square.")
-    b = Matrix([[1] for _ in range(rows)])
+    """
+    Dominant eigenpair by repeated multiplication. A may be a Matrix, a
+    SparseMatrix or anything else as_operator accepts. The eigenvalue is
+    the Rayleigh quotient of the unit iterate.
+    """
+    from vector import Vector
+    matvec, n = as_operator(A)
+    b = [1 / math.sqrt(n)] * n
+    eigenvalue = 0.0
     for _ in range(num_iter):
-        b_next = A * b
-        b_next = b_next * (1 / b_next.to_vector().norm())
-        if (b_next - b).to_vector().norm() < tol:
+        Ab = matvec(b)
+        eigenvalue = sum(map(mul, b, Ab))
+        norm = math.sqrt(sum(map(mul, Ab, Ab)))
+        if norm == 0:
             break
+        b_next = [x / norm for x in Ab]
+        # A negative dominant eigenvalue flips the sign of every iterate.
+        change = min(math.sqrt(sum((p - q) ** 2 for p, q in zip(b_next, b))),
+                     math.sqrt(sum((p + q) ** 2 for p, q in zip(b_next, b))))
         b = b_next
-    eigenvalue = (A * b).data[0][0] / b.data[0][0]
-    return eigenvalue, b.to_vector()
+        if change < tol:
+            eigenvalue = sum(map(mul, b, matvec(b)))
+            break
+    return eigenvalue, Vector(list(b))
+
+def _householder(x):
+    """
+    Reflector I - beta v v^T that maps x onto a multiple of e_1.
+    Returns (v, beta, alpha) where alpha is the resulting first entry.
+    """
+    if not any(x[1:]):
+        return None, 0.0, x[0]
+    # Scale first so tiny entries cannot underflow in the squares.
+    scale = max(map(abs, x))
+    v = [xi / scale for xi in x]
+    norm = math.sqrt(sum(map(mul, v, v)))
+    alpha = -math.copysign(norm, v[0])
+    v[0] -= alpha
+    return v, 2.0 / sum(map(mul, v, v)), alpha * scale
 
 def qr_decomposition(A):
+    """
+    Thin QR factorization A = QR by Householder reflections, which stay
+    orthogonal to working precision where Gram-Schmidt does not.
+    """
+    return A._memo("qr", _householder_qr, A)
+
+def _householder_qr(A):
     rows, cols = A.dimension
-    vectors = [Matrix([[A.data[row][i]] for row in range(rows)]).to_vector() for i in range(cols)]
-    Q = gram_schmidt(vectors)
-    R = [[q.dot(Matrix([[A.data[row][j]] for row in range(rows)]).to_vector()) if i <= j else 0 for j in range(cols)] for i, q in enumerate(Q)]
-    return Matrix([q.data for q in Q]), Matrix(R)
+    k = min(rows, cols)
+    # Work on the columns of A as contiguous lists.
+    columns = [[float(x) for x in A.col(j)] for j in range(cols)]
+    reflectors = []
+    for j in range(k):
+        v, beta, alpha = _householder(columns[j][j:])
+        reflectors.append((v, beta))
+        if v is None:
+            continue
+        columns[j][j:] = [alpha] + [0.0] * (rows - j - 1)
+        for col in columns[j + 1:]:
+            t = beta * sum(map(mul, v, col[j:]))
+            col[j:] = [c - t * vi for c, vi in zip(col[j:], v)]
+    R = Matrix([[columns[j][i] if i <= j else 0 for j in range(cols)] for i in range(k)])
+    # Q = H_0 H_1 ... H_{k-1} applied to the first k columns of the identity.
+    q_columns = [[1.0 if i == j else 0.0 for i in range(rows)] for j in range(k)]
+    for j in range(k - 1, -1, -1):
+        v, beta = reflectors[j]
+        if v is None:
+            continue
+        for col in q_columns:
+            t = beta * sum(map(mul, v, col[j:]))
+            col[j:] = [c - t * vi for c, vi in zip(col[j:], v)]
+    return Matrix.transpose(Matrix(q_columns)), R
+
+def _is_symmetric(rows, tol):
+    n = len(rows)
+    scale = max((abs(x) for row in rows for x in row), default=0.0)
+    return all(abs(rows[i][j] - rows[j][i]) <= tol * scale for i in range(n) for j in range(i))
+
+def _reflect_rows(M, v, beta, first, start):
+    """Rows first.. of M (columns start..) become (I - beta v v^T) times themselves."""
+    block = M[first:first + len(v)]
+    # u = v^T M, one C-level dot product per column of the block.
+    u = [beta * sum(map(mul, v, col)) for col in zip(*(row[start:] for row in block))]
+    for vi, row in zip(v, block):
+        if vi != 0:
+            row[start:] = [a - vi * b for a, b in zip(row[start:], u)]
+
+def _hessenberg(H, Qt):
+    """
+    Reduce H (list of rows, modified in place) to upper Hessenberg form by
+    Householder similarity transforms. If Qt is given (rows = I initially),
+    it is left-multiplied by every reflector so it ends up as Q^T, where
+    A = Q H Q^T.
+    """
+    n = len(H)
+    for k in range(n - 2):
+        v, beta, alpha = _householder([H[i][k] for i in range(k + 1, n)])
+        if v is None:
+            continue
+        _reflect_rows(H, v, beta, k + 1, k)
+        if Qt is not None:
+            _reflect_rows(Qt, v, beta, k + 1, 0)
+        # Right: every row of H times (I - beta v v^T) on columns k+1..
+        for row in H:
+            t = beta * sum(map(mul, row[k + 1:], v))
+            if t != 0:
+                row[k + 1:] = [a - t * vj for a, vj in zip(row[k + 1:], v)]
+        H[k + 1][k] = alpha
+        for i in range(k + 2, n):
+            H[i][k] = 0.0
+
+def _tridiagonalize(S, Qt):
+    """
+    Symmetric counterpart of _hessenberg: each reflector is applied as the
+    rank-2 update S <- S - v w^T - w v^T on the trailing block, about a
+    third of the work of a general reduction. Returns the diagonal and
+    off-diagonal of the tridiagonal result.
+    """
+    n = len(S)
+    off = []
+    for k in range(n - 2):
+        v, beta, alpha = _householder([S[i][k] for i in range(k + 1, n)])
+        off.append(alpha)
+        if v is None:
+            continue
+        block = [row[k + 1:] for row in S[k + 1:]]
+        p = [beta * sum(map(mul, row, v)) for row in block]
+        K = beta / 2 * sum(map(mul, p, v))
+        w = [pi - K * vi for pi, vi in zip(p, v)]
+        for i, (row, vi, wi) in enumerate(zip(block, v, w), k + 1):
+            S[i][k + 1:] = [a - vi * wj - wi * vj for a, vj, wj in zip(row, v, w)]
+        if Qt is not None:
+            _reflect_rows(Qt, v, beta, k + 1, 0)
+    if n > 1:
+        off.append(S[n - 1][n - 2])
+    return [S[i][i] for i in range(n)], off
+
+def _tridiagonal_qr(d, e, Zt, num_iter, tol):
+    """
+    Implicit symmetric QL iteration with Wilkinson-style shifts on the
+    tridiagonal matrix with diagonal d and off-diagonal e (e[i] couples i
+    and i+1). Each sweep is O(n); eigenvalues are left in d. When Zt is
+    given, its rows are rotated along and end up as the eigenvectors.
+    """
+    n = len(d)
+    e.append(0.0)
+    for l in range(n):
+        iterations = 0
+        while True:
+            # Deflate: look for a negligible off-diagonal entry at or below l.
+            m = l
+            while m < n - 1:
+                if abs(e[m]) <= tol * (abs(d[m]) + abs(d[m + 1])):
+                    break
+                m += 1
+            if m == l:
+                break
+            iterations += 1
+            if iterations > num_iter:
+                raise ValueError("QR iteration did not converge.")
+            # Shift from the leading 2x2 block, chasing the bulge from m up to l.
+            g = (d[l + 1] - d[l]) / (2 * e[l])
+            r = math.hypot(g, 1.0)
+            g = d[m] - d[l] + e[l] / (g + math.copysign(r, g))
+            s = c = 1.0
+            p = 0.0
+            for i in range(m - 1, l - 1, -1):
+                f = s * e[i]
+                b = c * e[i]
+                r = math.hypot(f, g)
+                e[i + 1] = r
+                if r == 0:
+                    d[i + 1] -= p
+                    e[m] = 0.0
+                    break
+                s, c = f / r, g / r
+                g = d[i + 1] - p
+                r = (d[i] - g) * s + 2 * c * b
+                p = s * r
+                d[i + 1] = g + p
+                g = c * r - b
+                if Zt is not None:
+                    zi, zj = Zt[i], Zt[i + 1]
+                    Zt[i + 1] = [s * a + c * b for a, b in zip(zi, zj)]
+                    Zt[i] = [c * a - s * b for a, b in zip(zi, zj)]
+            else:
+                d[l] -= p
+                e[l] = g
+                e[m] = 0.0
+    e.pop()
+
+def _francis_qr(H, Zt, num_iter, tol):
+    """
+    Francis double-shift QR iteration on a real upper Hessenberg matrix
+    until it is quasi-triangular (a real Schur form): 1x1 blocks for real
+    eigenvalues, 2x2 blocks for complex conjugate pairs. Each step applies
+    both roots of the trailing 2x2 block as shifts at once by chasing a
+    3x3 Householder bulge down the active window, so it stays in real
+    arithmetic. With Zt, the Schur vectors are accumulated in its rows and
+    H is updated in full so it remains a valid Schur form.
+    """
+    n = len(H)
+    full = Zt is not None
+    norm = max((abs(x) for row in H for x in row), default=0.0) or 1.0
+    hi = n - 1
+    iterations = 0
+
+    def negligible(i):
+        return abs(H[i][i - 1]) <= tol * ((abs(H[i][i]) + abs(H[i - 1][i - 1])) or norm)
 
-def qr_iteration(A, num_iter=100, tol=1e-10):
+    def reflect3(rows, v0, v1, v2, start, stop):
+        """Rows rows[0:3] (columns start:stop) become (I - v v^T) times themselves."""
+        r0, r1, r2 = rows[0][start:stop], rows[1][start:stop], rows[2][start:stop]
+        u = [v0 * a + v1 * b + v2 * c for a, b, c in zip(r0, r1, r2)]
+        rows[0][start:stop] = [a - v0 * t for a, t in zip(r0, u)]
+        rows[1][start:stop] = [a - v1 * t for a, t in zip(r1, u)]
+        rows[2][start:stop] = [a - v2 * t for a, t in zip(r2, u)]
+
+    def reflect2(rows, v0, v1, start, stop):
+        r0, r1 = rows[0][start:stop], rows[1][start:stop]
+        u = [v0 * a + v1 * b for a, b in zip(r0, r1)]
+        rows[0][start:stop] = [a - v0 * t for a, t in zip(r0, u)]
+        rows[1][start:stop] = [a - v1 * t for a, t in zip(r1, u)]
+
+    while hi > 0:
+        lo = hi
+        while lo > 0 and not negligible(lo):
+            lo -= 1
+        if lo > 0:
+            H[lo][lo - 1] = 0.0
+        if lo >= hi - 1:
+            # A 1x1 or 2x2 block has split off the bottom.
+            hi = lo - 1
+            iterations = 0
+            continue
+        iterations += 1
+        if iterations > num_iter:
+            raise ValueError("QR iteration did not converge.")
+        # Shifts: the roots of the trailing 2x2 block, passed as their sum
+        # and product. Every 10th step uses an exceptional shift to break cycles.
+        if iterations % 10 == 0:
+            w = abs(H[hi][hi - 1]) + abs(H[hi - 1][hi - 2])
+            diagonal = 0.75 * w + H[hi][hi]
+            trace, det = 2 * diagonal, diagonal * diagonal + 0.4375 * w * w
+        else:
+            a, b, c, d = H[hi - 1][hi - 1], H[hi - 1][hi], H[hi][hi - 1], H[hi][hi]
+            trace, det = a + d, a * d - b * c
+        # First column of (H - mu1 I)(H - mu2 I); only three entries are nonzero.
+        h00, h01, h10, h11, h21 = H[lo][lo], H[lo][lo + 1], H[lo + 1][lo], H[lo + 1][lo + 1], H[lo + 2][lo + 1]
+        x = h00 * h00 + h01 * h10 - trace * h00 + det
+        y = h10 * (h00 + h11 - trace)
+        z = h10 * h21
+        col_end = n if full else hi + 1
+        row_start = 0 if full else lo
+        for k in range(lo, hi - 1):
+            v, beta, alpha = _householder([x, y, z])
+            if v is not None:
+                # Fold beta into v: I - beta v v^T = I - w w^T with w = sqrt(beta) v.
+                root = math.sqrt(beta)
+                v0, v1, v2 = v[0] * root, v[1] * root, v[2] * root
+                reflect3(H[k:k + 3], v0, v1, v2, max(lo, k - 1), col_end)
+                if k > lo:
+                    H[k][k - 1], H[k + 1][k - 1], H[k + 2][k - 1] = alpha, 0.0, 0.0
+                # Right: columns k..k+2 of every row the bulge can reach.
+                k1, k2 = k + 1, k + 2
+                for row in H[row_start:min(k + 4, hi + 1)]:
+                    p, q, r = row[k], row[k1], row[k2]
+                    t = v0 * p + v1 * q + v2 * r
+                    row[k] = p - t * v0
+                    row[k1] = q - t * v1
+                    row[k2] = r - t * v2
+                if full:
+                    reflect3(Zt[k:k + 3], v0, v1, v2, 0, n)
+            x, y = H[k + 1][k], H[k + 2][k]
+            if k < hi - 2:
+                z = H[k + 3][k]
+        # The last reflector only spans rows hi-1 and hi.
+        v, beta, alpha = _householder([x, y])
+        if v is not None:
+            root = math.sqrt(beta)
+            v0, v1 = v[0] * root, v[1] * root
+            reflect2(H[hi - 1:hi + 1], v0, v1, hi - 2, col_end)
+            H[hi - 1][hi - 2], H[hi][hi - 2] = alpha, 0.0
+            for row in H[row_start:hi + 1]:
+                p, q = row[hi - 1], row[hi]
+                t = v0 * p + v1 * q
+                row[hi - 1] = p - t * v0
+                row[hi] = q - t * v1
+            if full:
+                reflect2(Zt[hi - 1:hi + 1], v0, v1, 0, n)
+
+def _block_eigenvalues(a, b, c, d):
+    """Both eigenvalues of the 2x2 block [[a, b], [c, d]]."""
+    half = (a + d) / 2
+    root = cmath.sqrt((a - d) * (a - d) / 4 + b * c)
+    return half + root, half - root
+
+def _triangularize_blocks(T, Zt):
+    """
+    Turn a real Schur form into a complex triangular one: each 2x2 block is
+    rotated by a unitary Q whose first column is an eigenvector of the
+    block, T <- Q^H T Q, and Z <- Z Q is applied to the rows of Zt.
+    """
+    n = len(T)
+    i = 0
+    while i < n - 1:
+        if T[i + 1][i] == 0:
+            i += 1
+            continue
+        a, b, c, d = T[i][i], T[i][i + 1], T[i + 1][i], T[i + 1][i + 1]
+        lam = _block_eigenvalues(a, b, c, d)[0]
+        x1, x2 = (b, lam - a) if abs(b) >= abs(c) else (lam - d, c)
+        norm = math.sqrt(abs(x1) ** 2 + abs(x2) ** 2)
+        x1, x2 = x1 / norm, x2 / norm
+        c1, c2 = x1.conjugate(), x2.conjugate()
+        p, q = T[i], T[i + 1]
+        T[i] = [c1 * u + c2 * w for u, w in zip(p, q)]
+        T[i + 1] = [x1 * w - x2 * u for u, w in zip(p, q)]
+        for row in T:
+            u, w = row[i], row[i + 1]
+            row[i], row[i + 1] = u * x1 + w * x2, w * c1 - u * c2
+        T[i + 1][i] = 0j
+        p, q = Zt[i], Zt[i + 1]
+        Zt[i] = [x1 * u + x2 * w for u, w in zip(p, q)]
+        Zt[i + 1] = [c1 * w - c2 * u for u, w in zip(p, q)]
+        i += 2
+
+def _schur_eigenvectors(T, tol):
+    """Eigenvectors of an upper triangular T by back substitution, one per row."""
+    n = len(T)
+    scale = max(abs(T[i][j]) for i in range(n) for j in range(i, n)) or 1.0
+    vectors = []
+    for k in range(n):
+        lam = T[k][k]
+        y = [0j] * n
+        y[k] = 1 + 0j
+        for j in range(k - 1, -1, -1):
+            denom = T[j][j] - lam
+            if abs(denom) < tol * scale:
+                denom = tol * scale
+            y[j] = -sum(map(mul, T[j][j + 1:k + 1], y[j + 1:k + 1])) / denom
+        vectors.append(y)
+    return vectors
+
+def _clean(z, tol):
+    """Drop an imaginary part that is only rounding noise."""
+    return z.real if abs(z.imag) <= tol * max(abs(z), 1.0) else z
+
+def _normalized(v, tol):
+    norm = math.sqrt(sum(abs(x) ** 2 for x in v))
+    return [_clean(x / norm, tol) for x in v]
+
+def qr_iteration(A, num_iter=100, tol=1e-10, eigenvectors=False):
+    """
+    All eigenvalues of a square matrix, largest first (by real part).
+
+    The matrix is reduced once to Hessenberg form, then iterated with
+    shifted QR steps and deflation: Francis double-shift steps in real
+    arithmetic for a general matrix, the tridiagonal fast path for a
+    symmetric one. num_iter bounds the steps spent on any single eigenvalue.
+    The cost is O(n^3) in pure Python; a general 200x200 matrix takes about
+    2.5 s and 300x300 about 8 s, so expect over half a minute at 500x500.
+    With eigenvectors=True, returns (eigenvalues, V) with the unit
+    eigenvectors as the columns of V.
+    """
     rows, cols = A.dimension
     if rows != cols:
         raise ValueError("Matrix must be square.")
-   
+    n = rows
+    H = [[float(x) for x in row] for row in A.data]
+    Qt = [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)] if eigenvectors else None
+    if _is_symmetric(H, tol):
+        values, off_diagonal = _tridiagonalize(H, Qt)
+        _tridiagonal_qr(values, off_diagonal, Qt, num_iter, tol)
+        vectors = Qt
+    else:
+        _hessenberg(H, Qt)
+        _francis_qr(H, Qt, num_iter, tol)
+        values = []
+        i = 0
+        while i < n:
+            if i < n - 1 and H[i + 1][i] != 0:
+                values += [_clean(lam, tol) for lam in _block_eigenvalues(H[i][i], H[i][i + 1], H[i + 1][i], H[i + 1][i + 1])]
+                i += 2
+            else:
+                values.append(H[i][i])
+                i += 1
+        if eigenvectors:
+            H = [[complex(x) for x in row] for row in H]
+            Zt = [[complex(x) for x in row] for row in Qt]
+            _triangularize_blocks(H, Zt)
+            values = [_clean(H[i][i], tol) for i in range(n)]
+            # Eigenvector k is Z y_k, i.e. row k of Y^T Z^T.
+            Y = _schur_eigenvectors(H, tol)
+            flat = matmul([x for y in Y for x in y], [x for z in Zt for x in z], n, n, n)
+            vectors = [flat[k * n:(k + 1) * n] for k in range(n)]
+    order = sorted(range(n), key=lambda i: (-values[i].real, -values[i].imag if isinstance(values[i], complex) else 0))
+    eigenvalues = [values[i] for i in order]
+    if not eigenvectors:
+        return eigenvalues
+    V = Matrix.transpose(Matrix([_normalized(vectors[i], tol) for i in order]))
+    return eigenvalues, V
 
 
+def _operator_is_symmetric(A, tol):
+    if isinstance(A, Matrix):
+        return _is_symmetric([list(row) for row in A.data], tol)
+    if isinstance(A, SparseMatrix):
+        t = SparseMatrix.transpose(A)
+        if list(t.indptr) != list(A.indptr) or list(t.indices) != list(A.indices):
+            return False
+        scale = max(map(abs, A.values), default=0.0)
+        return all(abs(a - b) <= tol * scale for a, b in zip(A.values, t.values))
+    return False
 
+def _shift_invert(A, matvec, n, sigma, tol):
+    """
+    r -> (A - sigma I)^-1 r. A dense Matrix is factored once; anything else
+    is solved with GMRES on every application (ILU(0)-preconditioned when
+    the entries are available).
+    """
+    if isinstance(A, Matrix):
+        f = A.flat()
+        shifted = Matrix.from_flat([float(x) - sigma if i % (n + 1) == 0 else float(x)
+                                    for i, x in enumerate(f)], n, n)
+        lu = Matrix.lu(shifted)
+        if lu.singular:
+            raise ValueError("The shift is an eigenvalue; choose a different sigma.")
+        return lambda x: list(lu.solve(Matrix.from_flat(list(x), n, 1)).flat())
+    if isinstance(A, SparseMatrix):
+        builder = COOMatrix(n, n)
+        for i in range(n):
+            builder.append(i, i, -sigma)
+        shifted = A + builder.tocsr()
+        try:
+            M = ilu0(shifted)
+        except ValueError:
+            M = None
+    else:
+        shifted = lambda x: [a - sigma * b for a, b in zip(matvec(x), x)]
+        M = None
+
+    def apply(x):
+        result = gmres(shifted, x, tol=tol, restart=50, preconditioner=M)
+        if not result.converged:
+            raise ValueError("Shift-invert solve did not converge.")
+        return list(result.x)
+    return apply
+
+def _implicit_qr_step(H, Q, shifts, symmetric):
+    """
+    One implicit QR step on the small Hessenberg matrix H with one real
+    shift or a conjugate pair (Francis double shift, so arithmetic stays
+    real): a reflector built from the first column of p(H) creates a bulge
+    that is chased down the subdiagonal. H <- P^T H P keeps its shape
+    exactly, and P is accumulated into the columns of Q.
+    """
+    m = len(H)
+    if len(shifts) == 1:
+        x = [H[0][0] - shifts[0], H[1][0]]
+    else:
+        s, t = 2 * shifts[0].real, abs(shifts[0]) ** 2
+        x = [H[0][0] * H[0][0] + H[0][1] * H[1][0] - s * H[0][0] + t,
+             H[1][0] * (H[0][0] + H[1][1] - s),
+             H[1][0] * H[2][1] if m > 2 else 0.0]
+    for k in range(m - 1):
+        if k > 0:
+            x = [H[i][k - 1] for i in range(k, min(k + len(shifts) + 1, m))]
+        x = x[:m - k]
+        v, beta, alpha = _householder(x)
+        if v is None:
+            continue
+        _reflect_rows(H, v, beta, k, max(k - 1, 0))
+        if k > 0:
+            H[k][k - 1] = alpha
+            for i in range(k + 1, k + len(v)):
+                H[i][k - 1] = 0.0
+        for M in (H, Q):
+            for row in M:
+                t = beta * sum(map(mul, row[k:k + len(v)], v))
+                if t != 0:
+                    row[k:k + len(v)] = [a - t * vj for a, vj in zip(row[k:k + len(v)], v)]
+    if symmetric:
+        for i in range(m):
+            for j in range(m):
+                if abs(i - j) > 1:
+                    H[i][j] = 0.0
+        for i in range(1, m):
+            H[i][i - 1] = H[i - 1][i] = (H[i][i - 1] + H[i - 1][i]) / 2
+
+def _orthogonalize(w, V):
+    """Classical Gram-Schmidt against the basis V, done twice (DGKS) for stability."""
+    h = [0.0] * len(V)
+    if not V:
+        return h, w
+    for _ in range(2):
+        c = [sum(map(mul, v, w)) for v in V]
+        w = [wi - sum(map(mul, c, col)) for wi, col in zip(w, zip(*V))]
+        h = [a + b for a, b in zip(h, c)]
+    return h, w
+
+def _extend(matvec, V, H, f, m, symmetric, rng):
+    """
+    Grow the Arnoldi (Lanczos when symmetric) factorization
+    A V = V H + f e^T from len(V) to m basis vectors. Returns the new f.
+    If f vanishes the Krylov space is invariant and a fresh random
+    direction is orthogonalized in, with a zero coupling in H.
+    """
+    n = len(f)
+    scale = math.sqrt(sum(map(mul, f, f)))
+    while len(V) < m:
+        j = len(V)
+        beta = math.sqrt(sum(map(mul, f, f)))
+        if j > 0 and beta <= 1e-12 * scale:
+            _, f = _orthogonalize([rng.uniform(-1, 1) for _ in range(n)], V)
+            f_norm = math.sqrt(sum(map(mul, f, f)))
+            V.append([x / f_norm for x in f])
+            beta = 0.0
+        else:
+            V.append([x / beta for x in f])
+        if j > 0:
+            H[j][j - 1] = beta
+            if symmetric:
+                H[j - 1][j] = beta
+        w = matvec(V[j])
+        scale = math.sqrt(sum(map(mul, w, w)))
+        h, f = _orthogonalize(w, V)
+        if symmetric:
+            # Lanczos: only the three-term recurrence survives; the full
+            # reorthogonalization above just keeps V orthogonal in floating point.
+            H[j][j] = h[j]
+        else:
+            for i in range(j + 1):
+                H[i][j] = h[i]
+    return f
+
+def _ritz(H):
+    """Ritz values and unit vectors (rows) of the projected matrix, by magnitude."""
+    values, Y = qr_iteration(Matrix(H), num_iter=200, tol=1e-13, eigenvectors=True)
+    order = sorted(range(len(values)), key=lambda i: -abs(values[i]))
+    rows = Matrix.transpose(Y).data
+    return [values[i] for i in order], [list(rows[i]) for i in order]
+
+def top_k_eigen(A, k, which="largest", sigma=None, symmetric=None, n=None,
+                ncv=None, tol=1e-10, max_restarts=300, v0=None):
+    """
+    The k eigenpairs of A of largest (or smallest) magnitude, using only
+    products A x: implicitly restarted Lanczos for symmetric A, Arnoldi
+    otherwise. A may be a Matrix, a SparseMatrix or a callable x -> A x
+    (which needs n; symmetric is then False unless given).
+
+    With sigma, runs in shift-invert mode on (A - sigma I)^-1 and returns
+    the k eigenvalues closest to sigma instead; which='smallest' is
+    shift-invert about 0. ncv is the size of the Krylov basis kept between
+    restarts (default max(2k + 1, 20)). Returns (eigenvalues, V) with the
+    unit eigenvectors as the columns of V, largest first (nearest sigma
+    first in shift-invert mode).
+    """
+    if which not in ("largest", "smallest"):
+        raise ValueError("which must be 'largest' or 'smallest'.")
+    matvec, n = as_operator(A, n)
+    if not 1 <= k <= n:
+        raise ValueError("k must be between 1 and the size of the operator.")
+    if symmetric is None:
+        symmetric = _operator_is_symmetric(A, 1e-12)
+    if which == "smallest" and sigma is None:
+        sigma = 0.0
+    op = matvec if sigma is None else _shift_invert(A, matvec, n, float(sigma), tol * 1e-2)
+    m = min(n, ncv or max(2 * k + 1, 20))
+    if m <= k and m < n:
+        raise ValueError("ncv must be larger than k.")
+    rng = random.Random(0)
+    f = [float(x) for x in v0] if v0 is not None else [rng.uniform(-1, 1) for _ in range(n)]
+    V = []
+    H = [[0.0] * m for _ in range(m)]
+    for _ in range(max_restarts):
+        f = _extend(op, V, H, f, m, symmetric, rng)
+        beta = math.sqrt(sum(map(mul, f, f)))
+        values, Y = _ritz(H)
+        # Residual of Ritz pair (theta, V y) is |beta| * |last entry of y|.
+        floor = max(abs(values[0]), 1e-300) * 1e-14
+        converged = sum(beta * abs(Y[i][-1]) <= tol * max(abs(values[i]), floor) for i in range(k))
+        if converged == k:
+            break
+        # As in ARPACK, keep a few extra vectors once some pairs have
+        # converged, and keep a conjugate pair together so the double shifts
+        # stay real.
+        kk = k + min(converged, (m - k) // 2)
+        if kk < m and isinstance(values[kk], complex) and abs(values[kk] - values[kk - 1].conjugate()) <= 1e-12 * abs(values[kk]):
+            kk += 1
+        if kk >= m:
+            # No room left to restart (ncv == k + 1 with a conjugate pair at k).
+            raise ValueError("Restarted Krylov iteration did not converge; try a larger ncv.")
+        Q = [[1.0 if i == j else 0.0 for j in range(m)] for i in range(m)]
+        for mu in values[kk:]:
+            if not isinstance(mu, complex):
+                _implicit_qr_step(H, Q, [mu], symmetric)
+            elif mu.imag > 0:
+                _implicit_qr_step(H, Q, [mu, mu.conjugate()], symmetric)
+            # mu.imag < 0 was applied together with its conjugate.
+        # Restart: A (V Q_kk) = (V Q_kk) H_kk + f_new e^T.
+        cols = matmul([Q[i][j] for j in range(kk + 1) for i in range(m)],
+                      [x for v in V for x in v], kk + 1, m, n)
+        V = [list(cols[j * n:(j + 1) * n]) for j in range(kk + 1)]
+        f = [H[kk][kk - 1] * a + Q[m - 1][kk - 1] * b for a, b in zip(V.pop(), f)]
+        for i in range(m):
+            for j in range(m):
+                if i >= kk or j >= kk:
+                    H[i][j] = 0.0
+    else:
+        raise ValueError("Restarted Krylov iteration did not converge.")
+    values, Y = values[:k], Y[:k]
+    flat = matmul([x for y in Y for x in y], [x for v in V for x in v], k, len(V), n)
+    vectors = [_normalized(flat[i * n:(i + 1) * n], tol) for i in range(k)]
+    if sigma is not None:
+        values = [sigma + 1 / theta for theta in values]
+    values = [_clean(x, tol) if isinstance(x, complex) else x for x in values]
+    return values, Matrix.transpose(Matrix(vectors))
 
 
 A = Matrix([[4, 1], [1, 3]])
@@ -44,6 +636,9 @@ A = Matrix([[4, 1], [1, 3]])
 # print(eigenvalue)
 # print(eigenvector)
 
+# print("Two largest eigenpairs (Lanczos):")
+# print(top_k_eigen(A, 2))
+
 # print("QR Decomposition:")
 # Q, R = qr_decomposition(A)
 # print(Q)
@@ -0,0 +1,179 @@
+from array import array
+from itertools import combinations
+import math
+
+from matmul import matmul
+from tensor import Tensor
+
+# Above this many operands the exhaustive planner (O(3^n) subsets) gives way
+# to a greedy one.
+OPTIMAL_PLAN_LIMIT = 8
+
+
+def _parse(spec, count):
+    """Split 'ij,jk->ik' into input terms and the output term."""
+    spec = spec.replace(" ", "")
+    if "->" in spec:
+        inputs, output = spec.split("->")
+    else:
+        inputs, output = spec, None
+    terms = inputs.split(",")
+    if len(terms) != count:
+        raise ValueError("Number of einsum terms does not match number of tensors.")
+    letters = inputs.replace(",", "")
+    if not letters.isalpha() and letters:
+        raise ValueError("Einsum labels must be letters.")
+    if output is None:
+        # Implicit mode: labels that occur exactly once, in alphabetical order.
+        output = "".join(sorted(c for c in set(letters) if letters.count(c) == 1))
+    if len(set(output)) != len(output):
+        raise ValueError("Output labels must be distinct.")
+    if any(c not in letters for c in output):
+        raise ValueError("Output label does not appear in any input.")
+    return terms, output
+
+
+def _sizes(terms, shapes):
+    sizes = {}
+    for term, shape in zip(terms, shapes):
+        if len(term) != len(shape):
+            raise ValueError(f"Term '{term}' does not match a tensor of shape {tuple(shape)}.")
+        for label, dim in zip(term, shape):
+            if sizes.setdefault(label, dim) != dim:
+                raise ValueError(f"Inconsistent size for label '{label}'.")
+    return sizes
+
+
+def _kept(labels, others, output):
+    """Labels of an intermediate that are still needed by the output or other operands."""
+    return "".join(c for c in dict.fromkeys(labels) if c in output or any(c in o for o in others))
+
+
+def contraction_order(spec, *shapes):
+    """
+    Plan a pairwise contraction order for an einsum over tensors of the given
+    shapes. Returns (steps, flops): each step is a pair of tuples of
+    original operand indices whose partial results are contracted, in
+    execution order. The cost of a step is the product of the sizes of every
+    label it touches; the plan minimizes the sum, exhaustively over subsets
+    for up to OPTIMAL_PLAN_LIMIT operands, greedily beyond that.
+    """
+    terms, output = _parse(spec, len(shapes))
+    sizes = _sizes(terms, shapes)
+    n = len(terms)
+
+    def labels_of(group):
+        inside = "".join(terms[i] for i in group)
+        outside = [terms[i] for i in range(n) if i not in group]
+        return _kept(inside, outside, output)
+
+    def step_cost(left, right):
+        return math.prod(sizes[c] for c in set(labels_of(left)) | set(labels_of(right)))
+
+    if n < 2:
+        return [], 0
+    if n <= OPTIMAL_PLAN_LIMIT:
+        # best[group] = (total cost, steps) for contracting the operands in group.
+        best = {(i,): (0, []) for i in range(n)}
+        for size in range(2, n + 1):
+            for group in combinations(range(n), size):
+                options = []
+                rest = group[1:]
+                # Split off every subset containing group[0] once, so each
+                # unordered split is considered exactly once.
+                for k in range(0, size - 1):
+                    for others in combinations(rest, k):
+                        left = (group[0],) + others
+                        right = tuple(i for i in group if i not in left)
+                        cost = best[left][0] + best[right][0] + step_cost(left, right)
+                        options.append((cost, best[left][1] + best[right][1] + [(left, right)]))
+                best[group] = min(options, key=lambda option: option[0])
+        cost, steps = best[tuple(range(n))]
+        return steps, cost
+    groups = [(i,) for i in range(n)]
+    steps, total = [], 0
+    while len(groups) > 1:
+        cost, left, right = min((step_cost(a, b), a, b) for a, b in combinations(groups, 2))
+        groups = [g for g in groups if g not in (left, right)] + [tuple(sorted(left + right))]
+        steps.append((left, right))
+        total += cost
+    return steps, total
+
+
+def _prepare(t, term, keep):
+    """Take diagonals for repeated labels and sum out labels nobody else needs."""
+    term = list(term)
+    for label in dict.fromkeys(term):
+        while term.count(label) > 1:
+            first = term.index(label)
+            second = term.index(label, first + 1)
+            t = t.diagonal(first, second)
+            term = [c for i, c in enumerate(term) if i not in (first, second)] + [label]
+    dropped = [i for i, c in enumerate(term) if c not in keep]
+    if dropped:
+        t = t.sum(dropped)
+        term = [c for c in term if c in keep]
+        if not term:
+            t = Tensor.from_flat([t], [])
+    return t, "".join(term)
+
+
+def _contract_pair(a, la, b, lb, keep):
+    """
+    Contract two operands as a batched matrix product: a is arranged as
+    (batch, left, summed) and b as (batch, summed, right), and every batch
+    goes through the blocked matmul kernel.
+    """
+    shared = [c for c in la if c in lb]
+    batch = [c for c in shared if c in keep]
+    summed = [c for c in shared if c not in keep]
+    left = [c for c in la if c not in lb]
+    right = [c for c in lb if c not in la]
+    dims = dict(zip(la, a.shape))
+    dims.update(zip(lb, b.shape))
+    B, L, C, R = (math.prod(dims[c] for c in group) for group in (batch, left, summed, right))
+    fa = a.transpose([la.index(c) for c in batch + left + summed]).flat()
+    fb = b.transpose([lb.index(c) for c in batch + summed + right]).flat()
+    typed = isinstance(fa, array) and isinstance(fb, array)
+    out = array('d') if typed else []
+    for k in range(B):
+        out.extend(matmul(fa[k * L * C:(k + 1) * L * C], fb[k * C * R:(k + 1) * C * R], L, C, R))
+    labels = "".join(batch + left + right)
+    return Tensor.from_flat(out, [dims[c] for c in labels]), labels
+
+
+def einsum(spec, *tensors):
+    """
+    Einstein summation over Tensors, e.g. 'ij,jk->ik' (matrix product),
+    'bij,bjk->bik' (batched), 'ii->' (trace), 'i,j->ij' (outer product),
+    'ij,jk,kl->il' (chain). Repeated labels are summed; without '->' the
+    output holds the labels that appear once, in alphabetical order.
+    Multi-operand expressions are contracted pairwise in the order chosen
+    by contraction_order. A scalar result is returned as a number.
+    """
+    terms, output = _parse(spec, len(tensors))
+    _sizes(terms, [t.shape for t in tensors])
+    operands = {}
+    for i, (t, term) in enumerate(zip(tensors, terms)):
+        others = terms[:i] + terms[i + 1:]
+        operands[(i,)] = _prepare(t, term, _kept(term, others, output))
+    steps, _ = contraction_order(spec, *[t.shape for t in tensors])
+    for left, right in steps:
+        group = tuple(sorted(left + right))
+        outside = [terms[i] for i in range(len(terms)) if i not in group]
+        (a, la), (b, lb) = operands.pop(left), operands.pop(right)
+        operands[group] = _contract_pair(a, la, b, lb, _kept(la + lb, outside, output))
+    (result, labels), = operands.values()
+    if not output:
+        return result.contract()
+    return result.transpose([labels.index(c) for c in output]).copy()
+
+
+# A = Tensor([[1, 2], [3, 4]])
+# B = Tensor([[5, 6], [7, 8]])
+# v = Tensor([1, 1])
+# print(einsum("ij,jk->ik", A, B))
+# print(einsum("ii->", A))
+# print(einsum("i,j->ij", v, v))
+# print(einsum("ij,jk,k->i", A, B, v))
+# print(contraction_order("ij,jk,k->i", [1000, 1000], [1000, 1000], [1000]))
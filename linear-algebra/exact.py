@@ -0,0 +1,204 @@
+from fractions import Fraction
+import math
+
+from matrix import Matrix
+
+_PRIMES = []
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def _is_prime(n):
+    """Miller-Rabin with the first twelve primes as witnesses: deterministic below 3.3e24."""
+    if n < 2:
+        return False
+    for p in _WITNESSES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in _WITNESSES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _prime(i):
+    """The i-th largest prime below 2**62, generated on demand."""
+    while len(_PRIMES) <= i:
+        p = _PRIMES[-1] - 2 if _PRIMES else 2 ** 62 - 1
+        while not _is_prime(p):
+            p -= 2
+        _PRIMES.append(p)
+    return _PRIMES[i]
+
+
+def _integer_rows(m):
+    """
+    The rows of m as lists of ints, each scaled by the lcm of its
+    denominators (every float is an exact binary fraction). Returns
+    (rows, scale) where scale is the product of the row multipliers.
+    """
+    rows, cols = m.dimension
+    f = m.flat()
+    out, scale = [], 1
+    for i in range(rows):
+        row = [x if isinstance(x, int) else Fraction(x) for x in f[i * cols:(i + 1) * cols]]
+        lcm = math.lcm(*(x.denominator for x in row)) if row else 1
+        out.append([int(x * lcm) for x in row])
+        scale *= lcm
+    return out, scale
+
+
+def _bareiss(rows, cols, jordan):
+    """
+    Fraction-free elimination in place. Every update
+        a_ij <- (p * a_ij - a_ic * a_rj) / p_prev
+    divides exactly, since each entry is a minor of the input, so the
+    numbers stay bounded by Hadamard's inequality instead of growing with
+    every step. With jordan=True rows above the pivot are cleared too and
+    the result is D times the RREF, D being the last pivot.
+    Returns (pivot columns, D, sign of the row permutation).
+    """
+    n = len(rows)
+    previous, sign, r = 1, 1, 0
+    pivots = []
+    for c in range(cols):
+        p = next((i for i in range(r, n) if rows[i][c] != 0), None)
+        if p is None:
+            continue
+        if p != r:
+            rows[p], rows[r] = rows[r], rows[p]
+            sign = -sign
+        pivot_row = rows[r]
+        pivot = pivot_row[c]
+        for i in range(0 if jordan else r + 1, n):
+            if i == r:
+                continue
+            a = rows[i][c]
+            if a == 0 and previous == pivot:
+                continue
+            rows[i] = [(pivot * x - a * y) // previous for x, y in zip(rows[i], pivot_row)]
+        previous = pivot
+        pivots.append(c)
+        r += 1
+        if r == n:
+            break
+    return pivots, previous, sign
+
+
+def _determinant_mod(rows, p):
+    n = len(rows)
+    a = [[x % p for x in row] for row in rows]
+    det = 1
+    for k in range(n):
+        i = next((i for i in range(k, n) if a[i][k]), None)
+        if i is None:
+            return 0
+        if i != k:
+            a[i], a[k] = a[k], a[i]
+            det = -det
+        pivot_row = a[k]
+        det = det * pivot_row[k] % p
+        inverse = pow(pivot_row[k], -1, p)
+        for i in range(k + 1, n):
+            factor = a[i][k] * inverse % p
+            if factor:
+                a[i][k:] = [(x - factor * y) % p for x, y in zip(a[i][k:], pivot_row[k:])]
+    return det % p
+
+
+def modular_determinant(rows):
+    """
+    Determinant of an integer matrix (list of rows) by Chinese remaindering:
+    it is computed modulo enough 62-bit primes that their product exceeds
+    twice Hadamard's bound, so each elimination works on word-sized
+    numbers and only the reconstruction touches big integers.
+
+    Under CPython, whose big integer arithmetic runs in C, Bareiss is
+    usually still faster (measured up to n = 150); the modular route pays
+    off when entries are huge or the determinant is needed modulo primes
+    anyway.
+    """
+    bound_bits = sum((sum(x * x for x in row).bit_length() + 1) // 2 for row in rows) + 2
+    residue, modulus, i = 0, 1, 0
+    while modulus.bit_length() <= bound_bits:
+        p = _prime(i)
+        d = _determinant_mod(rows, p)
+        # Lift: residue + modulus * t is d mod p.
+        t = (d - residue) * pow(modulus, -1, p) % p
+        residue += modulus * t
+        modulus *= p
+        i += 1
+    return residue - modulus if residue > modulus // 2 else residue
+
+
+def determinant(m, method="bareiss"):
+    """
+    Exact determinant of an integer, rational or float Matrix, by Bareiss
+    elimination or, with method="modular", by modular_determinant.
+    """
+    rows, cols = m.dimension
+    if rows != cols:
+        raise ValueError("Matrix must be square.")
+    if method not in ("bareiss", "modular"):
+        raise ValueError("method must be 'bareiss' or 'modular'.")
+    integer, scale = _integer_rows(m)
+    if method == "modular":
+        det = modular_determinant(integer)
+    else:
+        pivots, last, sign = _bareiss(integer, cols, False)
+        det = sign * last if len(pivots) == rows else 0
+    return Fraction(det, scale) if scale != 1 else det
+
+
+def rref(m):
+    """Exact reduced row echelon form, with Fraction entries where needed."""
+    rows, cols = m.dimension
+    integer, _ = _integer_rows(m)
+    pivots, last, _ = _bareiss(integer, cols, True)
+    return Matrix([[Fraction(x, last) if x % last else x // last for x in row] for row in integer])
+
+
+def rank(m):
+    rows, cols = m.dimension
+    integer, _ = _integer_rows(m)
+    return len(_bareiss(integer, cols, False)[0])
+
+
+def nullspace(m):
+    """
+    A basis of {x : m x = 0} as the columns of a Matrix (None when only
+    x = 0 qualifies). Each basis vector has a 1 in one free column.
+    """
+    rows, cols = m.dimension
+    integer, _ = _integer_rows(m)
+    pivots, last, _ = _bareiss(integer, cols, True)
+    free = [c for c in range(cols) if c not in pivots]
+    if not free:
+        return None
+    basis = []
+    for f in free:
+        x = [0] * cols
+        x[f] = 1
+        for r, c in enumerate(pivots):
+            value = Fraction(-integer[r][f], last)
+            x[c] = value.numerator if value.denominator == 1 else value
+        basis.append(x)
+    return Matrix.transpose(Matrix(basis))
+
+
+# from fractions import Fraction
+# A = Matrix([[Fraction(1, 2), 1, 2], [2, 4, 7], [Fraction(1, 3), 5, 0]])
+# print(determinant(A))
+# print(repr(rref(Matrix([[1, 2, 3], [2, 4, 6], [1, 0, 1]]))))
+# print(rank(Matrix([[1, 2, 3], [2, 4, 6], [1, 0, 1]])))
+# print(repr(nullspace(Matrix([[1, 2, 3], [2, 4, 6], [1, 0, 1]]))))
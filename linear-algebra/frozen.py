@@ -0,0 +1,191 @@
+from array import array
+from collections import OrderedDict
+import hashlib
+
+from matrix import LUDecomposition, Matrix, StridedView
+
+_shared = None
+
+
+class FrozenView(StridedView):
+    """A StridedView that refuses writes."""
+    __slots__ = ()
+
+    def __setitem__(self, index, value):
+        raise TypeError("FrozenMatrix is read-only.")
+
+
+def _digest(buf):
+    data = buf.tobytes() if isinstance(buf, (array, memoryview)) else repr(list(buf)).encode()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _readonly(buf):
+    """Storage nothing can write through: a read-only memoryview of doubles, or a tuple."""
+    return memoryview(buf).toreadonly() if isinstance(buf, array) else tuple(buf)
+
+
+def _nbytes(value):
+    """Rough memory footprint of a cached result, for the byte budget."""
+    if isinstance(value, Matrix):
+        rows, cols = value.dimension
+        return rows * cols * (8 if isinstance(value._buf, (array, memoryview)) else 32)
+    if isinstance(value, LUDecomposition):
+        return len(value.lu) * (8 if isinstance(value.lu, (array, memoryview)) else 32) + 8 * value.n
+    if isinstance(value, tuple):
+        return sum(map(_nbytes, value))
+    return 32
+
+
+def _frozen(value):
+    """Cached results are handed out to every caller, so they must not be writable."""
+    if isinstance(value, Matrix):
+        return FrozenMatrix.freeze(value)
+    if isinstance(value, LUDecomposition):
+        value.lu = _readonly(value.lu)
+        value.perm = tuple(value.perm)
+        return value
+    if isinstance(value, tuple):
+        return tuple(map(_frozen, value))
+    return value
+
+
+class FrozenMatrix(Matrix):
+    """
+    A Matrix whose contents never change. Equality and hashing go by shape
+    and (bitwise) contents, and every factorization or derived quantity
+    asked of it (LU, QR, RREF, inverse, determinant, rank, nullspace) is
+    computed once and kept on the instance; with enable_cache() it is also
+    shared with every other FrozenMatrix holding the same contents.
+    Arithmetic on a FrozenMatrix returns ordinary matrices. Its storage is
+    read-only, so transposes, rows and columns share it but raise on
+    writes, and flat() returns a copy.
+    """
+    __slots__ = ("_key", "_cache")
+
+    def __init__(self, data):
+        super().__init__(data)
+        self._key = (self._shape, _digest(self._buf))
+        self._buf = _readonly(self._buf)
+        self._cache = {}
+
+    @staticmethod
+    def freeze(m):
+        """A frozen copy of m (m itself if it is already frozen)."""
+        if isinstance(m, FrozenMatrix):
+            return m
+        f = FrozenMatrix.__new__(FrozenMatrix)
+        values = m.flat()[:]
+        f._offset = 0
+        f._shape = m.dimension
+        f._strides = (m.dimension[1], 1)
+        f._key = (f._shape, _digest(values))
+        f._buf = _readonly(values)
+        f._cache = {}
+        return f
+
+    def row(self, i):
+        view = super().row(i)
+        return FrozenView(view._buf, view._offset, view._length, view._step)
+
+    def col(self, j):
+        view = super().col(j)
+        return FrozenView(view._buf, view._offset, view._length, view._step)
+
+    def _memo(self, key, compute, *args):
+        if key in self._cache:
+            return self._cache[key]
+        shared_key = (self._key, key)
+        found, value = _shared.get(shared_key) if _shared is not None else (False, None)
+        if not found:
+            value = _frozen(compute(*args))
+            if _shared is not None:
+                _shared.put(shared_key, value)
+        self._cache[key] = value
+        return value
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenMatrix):
+            return self._key == other._key
+        if isinstance(other, Matrix):
+            return self._shape == other.dimension and list(self.flat()) == list(other.flat())
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._key)
+
+
+class MatrixCache:
+    """
+    Process-wide LRU of derived results keyed by (matrix contents,
+    operation). Entries are evicted oldest-first once their estimated size
+    exceeds max_bytes. hits and misses count lookups that got past a
+    matrix's own per-instance cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """(True, value) on a hit, (False, None) on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, old) = self._entries.popitem(last=False)
+            self.nbytes -= old
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __repr__(self):
+        return (f"MatrixCache(entries={len(self)}, bytes={self.nbytes}/{self.max_bytes}, "
+                f"hits={self.hits}, misses={self.misses}, evictions={self.evictions})")
+
+
+def enable_cache(max_bytes=64 * 2 ** 20):
+    """Share derived results between equal FrozenMatrix instances; returns the cache."""
+    global _shared
+    _shared = MatrixCache(max_bytes)
+    return _shared
+
+
+def disable_cache():
+    global _shared
+    _shared = None
+
+
+def cache_info():
+    """The active MatrixCache (with its counters), or None when sharing is off."""
+    return _shared
+
+
+# enable_cache(max_bytes=2 ** 20)
+# A = FrozenMatrix([[4, 3], [6, 3]])
+# print(Matrix.inverse(A))
+# print(Matrix.inverse(FrozenMatrix([[4, 3], [6, 3]])))
+# print(Matrix.determinant(A), Matrix.rank(A))
+# print(cache_info())
@@ -0,0 +1,217 @@
+from array import array
+from operator import mul
+
+from matrix import Matrix
+
+
+class LazyMatrix:
+    """
+    A node in a deferred matrix expression. Arithmetic on LazyMatrix values
+    only records the operation; `evaluate()` then
+      - multiplies chains of products in the cheapest association order
+        (matrix-chain dynamic programming),
+      - turns inverse(A) * X into solve(A, X) (and X * inverse(A) into a
+        transposed solve), so the inverse is never formed,
+      - fuses sums and scalings into one pass over the operands.
+    Start from `lazy(matrix)`; the static methods mirror Matrix's.
+    """
+
+    def __init__(self, op, args, shape, value=None):
+        self.op = op
+        self.args = args
+        self.shape = shape
+        self.value = value
+
+    @property
+    def dimension(self):
+        return self.shape
+
+    @staticmethod
+    def _wrap(x):
+        if isinstance(x, LazyMatrix):
+            return x
+        if isinstance(x, Matrix):
+            return lazy(x)
+        raise TypeError("Invalid operand type.")
+
+    @staticmethod
+    def transpose(m):
+        m = LazyMatrix._wrap(m)
+        if m.op == "transpose":
+            return m.args[0]
+        rows, cols = m.shape
+        return LazyMatrix("transpose", (m,), (cols, rows))
+
+    @staticmethod
+    def inverse(m):
+        m = LazyMatrix._wrap(m)
+        rows, cols = m.shape
+        if rows != cols:
+            raise ValueError("Matrix must be square.")
+        if m.op == "inverse":
+            return m.args[0]
+        return LazyMatrix("inverse", (m,), m.shape)
+
+    @staticmethod
+    def scalar_multiply(m, scalar):
+        m = LazyMatrix._wrap(m)
+        return LazyMatrix("scale", (m, scalar), m.shape)
+
+    def __add__(self, other):
+        other = LazyMatrix._wrap(other)
+        if self.shape != other.shape:
+            raise ValueError("Dimension mismatch.")
+        return LazyMatrix("add", (self, other), self.shape)
+
+    def __sub__(self, other):
+        return self + LazyMatrix.scalar_multiply(other, -1)
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float)):
+            return LazyMatrix.scalar_multiply(self, other)
+        other = LazyMatrix._wrap(other)
+        if self.shape[1] != other.shape[0]:
+            raise ValueError("Dimension mismatch for multiplication.")
+        return LazyMatrix("matmul", (self, other), (self.shape[0], other.shape[1]))
+
+    def __rmul__(self, other):
+        if isinstance(other, (int, float)):
+            return LazyMatrix.scalar_multiply(self, other)
+        return LazyMatrix._wrap(other) * self
+
+    def evaluate(self):
+        """Compute the expression; shared subexpressions are evaluated once."""
+        return _Evaluator().value(self)
+
+    def __repr__(self):
+        if self.op == "leaf":
+            return f"lazy{self.shape}"
+        if self.op == "scale":
+            return f"scale({self.args[0]!r}, {self.args[1]})"
+        return f"{self.op}({', '.join(map(repr, self.args))})"
+
+
+def lazy(m):
+    """Wrap a Matrix as the leaf of a lazy expression."""
+    return LazyMatrix("leaf", (), m.dimension, m)
+
+
+def _lu_flops(n):
+    return 2 * n ** 3 // 3
+
+
+class _Evaluator:
+    def __init__(self):
+        self.memo = {}
+
+    def value(self, node):
+        key = id(node)
+        if key not in self.memo:
+            self.memo[key] = self.compute(node)
+        return self.memo[key]
+
+    def compute(self, node):
+        if node.op == "leaf":
+            return node.value
+        if node.op in ("add", "scale"):
+            return self.combination(node)
+        if node.op == "matmul":
+            return self.chain(node)
+        if node.op == "transpose":
+            return Matrix.transpose(self.value(node.args[0]))
+        return Matrix.inverse(self.value(node.args[0]))
+
+    @staticmethod
+    def terms(node, coeff, out):
+        """Flatten nested sums and scalings into {id: [coefficient, node]}."""
+        if node.op == "add":
+            for arg in node.args:
+                _Evaluator.terms(arg, coeff, out)
+        elif node.op == "scale":
+            _Evaluator.terms(node.args[0], coeff * node.args[1], out)
+        elif id(node) in out:
+            out[id(node)][0] += coeff
+        else:
+            out[id(node)] = [coeff, node]
+
+    def combination(self, node):
+        """Evaluate sum(c_i * M_i) in a single pass instead of one pass per + or *."""
+        collected = {}
+        _Evaluator.terms(node, 1, collected)
+        coeffs = [c for c, _ in collected.values()]
+        flats = [self.value(term).flat() for _, term in collected.values()]
+        if len(flats) == 1:
+            values = map(mul, flats[0], [coeffs[0]] * len(flats[0]))
+        elif len(flats) == 2:
+            (a, b), (ca, cb) = flats, coeffs
+            values = (ca * x + cb * y for x, y in zip(a, b))
+        else:
+            values = (sum(map(mul, coeffs, column)) for column in zip(*flats))
+        rows, cols = node.shape
+        if all(isinstance(f, array) for f in flats) and all(isinstance(c, (int, float)) for c in coeffs):
+            values = array('d', values)
+        return Matrix.from_flat(values if isinstance(values, array) else list(values), rows, cols)
+
+    @staticmethod
+    def factors(node, out):
+        """Flatten a product tree into its factors, pulling scalars out front."""
+        if node.op == "matmul":
+            coeff = 1
+            for arg in node.args:
+                coeff *= _Evaluator.factors(arg, out)
+            return coeff
+        if node.op == "scale" and node.args[0].op == "matmul":
+            return node.args[1] * _Evaluator.factors(node.args[0], out)
+        out.append(node)
+        return 1
+
+    def chain(self, node):
+        factors = []
+        coeff = _Evaluator.factors(node, factors)
+        k = len(factors)
+        p = [f.shape[0] for f in factors] + [factors[-1].shape[1]]
+        inverse = [f.op == "inverse" for f in factors]
+        # cost[i][j]: flops to form factors i..j; split[i][j]: where to cut.
+        # A lone inverse costs a full inversion, unless it is consumed
+        # directly by a solve (LU plus two triangular sweeps per column).
+        cost = [[0] * k for _ in range(k)]
+        split = [[None] * k for _ in range(k)]
+        for i in range(k):
+            if inverse[i]:
+                cost[i][i] = 2 * p[i] ** 3
+        for length in range(2, k + 1):
+            for i in range(k - length + 1):
+                j = i + length - 1
+                best = None
+                for s in range(i, j):
+                    if s == i and inverse[i]:
+                        c = _lu_flops(p[i]) + 2 * p[i] ** 2 * p[j + 1] + cost[s + 1][j]
+                    elif s + 1 == j and inverse[j]:
+                        c = cost[i][s] + _lu_flops(p[j]) + 2 * p[j] ** 2 * p[i]
+                    else:
+                        c = cost[i][s] + cost[s + 1][j] + p[i] * p[s + 1] * p[j + 1]
+                    if best is None or c < best:
+                        best, split[i][j] = c, s
+                cost[i][j] = best
+
+        def build(i, j):
+            if i == j:
+                return self.value(factors[i])
+            s = split[i][j]
+            if s == i and inverse[i]:
+                return Matrix.solve(self.value(factors[i].args[0]), build(s + 1, j))
+            if s + 1 == j and inverse[j]:
+                # X A^-1 = (A^-T X^T)^T
+                a = self.value(factors[j].args[0])
+                return Matrix.transpose(Matrix.solve(Matrix.transpose(a), Matrix.transpose(build(i, s))))
+            return build(i, s) * build(s + 1, j)
+
+        result = build(0, k - 1)
+        return result if coeff == 1 else Matrix.scalar_multiply(result, coeff)
+
+
+# A = Matrix([[2, 1, -1], [-3, -1, 2], [-2, 1, 2]])
+# b = Matrix([[8], [-11], [-3]])
+# print((LazyMatrix.inverse(lazy(A)) * b).evaluate())
+# B = Matrix([[1, 2, 3]] * 3)
+# print((lazy(A) * B * A * b + 2 * lazy(b)).evaluate())
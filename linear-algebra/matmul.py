@@ -0,0 +1,146 @@
+from array import array
+from operator import add, mul, sub
+import math
+
+from _storage import _pack
+
+# Output tile edge for the blocked kernel: a tile of TILE_SIZE rows of A is
+# multiplied against TILE_SIZE columns of B before moving on, so the columns
+# being reused stay hot in cache.
+TILE_SIZE = 32
+
+# Below this size (smallest of the three dimensions) Strassen's extra
+# additions cost more than the multiplication they save. See
+# benchmark_matmul.py for how the crossover was measured.
+STRASSEN_THRESHOLD = 192
+
+# math.sumprod (Python 3.12+) is an exact-rounding dot product in C; fall back
+# to the classic sum(map(mul, ...)) on older interpreters.
+_dot = getattr(math, "sumprod", None) or (lambda x, y: sum(map(mul, x, y)))
+
+
+def blocked_matmul(a, b, n, m, p, tile=TILE_SIZE):
+    """
+    Multiply a (n x m) by b (m x p), both flat row-major buffers.
+
+    B is transposed once so that every output entry is a dot product of two
+    contiguous slices (a row of A and a column of B), evaluated in C rather
+    than by indexing down the columns of B one element at a time.
+    """
+    typed = isinstance(a, array) and isinstance(b, array)
+    columns = [b[j::p] for j in range(p)]
+    rows = [a[i * m:(i + 1) * m] for i in range(n)]
+    out = array('d', bytes(8 * n * p)) if typed else [0] * (n * p)
+    for i0 in range(0, n, tile):
+        block_rows = rows[i0:i0 + tile]
+        for j0 in range(0, p, tile):
+            block_cols = columns[j0:j0 + tile]
+            width = len(block_cols)
+            for di, row in enumerate(block_rows):
+                start = (i0 + di) * p + j0
+                out[start:start + width] = _pack([_dot(row, col) for col in block_cols], typed)
+    return out
+
+
+def _block(buf, cols, r0, c0, h, w):
+    """Copy the h x w sub-block at (r0, c0) out of a buffer with `cols` columns."""
+    out = array('d') if isinstance(buf, array) else []
+    for i in range(r0, r0 + h):
+        start = i * cols + c0
+        out.extend(buf[start:start + w])
+    return out
+
+
+def _pad(buf, rows, cols, new_rows, new_cols):
+    """Grow a rows x cols buffer to new_rows x new_cols with zeros."""
+    if (rows, cols) == (new_rows, new_cols):
+        return buf
+    typed = isinstance(buf, array)
+    zero = 0.0 if typed else 0
+    out = array('d') if typed else []
+    fill = _pack([zero] * (new_cols - cols), typed)
+    for i in range(rows):
+        out.extend(buf[i * cols:(i + 1) * cols])
+        out.extend(fill)
+    out.extend(_pack([zero] * ((new_rows - rows) * new_cols), typed))
+    return out
+
+
+def _strassen(a, b, n, m, p, tile, threshold):
+    """One level of Strassen's 7-product recursion on (padded) even shapes."""
+    typed = isinstance(a, array) and isinstance(b, array)
+    N, M, P = n + n % 2, m + m % 2, p + p % 2
+    a = _pad(a, n, m, N, M)
+    b = _pad(b, m, p, M, P)
+    h, k, w = N // 2, M // 2, P // 2
+
+    def plus(x, y):
+        return _pack(map(add, x, y), typed)
+
+    def minus(x, y):
+        return _pack(map(sub, x, y), typed)
+
+    def times(x, y):
+        return matmul(x, y, h, k, w, tile, threshold)
+
+    a11, a12 = _block(a, M, 0, 0, h, k), _block(a, M, 0, k, h, k)
+    a21, a22 = _block(a, M, h, 0, h, k), _block(a, M, h, k, h, k)
+    b11, b12 = _block(b, P, 0, 0, k, w), _block(b, P, 0, w, k, w)
+    b21, b22 = _block(b, P, k, 0, k, w), _block(b, P, k, w, k, w)
+
+    m1 = times(plus(a11, a22), plus(b11, b22))
+    m2 = times(plus(a21, a22), b11)
+    m3 = times(a11, minus(b12, b22))
+    m4 = times(a22, minus(b21, b11))
+    m5 = times(plus(a11, a12), b22)
+    m6 = times(minus(a21, a11), plus(b11, b12))
+    m7 = times(minus(a12, a22), plus(b21, b22))
+
+    c11 = plus(minus(plus(m1, m4), m5), m7)
+    c12 = plus(m3, m5)
+    c21 = plus(m2, m4)
+    c22 = plus(plus(minus(m1, m2), m3), m6)
+
+    # Stitch the quadrants back together, dropping any padding.
+    out = array('d') if typed else []
+    for top, bottom, first_rows in ((c11, c12, h), (c21, c22, n - h)):
+        for i in range(first_rows):
+            out.extend(top[i * w:(i + 1) * w])
+            out.extend(bottom[i * w:i * w + p - w])
+    return out
+
+
+# The parallel module once parallel.enable() has been called; its matmul
+# returns None for products that should run serially.
+_parallel = None
+
+
+def matmul(a, b, n, m, p, tile=TILE_SIZE, threshold=STRASSEN_THRESHOLD):
+    """
+    Product of flat row-major buffers a (n x m) and b (m x p).
+
+    Uses the blocked, transposed-operand kernel, switching to Strassen
+    recursion while every dimension is at least `threshold`. The result is an
+    array('d') when both inputs are, otherwise a list. Large products are
+    split across processes once parallel.enable() has been called.
+    """
+    _check_threshold(threshold)
+    if _parallel is not None:
+        result = _parallel.matmul(a, b, n, m, p, tile, threshold)
+        if result is not None:
+            return result
+    return serial_matmul(a, b, n, m, p, tile, threshold)
+
+
+def _check_threshold(threshold):
+    # Strassen pads a 1 x 1 block back up to 2 x 2, so below 2 it never bottoms out.
+    if threshold < 2:
+        raise ValueError("Strassen threshold must be at least 2.")
+
+
+def serial_matmul(a, b, n, m, p, tile=TILE_SIZE, threshold=STRASSEN_THRESHOLD):
+    """matmul on the calling process only."""
+    _check_threshold(threshold)
+    if min(n, m, p) >= threshold:
+        return _strassen(a, b, n, m, p, tile, threshold)
+    return blocked_matmul(a, b, n, m, p, tile)
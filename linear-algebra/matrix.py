@@ -1,9 +1,114 @@
+from array import array
+from fractions import Fraction
+from itertools import chain, repeat
+from operator import add, mul, sub, truediv
+import math
+
+import matmul as _matmul
+from _storage import _is_double, _like, _pack
+from matmul import matmul
+
+# The parallel module once parallel.enable() has been called; taken
+# from matmul so a backend enabled before this import is kept.
+_parallel = _matmul._parallel
+
+
+class StridedView:
+    """
+    A zero-copy window onto a matrix buffer: `length` elements starting at
+    `offset`, `step` apart. Rows, columns and the rows of `Matrix.data` are
+    all views of this kind, so reading or writing through them touches the
+    matrix itself.
+    """
+    __slots__ = ("_buf", "_offset", "_length", "_step")
+
+    def __init__(self, buf, offset, length, step):
+        self._buf = buf
+        self._offset = offset
+        self._length = length
+        self._step = step
+
+    def __len__(self):
+        return self._length
+
+    def _index(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Index out of range.")
+        return self._offset + index * self._step
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        return self._buf[self._index(index)]
+
+    def __setitem__(self, index, value):
+        self._buf[self._index(index)] = value
+
+    def __iter__(self):
+        start = self._offset
+        return iter(self._buf[start:start + self._length * self._step:self._step])
+
+    def tolist(self):
+        return list(self)
+
+    def __eq__(self, other):
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+
+class _Rows:
+    """Sequence of row views backing the `Matrix.data` compatibility property."""
+    __slots__ = ("_matrix",)
+
+    def __init__(self, matrix):
+        self._matrix = matrix
+
+    def __len__(self):
+        return self._matrix._shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._matrix.row(i) for i in range(*index.indices(len(self)))]
+        return self._matrix.row(index)
+
+    def __iter__(self):
+        return (self._matrix.row(i) for i in range(len(self)))
+
+    def __eq__(self, other):
+        try:
+            return self._matrix.tolist() == [list(row) for row in other]
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return repr(self._matrix.tolist())
+
 
 class Matrix:
+    """
+    Dense matrix stored as one contiguous row-major buffer plus a shape and
+    strides. Real entries live in an array('d') (8 bytes each); anything that
+    does not fit a double exactly (Fractions, big ints, ...) falls back to a
+    flat list so exact arithmetic keeps working.
+    """
+    __slots__ = ("_buf", "_offset", "_shape", "_strides")
+
     def __init__(self, data):
         if not self.is_matrix(data):
             raise ValueError("Invalid matrix.")
-        self.data = data
+        flat = [x for row in data for x in row]
+        rows, cols = len(data), len(data[0])
+        self._buf = _pack(flat, all(map(_is_double, flat)))
+        self._offset = 0
+        self._shape = (rows, cols)
+        self._strides = (cols, 1)
 
     @staticmethod
     def is_matrix(data):
@@ -15,97 +120,234 @@ class Matrix:
                 return False
         return True
 
+    @staticmethod
+    def _view(buf, offset, shape, strides):
+        """Wrap an existing buffer without copying or validating it."""
+        m = Matrix.__new__(Matrix)
+        m._buf = buf
+        m._offset = offset
+        m._shape = shape
+        m._strides = strides
+        return m
+
+    @staticmethod
+    def from_flat(values, rows, cols):
+        """Build a matrix from row-major values; an array('d') is used as is."""
+        if len(values) != rows * cols:
+            raise ValueError("Size mismatch for matrix shape.")
+        if not isinstance(values, array):
+            values = list(values)
+            values = _pack(values, all(map(_is_double, values)))
+        return Matrix._view(values, 0, (rows, cols), (cols, 1))
+
     @property
     def dimension(self):
-        return len(self.data), len(self.data[0])
+        return self._shape
+
+    @property
+    def strides(self):
+        return self._strides
+
+    @property
+    def data(self):
+        """Row-by-row view for code written against the old list-of-lists layout."""
+        return _Rows(self)
+
+    def row(self, i):
+        rows, cols = self._shape
+        if i < 0:
+            i += rows
+        if not 0 <= i < rows:
+            raise IndexError("Row index out of range.")
+        return StridedView(self._buf, self._offset + i * self._strides[0], cols, self._strides[1])
+
+    def col(self, j):
+        rows, cols = self._shape
+        if j < 0:
+            j += cols
+        if not 0 <= j < cols:
+            raise IndexError("Column index out of range.")
+        return StridedView(self._buf, self._offset + j * self._strides[1], rows, self._strides[0])
+
+    def is_contiguous(self):
+        return self._strides == (self._shape[1], 1)
+
+    def flat(self):
+        """
+        Row-major contents as one buffer. Shares storage when the matrix is
+        already contiguous, so treat the result as read-only. Read-only
+        storage (a memory-mapped matrix from npy.load with mmap=True, or a
+        FrozenMatrix) is copied into an array('d') or list here.
+        """
+        rows, cols = self._shape
+        if self.is_contiguous():
+            if isinstance(self._buf, memoryview):
+                return array('d', self._buf[self._offset:self._offset + rows * cols].tobytes())
+            if isinstance(self._buf, tuple):
+                return list(self._buf[self._offset:self._offset + rows * cols])
+            if self._offset == 0 and len(self._buf) == rows * cols:
+                return self._buf
+            return self._buf[self._offset:self._offset + rows * cols]
+        buf, (rs, cs) = self._buf, self._strides
+        out = array('d') if isinstance(buf, (array, memoryview)) else []
+        for i in range(rows):
+            start = self._offset + i * rs
+            out.extend(buf[start:start + cols * cs:cs])
+        return out
+
+    def tolist(self):
+        cols = self._shape[1]
+        f = self.flat()
+        return [list(f[i:i + cols]) for i in range(0, len(f), cols)]
 
     @staticmethod
     def zero(rows, cols):
-        return Matrix([[0 for _ in range(cols)] for _ in range(rows)])
+        return Matrix._view(array('d', bytes(8 * rows * cols)), 0, (rows, cols), (cols, 1))
 
     @staticmethod
     def identity(size):
-        return Matrix([[1 if i == j else 0 for j in range(size)] for i in range(size)])
+        m = Matrix.zero(size, size)
+        m._buf[::size + 1] = array('d', [1.0]) * size
+        return m
 
     @staticmethod
     def transpose(m):
-        return Matrix([list(row) for row in zip(*m.data)])
+        """Transposed view: swaps shape and strides, shares the buffer."""
+        (rows, cols), (rs, cs) = m._shape, m._strides
+        return Matrix._view(m._buf, m._offset, (cols, rows), (cs, rs))
 
     @staticmethod
     def minor(m, row, col):
-        return Matrix([r[:col] + r[col+1:] for i, r in enumerate(m.data) if i != row])
+        rows, cols = m.dimension
+        f = m.flat()
+        values = [f[i * cols + j] for i in range(rows) if i != row for j in range(cols) if j != col]
+        return Matrix._view(_like(f, values), 0, (rows - 1, cols - 1), (cols - 1, 1))
+
+    def _memo(self, key, compute, *args):
+        """
+        compute(*args). A plain Matrix can change under its own views, so
+        nothing is remembered here; FrozenMatrix (frozen.py) caches instead.
+        """
+        return compute(*args)
 
     @staticmethod
-    def determinant(m):
+    def lu(m):
+        """LU factorization with partial pivoting (reusable for many solves)."""
+        return m._memo("lu", LUDecomposition, m)
+
+    @staticmethod
+    def determinant(m, exact=False):
+        """
+        Determinant via LU. With exact=True, integer, Fraction and float
+        entries are treated as exact rationals (see exact.py).
+        """
+        return m._memo(("determinant", exact), Matrix._determinant, m, exact)
+
+    @staticmethod
+    def _determinant(m, exact):
         rows, cols = m.dimension
         if rows != cols:
             raise ValueError("Matrix must be square.")
+        if exact:
+            import exact as _exact
+            return _exact.determinant(m)
         if rows == 1:
             return m.data[0][0]
         if rows == 2:
             return m.data[0][0] * m.data[1][1] - m.data[0][1] * m.data[1][0]
-        return sum((-1)**j * m.data[0][j] * Matrix.determinant(Matrix.minor(m, 0, j)) for j in range(cols))
+        return Matrix.lu(m).determinant()
 
     @staticmethod
     def inverse(m):
         rows, cols = m.dimension
         if rows != cols:
             raise ValueError("Matrix must be square.")
-        det = Matrix.determinant(m)
-        if det == 0:
-            raise ValueError("Matrix is singular and cannot be inverted.")
-        cofactors = [
-            [((-1) ** (i + j)) * Matrix.determinant(Matrix.minor(m, i, j)) for j in range(cols)]
-            for i in range(rows)
-        ]
-        adjugate = Matrix.transpose(Matrix(cofactors))
-        return Matrix.scalar_multiply(adjugate, 1 / det)
+        return m._memo("inverse", lambda: Matrix.lu(m).inverse())
+
+    @staticmethod
+    def solve(A, b):
+        """Solve Ax = b for x, where b is a column (or a block of columns)."""
+        return Matrix.lu(A).solve(b)
 
     @staticmethod
     def scalar_multiply(m, scalar):
-        return Matrix([[x * scalar for x in row] for row in m.data])
+        f = m.flat()
+        values = _parallel and _parallel.elementwise(mul, f, scalar)
+        if values is None:
+            values = _pack(map(mul, f, repeat(scalar)), isinstance(f, array) and _is_double(scalar))
+        return Matrix._view(values, 0, m.dimension, (m.dimension[1], 1))
 
     @staticmethod
-    def rref(m):
-        data = [row[:] for row in m.data]
-        rows, cols = len(data), len(data[0])
+    def rref(m, exact=False):
+        return m._memo(("rref", exact), Matrix._rref, m, exact)
+
+    @staticmethod
+    def _rref(m, exact):
+        if exact:
+            import exact as _exact
+            return _exact.rref(m)
+        rows, cols = m.dimension
+        data = _parallel and _parallel.rref(m.flat(), rows, cols)
+        if data is not None:
+            return Matrix._view(data, 0, (rows, cols), (cols, 1))
+        data = m.flat()[:]
         current_row = 0
         for col in range(cols):
             pivot_row = None
             for i in range(current_row, rows):
-                if data[i][col] != 0:
+                if data[i * cols + col] != 0:
                     pivot_row = i
                     break
             if pivot_row is None:
                 continue
+            cur = current_row * cols
             if pivot_row != current_row:
-                data[current_row], data[pivot_row] = data[pivot_row], data[current_row]
-            pivot_value = data[current_row][col]
-            data[current_row] = [x / pivot_value for x in data[current_row]]
+                piv = pivot_row * cols
+                data[cur:cur + cols], data[piv:piv + cols] = data[piv:piv + cols], data[cur:cur + cols]
+            pivot_value = data[cur + col]
+            data[cur:cur + cols] = _like(data, map(truediv, data[cur:cur + cols], repeat(pivot_value)))
+            pivot = data[cur:cur + cols]
             for i in range(rows):
-                if i != current_row:
-                    factor = data[i][col]
-                    data[i] = [a - factor * b for a, b in zip(data[i], data[current_row])]
+                start = i * cols
+                factor = data[start + col]
+                if i != current_row and factor != 0:
+                    data[start:start + cols] = _like(
+                        data, map(sub, data[start:start + cols], map(mul, repeat(factor), pivot)))
             current_row += 1
             if current_row == rows:
                 break
-        return Matrix(data)
+        return Matrix._view(data, 0, (rows, cols), (cols, 1))
+
+    @staticmethod
+    def rank(m, exact=False):
+        if exact:
+            import exact as _exact
+            return m._memo(("rank", True), _exact.rank, m)
+        return m._memo(("rank", False),
+                       lambda: sum(any(abs(x) > 1e-14 for x in row) for row in Matrix.rref(m).data))
 
     @staticmethod
-    def rank(m):
-        rref_matrix = Matrix.rref(m)
-        return sum(any(abs(x) > 1e-14 for x in row) for row in rref_matrix.data)
+    def nullspace(m):
+        """Exact basis of the nullspace as the columns of a Matrix, or None."""
+        import exact as _exact
+        return m._memo("nullspace", _exact.nullspace, m)
 
     @staticmethod
     def dot(m1, m2):
         if m1.dimension != m2.dimension:
             raise ValueError("Dimension mismatch for dot product.")
-        return sum(a * b for row1, row2 in zip(m1.data, m2.data) for a, b in zip(row1, row2))
+        return sum(map(mul, m1.flat(), m2.flat()))
 
     def __add__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
         if self.dimension != other.dimension:
             raise ValueError("Dimension mismatch.")
-        return Matrix([[a + b for a, b in zip(r1, r2)] for r1, r2 in zip(self.data, other.data)])
+        a, b = self.flat(), other.flat()
+        values = _parallel and _parallel.elementwise(add, a, b)
+        if values is None:
+            values = _pack(map(add, a, b), isinstance(a, array) and isinstance(b, array))
+        return Matrix._view(values, 0, self.dimension, (self.dimension[1], 1))
 
     def __mul__(self, other):
         if isinstance(other, (int, float)):
@@ -115,24 +357,133 @@ class Matrix:
             r2, c2 = other.dimension
             if c1 != r2:
                 raise ValueError("Dimension mismatch for multiplication.")
-            return Matrix([[sum(self.data[i][k] * other.data[k][j] for k in range(c1)) for j in range(c2)] for i in range(r1)])
+            return Matrix._view(matmul(self.flat(), other.flat(), r1, c1, c2), 0, (r1, c2), (c2, 1))
         else:
-            raise TypeError("Invalid operand type.")
+            return NotImplemented
 
     def to_vector(self):
+        from vector import Vector
         rows, cols = self.dimension
         if rows == 1:
-            return Vector(self.data[0])
+            return Vector(self.row(0).tolist())
         elif cols == 1:
-            return Vector([row[0] for row in self.data])
+            return Vector(self.col(0).tolist())
         else:
             raise ValueError("Matrix must be 1D to convert to vector.")
 
     def __repr__(self):
-        return f"Matrix({self.data})"
+        return f"Matrix({self.tolist()})"
 
     def __str__(self):
-        return "\n".join(" ".join(f"{x:.2f}" for x in row) for row in self.data)
+        return "\n".join(" ".join(str(x) if isinstance(x, Fraction) else f"{x:.2f}" for x in row)
+                         for row in self.data)
+
+
+class LUDecomposition:
+    """
+    PA = LU with partial pivoting, computed once in O(n^3).
+
+    L (unit lower triangular) and U (upper triangular) are packed into a
+    single row-major n x n buffer: U on and above the diagonal, the
+    multipliers of L below it. `perm[i]` is the row of A that ended up in
+    row i.
+    """
+
+    def __init__(self, m):
+        rows, cols = m.dimension
+        if rows != cols:
+            raise ValueError("Matrix must be square.")
+        n = rows
+        lu = m.flat()[:]
+        perm = list(range(n))
+        sign = 1
+        scale = max(map(abs, lu))
+        # A pivot this small relative to the largest entry means the matrix is
+        # singular up to rounding error.
+        self.tol = n * 2.220446049250313e-16 * scale
+        self.singular = False
+        for k in range(n):
+            # Partial pivoting: bring the largest remaining entry of column k up.
+            p = max(range(k, n), key=lambda i: abs(lu[i * n + k]))
+            top = k * n
+            if p != k:
+                other = p * n
+                lu[top:top + n], lu[other:other + n] = lu[other:other + n], lu[top:top + n]
+                perm[k], perm[p] = perm[p], perm[k]
+                sign = -sign
+            pivot = lu[top + k]
+            if abs(pivot) <= self.tol:
+                self.singular = True
+                if pivot == 0:
+                    continue
+            pivot_tail = lu[top + k + 1:top + n]
+            for i in range(k + 1, n):
+                start = i * n
+                factor = lu[start + k] / pivot
+                if factor == 0:
+                    continue
+                lu[start + k] = factor
+                lu[start + k + 1:start + n] = _like(
+                    lu, map(sub, lu[start + k + 1:start + n], map(mul, repeat(factor), pivot_tail)))
+        self.n = n
+        self.lu = lu
+        self.perm = perm
+        self.sign = sign
+
+    @property
+    def L(self):
+        n = self.n
+        return Matrix([[self.lu[i * n + j] if j < i else (1 if i == j else 0) for j in range(n)] for i in range(n)])
+
+    @property
+    def U(self):
+        n = self.n
+        return Matrix([[self.lu[i * n + j] if j >= i else 0 for j in range(n)] for i in range(n)])
+
+    @property
+    def P(self):
+        n = self.n
+        return Matrix([[1 if self.perm[i] == j else 0 for j in range(n)] for i in range(n)])
+
+    def determinant(self):
+        return math.prod(self.lu[::self.n + 1], start=self.sign)
+
+    def solve(self, b):
+        """Solve Ax = b by forward and back substitution, O(n^2) per column."""
+        if self.singular:
+            raise ValueError("Matrix is singular.")
+        n = self.n
+        rows, cols = b.dimension
+        if rows != n:
+            raise ValueError("Dimension mismatch for solve.")
+        lu, bf = self.lu, b.flat()
+        # Apply the row permutation, then solve Ly = Pb and Ux = y in place,
+        # one column of the right-hand side at a time.
+        x = _pack(chain.from_iterable(bf[p * cols:(p + 1) * cols] for p in self.perm),
+                  isinstance(lu, (array, memoryview)) and isinstance(bf, array))
+        for i in range(1, n):
+            row = i * n
+            for j in range(cols):
+                x[i * cols + j] -= sum(map(mul, lu[row:row + i], x[j:i * cols:cols]))
+        for i in range(n - 1, -1, -1):
+            row = i * n
+            for j in range(cols):
+                tail = sum(map(mul, lu[row + i + 1:row + n], x[(i + 1) * cols + j::cols]))
+                x[i * cols + j] = (x[i * cols + j] - tail) / lu[row + i]
+        return Matrix._view(x, 0, (n, cols), (cols, 1))
+
+    def inverse(self):
+        if self.singular:
+            raise ValueError("Matrix is singular and cannot be inverted.")
+        n = self.n
+        if isinstance(self.lu, (array, memoryview)):
+            return self.solve(Matrix.identity(n))
+        # Keep exact entries (Fractions, big ints) exact with an integer identity.
+        identity = [1 if i == j else 0 for i in range(n) for j in range(n)]
+        return self.solve(Matrix._view(identity, 0, (n, n), (n, 1)))
+
+    def __repr__(self):
+        return f"LUDecomposition(n={self.n}, singular={self.singular})"
 
 
 
@@ -0,0 +1,225 @@
+from array import array
+import ast
+import math
+import mmap
+import struct
+import sys
+
+from matrix import Matrix
+from tensor import Tensor, contiguous_strides
+from vector import Vector, VectorBatch
+
+# .npy layout: magic, version 1.0, little-endian uint16 header length, a
+# Python-literal header dict padded with spaces to a multiple of 64 bytes,
+# then the raw data.
+MAGIC = b"\x93NUMPY"
+_ALIGN = 64
+# Room left in a streaming header so the final shape can be patched in.
+_STREAM_HEADER = 128
+
+# dtype -> (array typecode, item size); all of these read as doubles.
+_REAL_TYPES = {"<f8": ("d", 8), "<f4": ("f", 4), "<i8": ("q", 8), "<i4": ("i", 4),
+               "<i2": ("h", 2), "|i1": ("b", 1), "|u1": ("B", 1)}
+
+
+def _header(descr, shape, fortran_order=False, size=None):
+    text = repr({"descr": descr, "fortran_order": fortran_order, "shape": tuple(shape)})
+    # The header, its newline and the 10-byte preamble fill whole 64-byte blocks.
+    total = size or -(-(len(MAGIC) + 4 + len(text) + 1) // _ALIGN) * _ALIGN
+    padding = total - (len(MAGIC) + 4 + len(text) + 1)
+    if padding < 0:
+        raise ValueError("Shape does not fit in the reserved header.")
+    text += " " * padding + "\n"
+    return MAGIC + bytes([1, 0]) + struct.pack("<H", len(text)) + text.encode("latin1")
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode(values):
+    """(descr, raw bytes) for a flat buffer of matrix or tensor entries."""
+    if isinstance(values, array) and values.typecode == "d":
+        return "<f8", _little_endian(values)
+    values = list(values)
+    if all(type(x) in (int, bool) and -2 ** 63 <= x < 2 ** 63 for x in values):
+        return "<i8", _little_endian(array("q", values))
+    if all(isinstance(x, (int, float, complex)) for x in values):
+        if any(isinstance(x, complex) for x in values):
+            parts = array("d", (p for x in map(complex, values) for p in (x.real, x.imag)))
+            return "<c16", _little_endian(parts)
+        if all(type(x) is float or abs(x) <= 2 ** 53 for x in values):
+            return "<f8", _little_endian(array("d", values))
+        if all(type(x) in (int, bool) for x in values):
+            raise ValueError("Integer entries outside the int64 range have no exact .npy representation.")
+        raise ValueError("Integer entries beyond 2**53 cannot be stored exactly as float64.")
+    raise ValueError("Only int, float and complex entries have a .npy representation; "
+                     "convert Fractions and other exact types first.")
+
+
+def _parts(obj):
+    """(flat row-major values, shape) for anything save() accepts."""
+    if isinstance(obj, Matrix):
+        return obj.flat(), obj.dimension
+    if isinstance(obj, Tensor):
+        return obj.flat(), tuple(obj.shape)
+    if isinstance(obj, Vector):
+        return obj.data, (obj.dimension,)
+    if isinstance(obj, VectorBatch):
+        return obj.flat(), obj.dimension
+    raise TypeError("Can only save a Matrix, Tensor, Vector or VectorBatch.")
+
+
+def save(path, obj):
+    """Write obj to path in NumPy's .npy format (version 1.0)."""
+    values, shape = _parts(obj)
+    descr, data = _encode(values)
+    with open(path, "wb") as f:
+        f.write(_header(descr, shape))
+        f.write(data)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a .npy file.")
+    major, _ = f.read(2)
+    length_format = "<H" if major == 1 else "<I"
+    (length,) = struct.unpack(length_format, f.read(struct.calcsize(length_format)))
+    header = ast.literal_eval(f.read(length).decode("latin1"))
+    return header["descr"], bool(header["fortran_order"]), tuple(header["shape"]), f.tell()
+
+
+def _decode(descr, data):
+    if descr in ("<c16", "<c8"):
+        parts = array("d" if descr == "<c16" else "f", data)
+        if sys.byteorder == "big":
+            parts.byteswap()
+        return [complex(re, im) for re, im in zip(parts[0::2], parts[1::2])]
+    if descr not in _REAL_TYPES:
+        raise ValueError(f"Unsupported .npy dtype {descr!r}.")
+    values = array(_REAL_TYPES[descr][0], data)
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values.byteswap()
+    if values.typecode == "d":
+        return values
+    if values.typecode == "q" and any(abs(x) > 2 ** 53 for x in values):
+        return list(values)
+    return array("d", values)
+
+
+def load(path, mmap_mode=False, kind=None):
+    """
+    Read a .npy file. By default one axis gives a Vector, two a Matrix and
+    anything else a Tensor; kind (Vector, Matrix or Tensor) overrides that.
+
+    With mmap_mode=True the file is memory-mapped and wrapped without
+    copying: opening is instant, only the pages behind the entries read are
+    loaded, and the result is read-only (writes raise TypeError). Whole-
+    matrix operations copy the data into memory as they run. Only float64
+    files can be mapped, and Vectors are always read in full.
+    """
+    with open(path, "rb") as f:
+        descr, fortran_order, shape, offset = _read_header(f)
+        size = math.prod(shape)
+        kind = kind or {1: Vector, 2: Matrix}.get(len(shape), Tensor)
+        if kind is Matrix and len(shape) != 2:
+            raise ValueError("A Matrix needs a two-dimensional .npy file.")
+        if mmap_mode and kind is not Vector:
+            if descr != "<f8" or sys.byteorder == "big":
+                raise ValueError("Only little-endian float64 .npy files can be memory-mapped.")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            values = memoryview(mapped)[offset:offset + 8 * size].cast("d")
+        else:
+            itemsize = 16 if descr == "<c16" else 8 if descr == "<c8" else _REAL_TYPES.get(descr, ("", 1))[1]
+            values = _decode(descr, f.read(itemsize * size))
+    if kind is Vector:
+        return Vector(list(values))
+    # Fortran order is the transposed layout: read it with the axes reversed
+    # and transpose the view back.
+    stored = shape[::-1] if fortran_order else shape
+    if kind is Matrix:
+        if isinstance(values, (array, memoryview)):
+            m = Matrix._view(values, 0, stored, contiguous_strides(stored))
+        else:
+            m = Matrix.from_flat(values, *stored)
+        return Matrix.transpose(m) if fortran_order else m
+    if isinstance(values, (array, memoryview)):
+        t = Tensor._view(values, 0, stored, contiguous_strides(stored))
+    else:
+        t = Tensor.from_flat(values, stored)
+    return t.transpose() if fortran_order else t
+
+
+class NpyWriter:
+    """
+    Stream a matrix (or tensor) to a .npy file chunk by chunk, so the whole
+    thing never has to be in memory:
+
+        with NpyWriter("big.npy", 4096) as out:
+            for block in blocks:
+                out.write(block)
+
+    Chunks are Matrices, Tensors, VectorBatches, lists of rows, or flat
+    arrays of whole rows. rows (the expected count) may be left out; the
+    header is patched with the final count on close. Data is stored as
+    float64.
+    """
+
+    def __init__(self, path, row_shape, rows=None):
+        # row_shape is the number of columns, or the trailing axes of a tensor.
+        self.row_shape = tuple(row_shape) if isinstance(row_shape, (list, tuple)) else (row_shape,)
+        self.row_size = math.prod(self.row_shape)
+        self.expected = rows
+        self.rows = 0
+        self._file = open(path, "wb")
+        self._file.write(self._header(rows or 0))
+
+    def _header(self, rows):
+        return _header("<f8", (rows,) + self.row_shape, size=_STREAM_HEADER)
+
+    def write(self, chunk):
+        if isinstance(chunk, (Matrix, Tensor, VectorBatch)):
+            values = chunk.flat()
+        elif isinstance(chunk, array):
+            values = chunk
+        else:
+            values = array("d", (float(x) for row in chunk for x in row))
+        if not isinstance(values, array) or values.typecode != "d":
+            # The header promises doubles; other array typecodes would be written as their raw bytes.
+            values = array("d", map(float, values))
+        if len(values) % self.row_size:
+            raise ValueError("Chunk does not hold a whole number of rows.")
+        self._file.write(_little_endian(values))
+        self.rows += len(values) // self.row_size
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.expected is not None and self.rows != self.expected:
+            self._file.close()
+            raise ValueError(f"Expected {self.expected} rows, wrote {self.rows}.")
+        self._file.seek(0)
+        self._file.write(self._header(self.rows))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+# A = Matrix([[1, 2], [3, 4]])
+# save("a.npy", A)
+# print(load("a.npy"))
+# with NpyWriter("big.npy", 3) as out:
+#     for i in range(4):
+#         out.write([[i, i + 1, i + 2]])
+# B = load("big.npy", mmap_mode=True)
+# print(B.data[3][2], B.dimension)
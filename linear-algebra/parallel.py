@@ -0,0 +1,254 @@
+"""
+Opt-in multi-process backend for the heavy dense kernels.
+
+After enable(), matrix products (Matrix.__mul__, Tensor.dot), the row
+elimination in Matrix.rref and large elementwise operations on array('d')
+storage are split across a pool of worker processes. Operands travel
+through multiprocessing.shared_memory blocks rather than being pickled,
+so each worker reads its slice of the inputs and writes its slice of the
+result in place. Operations below the thresholds here, and anything
+stored as Python objects (Fractions, big integers, complex numbers), keep
+running serially.
+
+Worker processes re-import the main module on platforms that spawn rather
+than fork (Windows, macOS), so scripts calling enable() there need the
+usual `if __name__ == "__main__":` guard.
+"""
+from array import array
+from itertools import repeat
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from operator import mul, sub, truediv
+import atexit
+import os
+import sys
+
+import matmul as _matmul
+
+# Smallest n * m * p flop count worth shipping to the workers.
+MATMUL_THRESHOLD = 2 ** 21
+# Smallest number of elements for a parallel elementwise operation.
+ELEMENTWISE_THRESHOLD = 2 ** 18
+# Smallest rows * cols for parallel row elimination.
+RREF_THRESHOLD = 2 ** 16
+
+_pool = None
+_workers = 0
+
+
+def enable(workers=None):
+    """Start a pool of `workers` processes (default: one per CPU) and route large kernels to it."""
+    global _pool, _workers
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("Need at least one worker.")
+    disable()
+    # Workers must inherit the parent's resource tracker; one of their own
+    # would report every block they attach to as leaked. The pool is started
+    # before the hooks are installed, so forked workers run serial kernels.
+    resource_tracker.ensure_running()
+    _pool = Pool(workers)
+    _workers = workers
+    _install(sys.modules[__name__])
+
+
+def disable():
+    """Shut the pool down and go back to serial kernels."""
+    global _pool, _workers
+    _install(None)
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+    _pool = None
+    _workers = 0
+
+
+def is_enabled():
+    return _pool is not None
+
+
+def workers():
+    """Number of worker processes, 0 when disabled."""
+    return _workers
+
+
+def _install(backend):
+    # matrix and tensor copy matmul's hook when they are imported, so only
+    # the copies already loaded need patching; importing them here would
+    # run their demo code.
+    _matmul._parallel = backend
+    for name in ("matrix", "tensor"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module._parallel = backend
+
+
+def _share(values=None, count=0):
+    """A new shared block holding the doubles in values, or room for count of them."""
+    size = 8 * (len(values) if values is not None else count)
+    shm = SharedMemory(create=True, size=max(size, 8))
+    if values is not None and size:
+        with memoryview(values).cast('B') as source:
+            shm.buf[:size] = source
+    return shm
+
+
+def _read(shm, count):
+    out = array('d')
+    with shm.buf[:8 * count] as view:
+        out.frombytes(view)
+    return out
+
+
+def _release(*blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+def _ranges(total):
+    """Split range(total) into one contiguous piece per worker."""
+    step = -(-total // _workers)
+    return [(lo, min(lo + step, total)) for lo in range(0, total, step)]
+
+
+def _typed(*buffers):
+    return all(isinstance(b, array) and b.typecode == 'd' for b in buffers)
+
+
+# Worker side: each task attaches to the blocks by name, works on its slice
+# and detaches again. Views must be released before the block is closed.
+
+def _matmul_rows(a_name, b_name, out_name, lo, hi, m, p, tile, threshold):
+    blocks = [SharedMemory(name=name) for name in (a_name, b_name, out_name)]
+    try:
+        a, b = array('d'), array('d')
+        with blocks[0].buf[8 * lo * m:8 * hi * m] as view:
+            a.frombytes(view)
+        with blocks[1].buf[:8 * m * p] as view:
+            b.frombytes(view)
+        product = _matmul.serial_matmul(a, b, hi - lo, m, p, tile, threshold)
+        with memoryview(product).cast('B') as source:
+            blocks[2].buf[8 * lo * p:8 * hi * p] = source
+    finally:
+        for shm in blocks:
+            shm.close()
+
+
+def _elementwise_range(op, a_name, b_name, scalar, out_name, lo, hi):
+    a_block, out_block = SharedMemory(name=a_name), SharedMemory(name=out_name)
+    b_block = SharedMemory(name=b_name) if b_name else None
+    try:
+        a = array('d')
+        with a_block.buf[8 * lo:8 * hi] as view:
+            a.frombytes(view)
+        if b_block is None:
+            values = array('d', map(op, a, repeat(scalar)))
+        else:
+            b = array('d')
+            with b_block.buf[8 * lo:8 * hi] as view:
+                b.frombytes(view)
+            values = array('d', map(op, a, b))
+        with memoryview(values).cast('B') as source:
+            out_block.buf[8 * lo:8 * hi] = source
+    finally:
+        for shm in (a_block, out_block, b_block):
+            if shm is not None:
+                shm.close()
+
+
+def _eliminate_rows(name, cols, col, pivot_row, lo, hi):
+    shm = SharedMemory(name=name)
+    try:
+        with shm.buf.cast('d') as data:
+            pivot = data[pivot_row * cols:(pivot_row + 1) * cols].tolist()
+            for i in range(lo, hi):
+                start = i * cols
+                factor = data[start + col]
+                if i != pivot_row and factor != 0:
+                    data[start:start + cols] = array(
+                        'd', map(sub, data[start:start + cols], map(mul, repeat(factor), pivot)))
+    finally:
+        shm.close()
+
+
+# Main-process side, called through the hooks in matmul, matrix and tensor.
+# Each returns None when the operation should stay serial.
+
+def matmul(a, b, n, m, p, tile, threshold):
+    if _workers < 2 or n < 2 or n * m * p < MATMUL_THRESHOLD or not _typed(a, b):
+        return None
+    a_block, b_block, out_block = _share(a), _share(b), _share(count=n * p)
+    try:
+        _pool.starmap(_matmul_rows, [(a_block.name, b_block.name, out_block.name, lo, hi, m, p, tile, threshold)
+                                     for lo, hi in _ranges(n)])
+        return _read(out_block, n * p)
+    finally:
+        _release(a_block, b_block, out_block)
+
+
+def elementwise(op, a, b):
+    """op applied to a and b (an equally long buffer or a scalar) as an array('d')."""
+    scalar = not isinstance(b, (array, list))
+    if scalar and type(b) not in (int, float):
+        return None
+    if _workers < 2 or len(a) < ELEMENTWISE_THRESHOLD or not _typed(a) or not (scalar or _typed(b)):
+        return None
+    if scalar and op is truediv and b == 0:
+        raise ZeroDivisionError("Cannot divide by zero.")
+    blocks = [_share(a), _share(count=len(a))]
+    if not scalar:
+        blocks.append(_share(b))
+    b_name = None if scalar else blocks[2].name
+    try:
+        _pool.starmap(_elementwise_range, [(op, blocks[0].name, b_name, b if scalar else None,
+                                            blocks[1].name, lo, hi) for lo, hi in _ranges(len(a))])
+        return _read(blocks[1], len(a))
+    finally:
+        _release(*blocks)
+
+
+def rref(values, rows, cols):
+    """
+    Gauss-Jordan elimination of a row-major array('d'), same pivoting as
+    Matrix.rref. The pivot search, swap and scaling run here; clearing the
+    pivot column from every other row is split across the workers.
+    """
+    if _workers < 2 or rows < 2 or rows * cols < RREF_THRESHOLD or not _typed(values):
+        return None
+    shm = _share(values)
+    try:
+        with shm.buf.cast('d') as data:
+            current_row = 0
+            for col in range(cols):
+                pivot_row = next((i for i in range(current_row, rows) if data[i * cols + col] != 0), None)
+                if pivot_row is None:
+                    continue
+                cur, piv = current_row * cols, pivot_row * cols
+                row = array('d', data[piv:piv + cols])
+                if pivot_row != current_row:
+                    data[piv:piv + cols] = array('d', data[cur:cur + cols])
+                data[cur:cur + cols] = array('d', map(truediv, row, repeat(row[col])))
+                _pool.starmap(_eliminate_rows, [(shm.name, cols, col, current_row, lo, hi)
+                                                for lo, hi in _ranges(rows)])
+                current_row += 1
+                if current_row == rows:
+                    break
+        return _read(shm, rows * cols)
+    finally:
+        _release(shm)
+
+
+@atexit.register
+def _shutdown():
+    if _pool is not None:
+        disable()
+
+
+# if __name__ == "__main__":
+#     from matrix import Matrix
+#     enable(2)
+#     A = Matrix([[float(i * j % 7) for j in range(300)] for i in range(300)])
+#     print((A * A).data[0][:5])
+#     print(Matrix.rank(A))
+#     disable()
@@ -0,0 +1,305 @@
+from array import array
+from operator import mul
+import math
+
+from matrix import Matrix
+from sparse import SparseMatrix
+
+
+class KrylovResult:
+    """Outcome of an iterative solve: x, whether tol was met, and ||b - Ax|| per iteration."""
+
+    def __init__(self, x, converged, iterations, residuals):
+        self.x = x
+        self.converged = converged
+        self.iterations = iterations
+        self.residuals = residuals
+
+    def __repr__(self):
+        return (f"KrylovResult(converged={self.converged}, iterations={self.iterations}, "
+                f"residual={self.residuals[-1] if self.residuals else None})")
+
+
+def _dot(x, y):
+    return sum(map(mul, x, y))
+
+
+def _norm(x):
+    return math.sqrt(_dot(x, x))
+
+
+def _axpy(alpha, x, y):
+    """alpha * x + y as a new list."""
+    return [alpha * a + b for a, b in zip(x, y)]
+
+
+def as_operator(A, n=None):
+    """
+    Return (matvec, n) for a dense Matrix, a SparseMatrix, anything with a
+    `matvec` method, or a plain callable x -> A x (which needs n).
+    """
+    if isinstance(A, Matrix):
+        rows, cols = A.dimension
+        if rows != cols:
+            raise ValueError("Matrix must be square.")
+        f = A.flat()
+        dense_rows = [f[i * cols:(i + 1) * cols] for i in range(rows)]
+        return (lambda x: [_dot(row, x) for row in dense_rows]), rows
+    if hasattr(A, "matvec"):
+        rows, cols = A.dimension
+        if rows != cols:
+            raise ValueError("Matrix must be square.")
+        return A.matvec, rows
+    if callable(A):
+        if n is None:
+            raise ValueError("The size of a callable operator must be given.")
+        return A, n
+    raise TypeError("Invalid operand type.")
+
+
+def _as_sparse(A):
+    if isinstance(A, SparseMatrix):
+        return A
+    if isinstance(A, Matrix):
+        return SparseMatrix.from_matrix(A)
+    raise ValueError("This preconditioner needs the matrix entries, not just a matvec.")
+
+
+def jacobi(A):
+    """Diagonal (Jacobi) preconditioner: r -> D^-1 r."""
+    s = _as_sparse(A)
+    inverse_diagonal = []
+    for i in range(s.dimension[0]):
+        cols, vals = s.row(i)
+        d = dict(zip(cols, vals)).get(i, 0)
+        if d == 0:
+            raise ValueError("Jacobi preconditioner needs a nonzero diagonal.")
+        inverse_diagonal.append(1 / d)
+    return lambda r: [d * x for d, x in zip(inverse_diagonal, r)]
+
+
+def ilu0(A):
+    """
+    Incomplete LU with zero fill: L and U keep exactly the sparsity pattern of
+    A, so storing them costs O(nnz). Returns r -> (LU)^-1 r.
+    """
+    s = _as_sparse(A)
+    n = s.dimension[0]
+    rows = [dict(zip(*s.row(i))) for i in range(n)]
+    for i in range(n):
+        row = rows[i]
+        for k in sorted(c for c in row if c < i):
+            if k not in rows[k] or rows[k][k] == 0:
+                raise ValueError("ILU(0) hit a zero pivot.")
+            row[k] /= rows[k][k]
+            factor = row[k]
+            for j, v in rows[k].items():
+                # Updates outside the pattern of row i are dropped (no fill).
+                if j > k and j in row:
+                    row[j] -= factor * v
+    lower = [sorted((c, v) for c, v in row.items() if c < i) for i, row in enumerate(rows)]
+    upper = [sorted((c, v) for c, v in row.items() if c > i) for i, row in enumerate(rows)]
+    diagonal = [row.get(i, 0) for i, row in enumerate(rows)]
+    if any(d == 0 for d in diagonal):
+        raise ValueError("ILU(0) hit a zero pivot.")
+
+    def apply(r):
+        y = list(r)
+        for i in range(n):
+            y[i] -= sum(v * y[c] for c, v in lower[i])
+        for i in range(n - 1, -1, -1):
+            y[i] = (y[i] - sum(v * y[c] for c, v in upper[i])) / diagonal[i]
+        return y
+    return apply
+
+
+def _preconditioner(A, M):
+    if M is None:
+        return lambda r: r
+    if M == "jacobi":
+        return jacobi(A)
+    if M == "ilu0":
+        return ilu0(A)
+    if callable(M):
+        return M
+    raise ValueError("Preconditioner must be None, 'jacobi', 'ilu0' or a callable.")
+
+
+def _setup(A, b, x0, preconditioner):
+    column = isinstance(b, Matrix)
+    b = [float(v) for v in (b.flat() if column else b)]
+    matvec, n = as_operator(A, len(b))
+    if n != len(b):
+        raise ValueError("Dimension mismatch for solve.")
+    x = [0.0] * n if x0 is None else [float(v) for v in (x0.flat() if isinstance(x0, Matrix) else x0)]
+    return matvec, b, x, _preconditioner(A, preconditioner), column
+
+
+def _result(x, column, converged, iterations, residuals):
+    x = array('d', x)
+    if column:
+        x = Matrix.from_flat(x, len(x), 1)
+    return KrylovResult(x, converged, iterations, residuals)
+
+
+def cg(A, b, x0=None, tol=1e-8, max_iter=None, preconditioner=None):
+    """
+    Preconditioned conjugate gradient for symmetric positive definite A.
+    Stops once ||b - Ax|| <= tol * ||b|| or after max_iter iterations.
+    """
+    matvec, b, x, M, column = _setup(A, b, x0, preconditioner)
+    max_iter = max_iter or 10 * len(b)
+    target = tol * (_norm(b) or 1.0)
+    r = [bi - ai for bi, ai in zip(b, matvec(x))]
+    residuals = [_norm(r)]
+    if residuals[-1] <= target:
+        return _result(x, column, True, 0, residuals)
+    z = M(r)
+    p = z
+    rz = _dot(r, z)
+    for k in range(1, max_iter + 1):
+        Ap = matvec(p)
+        pAp = _dot(p, Ap)
+        if rz == 0 or pAp == 0:
+            # Breakdown: A (or M) is singular or not positive definite.
+            return _result(x, column, False, k - 1, residuals)
+        alpha = rz / pAp
+        x = _axpy(alpha, p, x)
+        r = _axpy(-alpha, Ap, r)
+        residuals.append(_norm(r))
+        if residuals[-1] <= target:
+            return _result(x, column, True, k, residuals)
+        z = M(r)
+        rz, rz_old = _dot(r, z), rz
+        p = _axpy(rz / rz_old, p, z)
+    return _result(x, column, False, max_iter, residuals)
+
+
+def gmres(A, b, x0=None, tol=1e-8, max_iter=None, restart=30, preconditioner=None):
+    """
+    Restarted GMRES(restart) for general A, right-preconditioned so the
+    residual it minimizes is the true one. The Arnoldi basis uses modified
+    Gram-Schmidt and the small least-squares problem is kept triangular
+    with Givens rotations, which also gives the residual norm for free.
+    """
+    matvec, b, x, M, column = _setup(A, b, x0, preconditioner)
+    n = len(b)
+    max_iter = max_iter or 10 * n
+    restart = min(restart, n)
+    target = tol * (_norm(b) or 1.0)
+    r = [bi - ai for bi, ai in zip(b, matvec(x))]
+    residuals = [_norm(r)]
+    iterations = 0
+    while residuals[-1] > target and iterations < max_iter:
+        beta = _norm(r)
+        V = [[ri / beta for ri in r]]
+        H = []            # H[j] is column j of the Hessenberg matrix
+        cs, sn = [], []
+        g = [beta]
+        Z = []
+        for j in range(restart):
+            iterations += 1
+            z = M(V[j])
+            Z.append(z)
+            w = matvec(z)
+            h = []
+            for v in V:
+                hij = _dot(w, v)
+                w = _axpy(-hij, v, w)
+                h.append(hij)
+            h_next = _norm(w)
+            # Apply the previous rotations to the new column, then a new one
+            # that zeroes h_next.
+            for i in range(j):
+                h[i], h[i + 1] = cs[i] * h[i] + sn[i] * h[i + 1], -sn[i] * h[i] + cs[i] * h[i + 1]
+            denom = math.hypot(h[j], h_next)
+            c, s = (1.0, 0.0) if denom == 0 else (h[j] / denom, h_next / denom)
+            cs.append(c)
+            sn.append(s)
+            h[j] = c * h[j] + s * h_next
+            g.append(-s * g[j])
+            g[j] *= c
+            H.append(h)
+            residuals.append(abs(g[j + 1]))
+            if residuals[-1] <= target or h_next == 0 or iterations >= max_iter:
+                break
+            V.append([wi / h_next for wi in w])
+        # Back substitution for the coefficients y, then x += Z y.
+        m = len(H)
+        if any(H[i][i] == 0 for i in range(m)):
+            # Breakdown: the Krylov space holds no better iterate (A is singular).
+            residuals[-1] = _norm(r)
+            return _result(x, column, False, iterations, residuals)
+        y = [0.0] * m
+        for i in range(m - 1, -1, -1):
+            y[i] = (g[i] - sum(H[k][i] * y[k] for k in range(i + 1, m))) / H[i][i]
+        for yi, z in zip(y, Z):
+            x = _axpy(yi, z, x)
+        r = [bi - ai for bi, ai in zip(b, matvec(x))]
+        residuals[-1] = _norm(r)
+    return _result(x, column, residuals[-1] <= target, iterations, residuals)
+
+
+def bicgstab(A, b, x0=None, tol=1e-8, max_iter=None, preconditioner=None):
+    """BiCGSTAB (van der Vorst) for general A, right-preconditioned."""
+    matvec, b, x, M, column = _setup(A, b, x0, preconditioner)
+    n = len(b)
+    max_iter = max_iter or 10 * n
+    target = tol * (_norm(b) or 1.0)
+    r = [bi - ai for bi, ai in zip(b, matvec(x))]
+    r_hat = list(r)
+    residuals = [_norm(r)]
+    if residuals[-1] <= target:
+        return _result(x, column, True, 0, residuals)
+    rho = alpha = omega = 1.0
+    v = p = [0.0] * n
+    for k in range(1, max_iter + 1):
+        rho, rho_old = _dot(r_hat, r), rho
+        if rho == 0:
+            break
+        beta = (rho / rho_old) * (alpha / omega)
+        p = [ri + beta * (pi - omega * vi) for ri, pi, vi in zip(r, p, v)]
+        y = M(p)
+        v = matvec(y)
+        r_hat_v = _dot(r_hat, v)
+        if r_hat_v == 0:
+            break
+        alpha = rho / r_hat_v
+        s = _axpy(-alpha, v, r)
+        if _norm(s) <= target:
+            x = _axpy(alpha, y, x)
+            residuals.append(_norm(s))
+            return _result(x, column, True, k, residuals)
+        z = M(s)
+        t = matvec(z)
+        tt = _dot(t, t)
+        if tt == 0:
+            # A z = 0: keep the half step, whose residual is s, and stop.
+            x = _axpy(alpha, y, x)
+            residuals.append(_norm(s))
+            break
+        omega = _dot(t, s) / tt
+        x = [xi + alpha * yi + omega * zi for xi, yi, zi in zip(x, y, z)]
+        r = _axpy(-omega, t, s)
+        residuals.append(_norm(r))
+        if residuals[-1] <= target:
+            return _result(x, column, True, k, residuals)
+        if omega == 0:
+            break
+    return _result(x, column, False, k, residuals)
+
+
+# n = 100
+# from sparse import COOMatrix
+# builder = COOMatrix(n, n)
+# for i in range(n):
+#     builder.append(i, i, 4)
+#     if i > 0:
+#         builder.append(i, i - 1, -1)
+#     if i < n - 1:
+#         builder.append(i, i + 1, -1)
+# A = builder.tocsr()
+# b = [1.0] * n
+# print(cg(A, b, preconditioner="jacobi"))
+# print(gmres(A, b, preconditioner="ilu0"))
+# print(bicgstab(A, b))
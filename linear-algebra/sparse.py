@@ -0,0 +1,314 @@
+from array import array
+from collections import defaultdict
+from operator import mul
+import numbers
+
+from _storage import _is_double, _pack
+from matrix import Matrix
+
+
+class COOMatrix:
+    """
+    Coordinate (triplet) layout: cheap to build one entry at a time, e.g. when
+    assembling a finite-difference operator. Convert to CSR with `tocsr()`
+    before doing arithmetic.
+    """
+
+    def __init__(self, rows, cols):
+        self.shape = (rows, cols)
+        self.row_indices = []
+        self.col_indices = []
+        self.values = []
+
+    def append(self, i, j, value):
+        rows, cols = self.shape
+        if not (0 <= i < rows and 0 <= j < cols):
+            raise IndexError("Entry outside the matrix.")
+        self.row_indices.append(i)
+        self.col_indices.append(j)
+        self.values.append(value)
+
+    @property
+    def nnz(self):
+        return len(self.values)
+
+    def tocsr(self):
+        return SparseMatrix.from_coo(self.shape[0], self.shape[1], self.row_indices, self.col_indices, self.values)
+
+    def __repr__(self):
+        return f"COOMatrix(shape={self.shape}, nnz={self.nnz})"
+
+
+class SparseMatrix:
+    """
+    Compressed sparse row (CSR) matrix. Row i owns the entries
+    indices[indptr[i]:indptr[i + 1]] (column numbers, increasing) with the
+    matching values; only nonzeros are stored.
+    """
+    __slots__ = ("_shape", "indptr", "indices", "values")
+
+    def __init__(self, shape, indptr, indices, values):
+        rows, cols = shape
+        if len(indptr) != rows + 1 or len(indices) != len(values) or indptr[-1] != len(values):
+            raise ValueError("Invalid CSR structure.")
+        self._shape = (rows, cols)
+        self.indptr = array('q', indptr)
+        self.indices = array('q', indices)
+        self.values = values if isinstance(values, array) else _pack(values, all(map(_is_double, values)))
+
+    @staticmethod
+    def from_coo(rows, cols, row_indices, col_indices, values):
+        """Build CSR from triplets; duplicate entries are summed, zeros dropped."""
+        entries = defaultdict(int)
+        for i, j, v in zip(row_indices, col_indices, values):
+            if not (0 <= i < rows and 0 <= j < cols):
+                raise IndexError("Entry outside the matrix.")
+            entries[i, j] += v
+        return SparseMatrix._from_rows(rows, cols, SparseMatrix._group(entries, rows))
+
+    @staticmethod
+    def _group(entries, rows):
+        grouped = [{} for _ in range(rows)]
+        for (i, j), v in entries.items():
+            if v != 0:
+                grouped[i][j] = v
+        return grouped
+
+    @staticmethod
+    def _from_rows(rows, cols, row_dicts):
+        """Build CSR from one {column: value} dict per row."""
+        indptr, indices, values = [0], [], []
+        for row in row_dicts:
+            for j in sorted(row):
+                indices.append(j)
+                values.append(row[j])
+            indptr.append(len(indices))
+        return SparseMatrix((rows, cols), indptr, indices, values)
+
+    @staticmethod
+    def from_matrix(m, tol=0):
+        """Keep the entries of a dense Matrix whose magnitude exceeds tol."""
+        rows, cols = m.dimension
+        f = m.flat()
+        indptr, indices, values = [0], [], []
+        for i in range(rows):
+            for j, v in enumerate(f[i * cols:(i + 1) * cols]):
+                if abs(v) > tol:
+                    indices.append(j)
+                    values.append(v)
+            indptr.append(len(indices))
+        return SparseMatrix((rows, cols), indptr, indices, _pack(values, isinstance(f, array)))
+
+    def to_matrix(self):
+        rows, cols = self._shape
+        typed = isinstance(self.values, array)
+        out = array('d', bytes(8 * rows * cols)) if typed else [0] * (rows * cols)
+        for i in range(rows):
+            for k in range(self.indptr[i], self.indptr[i + 1]):
+                out[i * cols + self.indices[k]] = self.values[k]
+        return Matrix.from_flat(out, rows, cols)
+
+    def to_coo(self):
+        """Return (row_indices, col_indices, values) triplet lists."""
+        row_indices = [i for i in range(self._shape[0]) for _ in range(self.indptr[i], self.indptr[i + 1])]
+        return row_indices, list(self.indices), list(self.values)
+
+    @property
+    def dimension(self):
+        return self._shape
+
+    @property
+    def nnz(self):
+        return len(self.values)
+
+    def row(self, i):
+        """The (columns, values) slices of row i."""
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.values[start:end]
+
+    @staticmethod
+    def transpose(s):
+        """CSR of the transpose by a counting sort on column index, O(nnz + n)."""
+        rows, cols = s.dimension
+        counts = [0] * (cols + 1)
+        for j in s.indices:
+            counts[j + 1] += 1
+        for j in range(cols):
+            counts[j + 1] += counts[j]
+        indptr = counts[:]
+        indices = [0] * s.nnz
+        values = [0] * s.nnz
+        for i in range(rows):
+            for k in range(s.indptr[i], s.indptr[i + 1]):
+                dest = counts[s.indices[k]]
+                indices[dest] = i
+                values[dest] = s.values[k]
+                counts[s.indices[k]] += 1
+        return SparseMatrix((cols, rows), indptr, indices, _pack(values, isinstance(s.values, array)))
+
+    def matvec(self, x):
+        """y = A x for a flat sequence x, touching only the stored nonzeros."""
+        rows, cols = self._shape
+        if len(x) != cols:
+            raise ValueError("Dimension mismatch for multiplication.")
+        indptr, indices, values = self.indptr, self.indices, self.values
+        get = x.__getitem__
+        y = [sum(map(mul, values[indptr[i]:indptr[i + 1]], map(get, indices[indptr[i]:indptr[i + 1]])))
+             for i in range(rows)]
+        return _pack(y, isinstance(values, array) and isinstance(x, array))
+
+    @staticmethod
+    def scalar_multiply(s, scalar):
+        """Every stored entry times scalar; entries that come out zero are dropped."""
+        values = [v * scalar for v in s.values]
+        if all(values):
+            return SparseMatrix(s.dimension, s.indptr, s.indices, values)
+        indptr, indices, kept = [0], [], []
+        for i in range(s.dimension[0]):
+            for k in range(s.indptr[i], s.indptr[i + 1]):
+                if values[k] != 0:
+                    indices.append(s.indices[k])
+                    kept.append(values[k])
+            indptr.append(len(indices))
+        return SparseMatrix(s.dimension, indptr, indices, kept)
+
+    def _row_dicts(self):
+        return [dict(zip(*self.row(i))) for i in range(self._shape[0])]
+
+    def __add__(self, other):
+        if not isinstance(other, (SparseMatrix, Matrix)):
+            return NotImplemented
+        if self.dimension != other.dimension:
+            raise ValueError("Dimension mismatch.")
+        if isinstance(other, Matrix):
+            return self.to_matrix() + other
+        rows = self._row_dicts()
+        for i, row in enumerate(rows):
+            for j, v in zip(*other.row(i)):
+                total = row.get(j, 0) + v
+                if total != 0:
+                    row[j] = total
+                else:
+                    row.pop(j, None)
+        return SparseMatrix._from_rows(*self._shape, rows)
+
+    def __radd__(self, other):
+        # Only reached for Matrix + SparseMatrix; addition commutes.
+        return self.__add__(other)
+
+    def __mul__(self, other):
+        if isinstance(other, numbers.Number):
+            return SparseMatrix.scalar_multiply(self, other)
+        if not isinstance(other, (SparseMatrix, Matrix)):
+            return NotImplemented
+        r1, c1 = self.dimension
+        r2, c2 = other.dimension
+        if c1 != r2:
+            raise ValueError("Dimension mismatch for multiplication.")
+        if isinstance(other, SparseMatrix):
+            # Gustavson's row-by-row product: row i of the result accumulates
+            # value * (row k of B) for every stored A[i, k].
+            result = []
+            for i in range(r1):
+                acc = {}
+                for k, v in zip(*self.row(i)):
+                    for j, w in zip(*other.row(k)):
+                        acc[j] = acc.get(j, 0) + v * w
+                result.append({j: v for j, v in acc.items() if v != 0})
+            return SparseMatrix._from_rows(r1, c2, result)
+        if isinstance(other, Matrix):
+            b = other.flat()
+            if c2 == 1:
+                return Matrix.from_flat(self.matvec(b), r1, 1)
+            out = [0] * (r1 * c2)
+            for i in range(r1):
+                acc = out[i * c2:(i + 1) * c2]
+                for k, v in zip(*self.row(i)):
+                    acc = [a + v * x for a, x in zip(acc, b[k * c2:(k + 1) * c2])]
+                out[i * c2:(i + 1) * c2] = acc
+            return Matrix.from_flat(out, r1, c2)
+
+    def __rmul__(self, other):
+        if isinstance(other, numbers.Number):
+            return SparseMatrix.scalar_multiply(self, other)
+        if isinstance(other, Matrix):
+            # D * S == (S^T * D^T)^T, and S^T is cheap to form in CSR.
+            return Matrix.transpose(SparseMatrix.transpose(self) * Matrix.transpose(other))
+        return NotImplemented
+
+    def _eliminate(self, reduced, tol):
+        """
+        Gaussian elimination on per-row dicts. Among the rows that could
+        pivot on a column, the one with the fewest nonzeros is chosen
+        (Markowitz's rule) so that fill-in stays small; `col_rows` tracks
+        which rows touch each column and is updated whenever fill-in
+        creates a new nonzero. Returns (rows, pivot row order).
+        """
+        rows = self._row_dicts()
+        col_rows = defaultdict(set)
+        for i, row in enumerate(rows):
+            for j in row:
+                col_rows[j].add(i)
+        remaining = set(range(len(rows)))
+        pivots = []
+        for col in range(self._shape[1]):
+            candidates = [r for r in col_rows[col] if r in remaining and abs(rows[r][col]) > tol]
+            if not candidates:
+                continue
+            p = min(candidates, key=lambda r: (len(rows[r]), -abs(rows[r][col])))
+            remaining.discard(p)
+            pivots.append(p)
+            pivot_row = rows[p]
+            if reduced:
+                pivot_value = pivot_row[col]
+                pivot_row = rows[p] = {j: v / pivot_value for j, v in pivot_row.items()}
+                targets = col_rows[col] - {p}
+            else:
+                targets = [r for r in col_rows[col] if r in remaining]
+            pivot_value = pivot_row[col]
+            for r in list(targets):
+                row = rows[r]
+                factor = row[col] / pivot_value
+                for j, v in pivot_row.items():
+                    value = row.get(j, 0) - factor * v
+                    if j == col or abs(value) <= tol:
+                        row.pop(j, None)
+                        col_rows[j].discard(r)
+                    else:
+                        if j not in row:
+                            col_rows[j].add(r)
+                        row[j] = value
+        return rows, pivots
+
+    @staticmethod
+    def rref(s, tol=1e-14):
+        """Reduced row echelon form, kept sparse."""
+        rows, pivots = s._eliminate(True, tol)
+        ordered = [rows[p] for p in pivots] + [{} for _ in range(s.dimension[0] - len(pivots))]
+        return SparseMatrix._from_rows(*s.dimension, ordered)
+
+    @staticmethod
+    def rank(s, tol=1e-14):
+        # Forward elimination is enough to count pivots and creates less fill.
+        return len(s._eliminate(False, tol)[1])
+
+    def __repr__(self):
+        return f"SparseMatrix(shape={self._shape}, nnz={self.nnz})"
+
+    def __str__(self):
+        return str(self.to_matrix())
+
+
+# n = 5
+# laplacian = COOMatrix(n, n)
+# for i in range(n):
+#     laplacian.append(i, i, 2)
+#     if i > 0:
+#         laplacian.append(i, i - 1, -1)
+#     if i < n - 1:
+#         laplacian.append(i, i + 1, -1)
+# L = laplacian.tocsr()
+# print(L)
+# print(L * Matrix([[1] for _ in range(n)]))
+# print(SparseMatrix.rank(L))
+# print(SparseMatrix.rref(SparseMatrix.from_matrix(Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]]))))
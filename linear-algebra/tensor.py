@@ -1,43 +1,330 @@
+from array import array
+from itertools import repeat
+from operator import add, mul, sub, truediv
+import math
+
+import matmul as _matmul
+from _storage import _is_double, _pack
+from matmul import matmul
+
+# The parallel module once parallel.enable() has been called; taken
+# from matmul so a backend enabled before this import is kept.
+_parallel = _matmul._parallel
+
+
+def contiguous_strides(shape):
+    """Row-major strides (in elements) for a tensor of the given shape."""
+    strides = []
+    step = 1
+    for dim in reversed(shape):
+        strides.append(step)
+        step *= dim
+    return tuple(reversed(strides))
+
+
+def broadcast_shapes(*shapes):
+    """
+    Common shape under NumPy broadcasting: shapes are aligned on the right and
+    each axis must either agree or be 1 in all but one of them.
+    """
+    ndim = max(len(shape) for shape in shapes)
+    result = []
+    for axis in range(ndim):
+        dims = {shape[axis - ndim + len(shape)] for shape in shapes if axis - ndim + len(shape) >= 0}
+        dims.discard(1)
+        if len(dims) > 1:
+            raise ValueError(f"Shapes {', '.join(map(str, shapes))} cannot be broadcast together.")
+        result.append(dims.pop() if dims else 1)
+    return tuple(result)
+
 
 class Tensor:
+    """
+    N-dimensional tensor stored in one flat buffer together with a shape,
+    strides and an offset. reshape (of contiguous data), transpose,
+    slicing, expand_dims and broadcast_to only rewrite the strides and
+    return views that share the buffer.
+    """
+    __slots__ = ("_buf", "_offset", "_shape", "_strides")
+
     def __init__(self, data):
-        self.data = data
-        self.shape = self.compute_shape(data)
+        shape = Tensor.compute_shape(data)
+        flat = list(Tensor._flatten(data, shape))
+        self._buf = _pack(flat, all(map(_is_double, flat)))
+        self._offset = 0
+        self._shape = tuple(shape)
+        self._strides = contiguous_strides(shape)
 
     @staticmethod
     def compute_shape(data):
         """Recursively compute the shape of the tensor."""
         if isinstance(data, list):
-            return [len(data)] + Tensor.compute_shape(data[0]) if data else []
+            return [len(data)] + (Tensor.compute_shape(data[0]) if data else [])
         return []
 
+    @staticmethod
+    def _flatten(data, shape):
+        if not shape:
+            yield data
+            return
+        if not isinstance(data, list) or len(data) != shape[0]:
+            raise ValueError("Tensor data must be a regular (non-ragged) nested list.")
+        for item in data:
+            yield from Tensor._flatten(item, shape[1:])
+
+    @staticmethod
+    def _view(buf, offset, shape, strides):
+        t = Tensor.__new__(Tensor)
+        t._buf = buf
+        t._offset = offset
+        t._shape = tuple(shape)
+        t._strides = tuple(strides)
+        return t
+
+    @staticmethod
+    def from_flat(values, shape):
+        """Wrap row-major values (an array('d') is shared, not copied) in a tensor."""
+        shape = tuple(shape)
+        if len(values) != math.prod(shape):
+            raise ValueError("Size mismatch for tensor shape.")
+        if not isinstance(values, array):
+            values = list(values)
+            values = _pack(values, all(map(_is_double, values)))
+        return Tensor._view(values, 0, shape, contiguous_strides(shape))
+
+    @property
+    def shape(self):
+        return list(self._shape)
+
+    @property
+    def strides(self):
+        return self._strides
+
+    @property
+    def ndim(self):
+        return len(self._shape)
+
+    @property
+    def size(self):
+        return math.prod(self._shape)
+
+    @property
+    def data(self):
+        """Nested-list copy of the contents."""
+        return self.tolist()
+
+    def is_contiguous(self):
+        expected = contiguous_strides(self._shape)
+        return all(s == e for dim, s, e in zip(self._shape, self._strides, expected) if dim > 1)
+
+    def _offsets(self):
+        """Buffer offsets of every element, in row-major logical order."""
+        offsets = [self._offset]
+        for dim, stride in zip(self._shape, self._strides):
+            steps = range(0, dim * stride, stride) if stride else [0] * dim
+            offsets = [o + s for o in offsets for s in steps]
+        return offsets
+
+    def _values(self):
+        """Iterate the elements in row-major order without materializing a copy."""
+        if self.is_contiguous():
+            return iter(self._buf[self._offset:self._offset + self.size])
+        return map(self._buf.__getitem__, self._offsets())
+
+    def flat(self):
+        """
+        Row-major contents as one buffer. Shares storage when the tensor is
+        already contiguous, so treat the result as read-only. A memory-mapped
+        tensor (npy.load with mmap=True) is copied into an array('d') here.
+        """
+        size = self.size
+        if self.is_contiguous():
+            if isinstance(self._buf, memoryview):
+                return array('d', self._buf[self._offset:self._offset + size].tobytes())
+            if self._offset == 0 and len(self._buf) == size:
+                return self._buf
+            return self._buf[self._offset:self._offset + size]
+        return _pack(self._values(), isinstance(self._buf, (array, memoryview)))
+
+    def copy(self):
+        return Tensor._view(self.flat()[:], 0, self._shape, contiguous_strides(self._shape))
+
+    def tolist(self):
+        flat = list(self.flat())
+        if not self._shape:
+            return flat[0]
+        return Tensor.build_reshaped(flat, list(self._shape))
+
+    def __getitem__(self, index):
+        """Integer, slice, None (new axis) and Ellipsis indexing; slices give views."""
+        if not isinstance(index, tuple):
+            index = (index,)
+        if any(item is Ellipsis for item in index):
+            position = next(i for i, item in enumerate(index) if item is Ellipsis)
+            used = sum(1 for item in index if item is not None and item is not Ellipsis)
+            index = index[:position] + (slice(None),) * (self.ndim - used) + index[position + 1:]
+        offset, shape, strides, axis = self._offset, [], [], 0
+        for item in index:
+            if item is None:
+                shape.append(1)
+                strides.append(0)
+                continue
+            if axis >= self.ndim:
+                raise IndexError("Too many indices for tensor.")
+            dim, stride = self._shape[axis], self._strides[axis]
+            if isinstance(item, slice):
+                start, stop, step = item.indices(dim)
+                offset += start * stride
+                shape.append(len(range(start, stop, step)))
+                strides.append(stride * step)
+            else:
+                i = item + dim if item < 0 else item
+                if not 0 <= i < dim:
+                    raise IndexError("Index out of range.")
+                offset += i * stride
+            axis += 1
+        shape.extend(self._shape[axis:])
+        strides.extend(self._strides[axis:])
+        if not shape:
+            return self._buf[offset]
+        return Tensor._view(self._buf, offset, shape, strides)
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, tuple):
+            index = (index,)
+        if len(index) != self.ndim or not all(isinstance(i, int) for i in index):
+            raise IndexError("Assignment needs one integer index per axis.")
+        offset = self._offset
+        for i, dim, stride in zip(index, self._shape, self._strides):
+            i = i + dim if i < 0 else i
+            if not 0 <= i < dim:
+                raise IndexError("Index out of range.")
+            offset += i * stride
+        self._buf[offset] = value
+
+    def reshape(self, new_shape):
+        """Reshape a tensor while preserving its data (a view when contiguous)."""
+        new_shape = [new_shape] if isinstance(new_shape, int) else list(new_shape)
+        if new_shape.count(-1) > 1:
+            raise ValueError("Only one dimension can be inferred.")
+        if -1 in new_shape:
+            known = math.prod(d for d in new_shape if d != -1)
+            if known == 0 or self.size % known:
+                raise ValueError("Cannot reshape tensor due to size mismatch.")
+            new_shape[new_shape.index(-1)] = self.size // known
+        if math.prod(new_shape) != self.size:
+            raise ValueError("Cannot reshape tensor due to size mismatch.")
+        if self.is_contiguous():
+            return Tensor._view(self._buf, self._offset, new_shape, contiguous_strides(new_shape))
+        return Tensor._view(self.flat(), 0, new_shape, contiguous_strides(new_shape))
+
+    def transpose(self, *axes):
+        """Permute the axes (reversed by default); returns a view."""
+        if len(axes) == 1 and isinstance(axes[0], (list, tuple)):
+            axes = axes[0]
+        if not axes:
+            axes = range(self.ndim - 1, -1, -1)
+        axes = [a + self.ndim if a < 0 else a for a in axes]
+        if sorted(axes) != list(range(self.ndim)):
+            raise ValueError("Axes must be a permutation of the tensor's dimensions.")
+        return Tensor._view(self._buf, self._offset,
+                            [self._shape[a] for a in axes], [self._strides[a] for a in axes])
+
+    def expand_dims(self, axis):
+        """Insert a new axis of length 1 at position `axis`; returns a view."""
+        if axis < 0:
+            axis += self.ndim + 1
+        if not 0 <= axis <= self.ndim:
+            raise ValueError("Axis out of range.")
+        return Tensor._view(self._buf, self._offset,
+                            self._shape[:axis] + (1,) + self._shape[axis:],
+                            self._strides[:axis] + (0,) + self._strides[axis:])
+
+    def broadcast_to(self, shape):
+        """View with the given shape, repeating length-1 axes through stride 0."""
+        shape = tuple(shape)
+        lead = len(shape) - self.ndim
+        if lead < 0:
+            raise ValueError("Cannot broadcast to fewer dimensions.")
+        strides = [0] * lead
+        for dim, target, stride in zip(self._shape, shape[lead:], self._strides):
+            if dim == target:
+                strides.append(stride)
+            elif dim == 1:
+                strides.append(0)
+            else:
+                raise ValueError(f"Cannot broadcast shape {self._shape} to {shape}.")
+        return Tensor._view(self._buf, self._offset, shape, strides)
+
+    def diagonal(self, axis1=0, axis2=1):
+        """
+        View of the entries whose indices agree on axis1 and axis2: both axes
+        are removed and the diagonal becomes the last axis (stride = the sum
+        of the two strides).
+        """
+        axis1, axis2 = sorted(a + self.ndim if a < 0 else a for a in (axis1, axis2))
+        if axis1 == axis2:
+            raise ValueError("Diagonal needs two different axes.")
+        if self._shape[axis1] != self._shape[axis2]:
+            raise ValueError("Diagonal axes must have the same length.")
+        keep = [a for a in range(self.ndim) if a not in (axis1, axis2)]
+        return Tensor._view(self._buf, self._offset,
+                            [self._shape[a] for a in keep] + [self._shape[axis1]],
+                            [self._strides[a] for a in keep] + [self._strides[axis1] + self._strides[axis2]])
+
+    def sum(self, axes=None):
+        """Sum over the given axes (all of them by default)."""
+        if axes is None:
+            return self.contract()
+        if isinstance(axes, int):
+            axes = [axes]
+        axes = sorted({a + self.ndim if a < 0 else a for a in axes})
+        keep = [a for a in range(self.ndim) if a not in axes]
+        if not keep:
+            return self.contract()
+        # Move the summed axes last so each output entry is a contiguous run.
+        flat = self.transpose(keep + axes).flat()
+        run = math.prod(self._shape[a] for a in axes)
+        values = [sum(flat[i:i + run]) for i in range(0, len(flat), run)] if run else \
+            [0] * math.prod(self._shape[a] for a in keep)
+        return Tensor.from_flat(_pack(values, isinstance(flat, array)), [self._shape[a] for a in keep])
+
+    def _elementwise(self, other, op):
+        """Apply op elementwise, broadcasting tensor operands against each other."""
+        if _parallel is not None and (not isinstance(other, Tensor) or other._shape == self._shape):
+            values = _parallel.elementwise(op, self.flat(), other.flat() if isinstance(other, Tensor) else other)
+            if values is not None:
+                return Tensor._view(values, 0, self._shape, contiguous_strides(self._shape))
+        if isinstance(other, Tensor):
+            shape = broadcast_shapes(self._shape, other._shape)
+            values = map(op, self.broadcast_to(shape)._values(), other.broadcast_to(shape)._values())
+            typed = isinstance(self._buf, (array, memoryview)) and isinstance(other._buf, (array, memoryview))
+        else:
+            shape = self._shape
+            values = map(op, self._values(), repeat(other))
+            typed = isinstance(self._buf, (array, memoryview)) and _is_double(other)
+        return Tensor._view(_pack(values, typed), 0, shape, contiguous_strides(shape))
+
     def __add__(self, other):
-        """Element-wise addition of two tensors."""
-        if self.shape != other.shape:
-            raise ValueError("Tensors must have the same shape for addition.")
-        return Tensor([
-            [self.data[i][j] + other.data[i][j] for j in range(len(self.data[0]))]
-            for i in range(len(self.data))
-        ])
+        """Element-wise addition, with broadcasting."""
+        return self._elementwise(other, add)
 
     def __sub__(self, other):
-        """Element-wise subtraction of two tensors."""
-        if self.shape != other.shape:
-            raise ValueError("Tensors must have the same shape for subtraction.")
-        return Tensor([
-            [self.data[i][j] - other.data[i][j] for j in range(len(self.data[0]))]
-            for i in range(len(self.data))
-        ])
-
-    def __mul__(self, scalar):
-        """Element-wise scalar multiplication."""
-        return Tensor([[x * scalar for x in row] for row in self.data])
-
-    def __truediv__(self, scalar):
-        """Element-wise scalar division."""
-        if scalar == 0:
+        """Element-wise subtraction, with broadcasting."""
+        return self._elementwise(other, sub)
+
+    def __mul__(self, other):
+        """Element-wise multiplication by a scalar or a (broadcast) tensor."""
+        return self._elementwise(other, mul)
+
+    def __truediv__(self, other):
+        """Element-wise division by a scalar or a (broadcast) tensor."""
+        if not isinstance(other, Tensor) and other == 0:
             raise ZeroDivisionError("Cannot divide by zero.")
-        return Tensor([[x / scalar for x in row] for row in self.data])
+        return self._elementwise(other, truediv)
+
+    __radd__ = __add__
+    __rmul__ = __mul__
 
     def dot(self, other):
         """Dot product for 2D tensors (matrix multiplication)."""
@@ -45,33 +332,13 @@ class Tensor:
             raise ValueError("Dot product is only defined for 2D tensors.")
         if self.shape[1] != other.shape[0]:
             raise ValueError("Inner dimensions must match for dot product.")
-        return Tensor([
-            [sum(self.data[i][k] * other.data[k][j] for k in range(self.shape[1]))
-             for j in range(other.shape[1])]
-            for i in range(self.shape[0])
-        ])
-
-    def transpose(self):
-        """Transpose a 2D tensor."""
-        if len(self.shape) != 2:
-            raise ValueError("Transpose is only defined for 2D tensors.")
-        return Tensor([[self.data[j][i] for j in range(self.shape[0])] for i in range(self.shape[1])])
+        n, m = self._shape
+        p = other._shape[1]
+        return Tensor._view(matmul(self.flat(), other.flat(), n, m, p), 0, (n, p), (p, 1))
 
     def contract(self):
         """Sum all elements of the tensor."""
-        def recursive_sum(data):
-            if isinstance(data, list):
-                return sum(recursive_sum(d) for d in data)
-            return data
-        return recursive_sum(self.data)
-
-    def reshape(self, new_shape):
-        """Reshape a tensor while preserving its data."""
-        if self.contract() != sum(sum(row) for row in self.data):  # Shape mismatch check
-            raise ValueError("Cannot reshape tensor due to size mismatch.")
-        flat_data = [x for row in self.data for x in row]
-        reshaped_data = Tensor.build_reshaped(flat_data, new_shape)
-        return Tensor(reshaped_data)
+        return sum(self._values())
 
     @staticmethod
     def build_reshaped(flat_data, shape):
@@ -79,12 +346,12 @@ class Tensor:
         if len(shape) == 1:
             return flat_data[:shape[0]]
         sub_shape = shape[1:]
-        step = int(len(flat_data) / shape[0])
+        step = int(len(flat_data) / shape[0]) if shape[0] else 0
         return [Tensor.build_reshaped(flat_data[i * step:(i + 1) * step], sub_shape)
                 for i in range(shape[0])]
 
     def __repr__(self):
-        return f"Tensor({self.data})"
+        return f"Tensor({self.tolist()})"
 
 
 # T1 = Tensor([[1, 2], [3, 4]])
@@ -102,3 +369,8 @@ class Tensor:
 # T4 = Tensor([[1, 2, 3, 4]])
 # print("Reshape T4 to 2x2:")
 # print(T4.reshape([2, 2]))
+
+# T5 = Tensor([[[1, 2, 3], [4, 5, 6]]])
+# print(T5.transpose(2, 0, 1))
+# print(T5[0, :, 1:])
+# print(T5 + Tensor([10, 20, 30]))
@@ -1,99 +1,217 @@
-
 from matrix import Matrix
+from array import array
+from itertools import chain
+from operator import mul, truediv
 import math
 
 
 class Transform:
+    """
+    A homogeneous transform. Transforms built by the factory methods are
+    kept in affine form -- a d x d linear block plus a translation vector --
+    which composes, inverts and applies without touching a full
+    homogeneous Matrix. A Transform created from an arbitrary Matrix uses
+    the matrix directly (and the affine form too, if its bottom row is
+    (0, ..., 0, 1)).
+    """
+
     def __init__(self, matrix):
         if not isinstance(matrix, Matrix):
             raise ValueError("Transform must be initialized with a Matrix.")
-        self.matrix = matrix
+        self._matrix = matrix
+        self._affine = None
+        # True when the linear block is known to be orthogonal (a rotation),
+        # so its inverse is its transpose.
+        self.orthogonal = False
+        n = matrix.dimension[0]
+        if matrix.dimension == (n, n) and list(matrix.row(n - 1)) == [0] * (n - 1) + [1]:
+            rows = matrix.tolist()
+            self._affine = ([row[:-1] for row in rows[:-1]], [row[-1] for row in rows[:-1]])
+
+    @staticmethod
+    def affine(linear, translation, orthogonal=False):
+        """Build a transform x -> linear x + translation from its parts."""
+        t = Transform.__new__(Transform)
+        t._matrix = None
+        t._affine = ([list(row) for row in linear], list(translation))
+        t.orthogonal = orthogonal
+        return t
+
+    @property
+    def matrix(self):
+        """The homogeneous matrix, built on first use for affine transforms."""
+        if self._matrix is None:
+            linear, translation = self._affine
+            d = len(translation)
+            self._matrix = Matrix([row + [t] for row, t in zip(linear, translation)] + [[0] * d + [1]])
+        return self._matrix
 
     @staticmethod
     def scaling_2d(sx, sy):
-        return Transform(Matrix([
-            [sx, 0, 0],
-            [0, sy, 0],
-            [0, 0, 1]
-        ]))
+        return Transform.affine([[sx, 0], [0, sy]], [0, 0])
 
     @staticmethod
     def scaling_3d(sx, sy, sz):
-        return Transform(Matrix([
-            [sx, 0, 0, 0],
-            [0, sy, 0, 0],
-            [0, 0, sz, 0],
-            [0, 0, 0, 1]
-        ]))
+        return Transform.affine([[sx, 0, 0], [0, sy, 0], [0, 0, sz]], [0, 0, 0])
 
     @staticmethod
     def rotation_2d(theta):
-        return Transform(Matrix([
-            [math.cos(theta), -math.sin(theta), 0],
-            [math.sin(theta), math.cos(theta), 0],
-            [0, 0, 1]
-        ]))
+        c, s = math.cos(theta), math.sin(theta)
+        return Transform.affine([[c, -s], [s, c]], [0, 0], orthogonal=True)
 
     @staticmethod
     def rotation_3d(axis, theta):
+        c, s = math.cos(theta), math.sin(theta)
         if axis == 'x':
-            return Transform(Matrix([
-                [1, 0, 0, 0],
-                [0, math.cos(theta), -math.sin(theta), 0],
-                [0, math.sin(theta), math.cos(theta), 0],
-                [0, 0, 0, 1]
-            ]))
+            linear = [[1, 0, 0], [0, c, -s], [0, s, c]]
         elif axis == 'y':
-            return Transform(Matrix([
-                [math.cos(theta), 0, math.sin(theta), 0],
-                [0, 1, 0, 0],
-                [-math.sin(theta), 0, math.cos(theta), 0],
-                [0, 0, 0, 1]
-            ]))
+            linear = [[c, 0, s], [0, 1, 0], [-s, 0, c]]
         elif axis == 'z':
-            return Transform(Matrix([
-                [math.cos(theta), -math.sin(theta), 0, 0],
-                [math.sin(theta), math.cos(theta), 0, 0],
-                [0, 0, 1, 0],
-                [0, 0, 0, 1]
-            ]))
+            linear = [[c, -s, 0], [s, c, 0], [0, 0, 1]]
         else:
             raise ValueError("Invalid axis. Choose from 'x', 'y', or 'z'.")
+        return Transform.affine(linear, [0, 0, 0], orthogonal=True)
 
     @staticmethod
     def translation_2d(tx, ty):
-        return Transform(Matrix([
-            [1, 0, tx],
-            [0, 1, ty],
-            [0, 0, 1]
-        ]))
+        return Transform.affine([[1, 0], [0, 1]], [tx, ty], orthogonal=True)
 
     @staticmethod
     def translation_3d(tx, ty, tz):
-        return Transform(Matrix([
-            [1, 0, 0, tx],
-            [0, 1, 0, ty],
-            [0, 0, 1, tz],
-            [0, 0, 0, 1]
-        ]))
+        return Transform.affine([[1, 0, 0], [0, 1, 0], [0, 0, 1]], [tx, ty, tz], orthogonal=True)
 
     def compose(self, other):
         if not isinstance(other, Transform):
             raise ValueError("Can only compose with another Transform.")
+        if self._affine is not None and other._affine is not None \
+                and len(self._affine[1]) == len(other._affine[1]):
+            # (L1, t1) o (L2, t2) = (L1 L2, L1 t2 + t1): a d x d product, no homogeneous row.
+            l1, t1 = self._affine
+            l2, t2 = other._affine
+            columns = list(zip(*l2))
+            linear = [[sum(map(mul, row, col)) for col in columns] for row in l1]
+            translation = [sum(map(mul, row, t2)) + t for row, t in zip(l1, t1)]
+            return Transform.affine(linear, translation, self.orthogonal and other.orthogonal)
         return Transform(self.matrix * other.matrix)
 
+    @staticmethod
+    def chain(*transforms):
+        """Collapse t1, t2, ..., tk into the single transform t1 o t2 o ... o tk."""
+        if not transforms:
+            raise ValueError("Need at least one Transform to chain.")
+        result = transforms[0]
+        for t in transforms[1:]:
+            result = result.compose(t)
+        return result
+
     def inverse(self):
-        return Transform(Matrix.inverse(self.matrix))
+        if self._affine is None:
+            return Transform(Matrix.inverse(self.matrix))
+        linear, translation = self._affine
+        d = len(translation)
+        if self.orthogonal:
+            inverse_linear = [list(col) for col in zip(*linear)]
+        elif d == 2:
+            (a, b), (c, e) = linear
+            det = a * e - b * c
+            if det == 0:
+                raise ValueError("Matrix is singular and cannot be inverted.")
+            inverse_linear = [[e / det, -b / det], [-c / det, a / det]]
+        elif d == 3:
+            # Adjugate over determinant, written out for the 3 x 3 block.
+            (a, b, c), (e, f, g), (h, i, j) = linear
+            cofactors = [[f * j - g * i, c * i - b * j, b * g - c * f],
+                         [g * h - e * j, a * j - c * h, c * e - a * g],
+                         [e * i - f * h, b * h - a * i, a * f - b * e]]
+            det = a * cofactors[0][0] + b * cofactors[1][0] + c * cofactors[2][0]
+            if det == 0:
+                raise ValueError("Matrix is singular and cannot be inverted.")
+            inverse_linear = [[x / det for x in row] for row in cofactors]
+        else:
+            inverse_linear = Matrix.inverse(Matrix(linear)).tolist()
+        # x = L^-1 (y - t)  =>  translation of the inverse is -L^-1 t.
+        inverse_translation = [-sum(map(mul, row, translation)) for row in inverse_linear]
+        return Transform.affine(inverse_linear, inverse_translation, self.orthogonal)
+
+    @property
+    def dimension(self):
+        """Size of the homogeneous matrix (one more than the point dimension)."""
+        if self._affine is not None:
+            return len(self._affine[1]) + 1
+        return self._matrix.dimension[0]
 
     def apply(self, point):
         """Apply the transform to a point (2D or 3D)."""
-        if len(point) + 1 != self.matrix.dimension[0]:
+        if len(point) + 1 != self.dimension:
             raise ValueError("Point dimensionality does not match transform.")
+        if self._affine is not None:
+            linear, translation = self._affine
+            return [sum(map(mul, row, point)) + t for row, t in zip(linear, translation)]
         # Convert point to homogeneous coordinates
-        homogeneous_point = Matrix([point + [1]])
+        homogeneous_point = Matrix([list(point) + [1]])
         transformed_point = self.matrix * Matrix.transpose(homogeneous_point)
         # Convert back to Cartesian coordinates
-        return [x / transformed_point.data[-1][0] for x in transformed_point.data[:-1][0]]
+        *coords, w = transformed_point.col(0)
+        return [x / w for x in coords]
+
+    def is_affine(self):
+        """True when the bottom row is (0, ..., 0, 1), so no perspective divide is needed."""
+        return self._affine is not None
+
+    def apply_many(self, points, out=None):
+        """
+        Transform a whole batch of points in one pass.
+
+        `points` is either a flat buffer of coordinates (x0, y0, x1, y1, ...)
+        or a sequence of points. The result is written into `out` (a flat
+        array('d'), allocated if not given), which is also returned.
+        """
+        n = self.dimension
+        d = n - 1
+        if not isinstance(points, array):
+            points = list(points)
+            if points and not isinstance(points[0], (int, float)):
+                points = chain.from_iterable(points)
+            points = array('d', points)
+        if len(points) % d != 0:
+            raise ValueError("Point dimensionality does not match transform.")
+        if out is None:
+            out = array('d', bytes(8 * len(points)))
+        elif len(out) != len(points):
+            raise ValueError("Output buffer has the wrong size.")
+        affine = self.is_affine()
+        if affine:
+            rows = [row + [t] for row, t in zip(*self._affine)]
+        else:
+            m = self.matrix.flat()
+            rows = [m[i * n:(i + 1) * n] for i in range(n)]
+        coords = [points[j::d] for j in range(d)]
+        # Each output coordinate is one affine combination of the input coordinates.
+        if d == 2:
+            xs, ys = coords
+            result = [[a * x + b * y + c for x, y in zip(xs, ys)] for a, b, c in rows]
+        elif d == 3:
+            xs, ys, zs = coords
+            result = [[a * x + b * y + c * z + t for x, y, z in zip(xs, ys, zs)] for a, b, c, t in rows]
+        else:
+            result = [[sum(map(mul, row[:d], p)) + row[d] for p in zip(*coords)] for row in rows]
+        if affine:
+            for j in range(d):
+                out[j::d] = array('d', result[j])
+        else:
+            w = result[d]
+            for j in range(d):
+                out[j::d] = array('d', map(truediv, result[j], w))
+        return out
+
+    def apply_stream(self, chunks):
+        """
+        Lazily transform an iterable of point chunks (each accepted by
+        apply_many), so point clouds larger than memory can be processed
+        one chunk at a time.
+        """
+        for chunk in chunks:
+            yield self.apply_many(chunk)
 
     def __repr__(self):
         return f"Transform({repr(self.matrix)})"
@@ -121,6 +239,10 @@ class Transform:
 # point_3d = [1, 2, 3]
 # print("3D Point after Transformation:")
 # print(combined.apply(point_3d))
+# print(combined.apply_many([[1, 2, 3], [4, 5, 6]]))
 
 # print("Inverse of Combined Transform:")
 # print(combined.inverse())
+
+# chained = Transform.chain(translation, rotation, Transform.scaling_3d(2, 2, 2))
+# print(chained.apply_many([[1, 2, 3], [4, 5, 6]]))
@@ -1,5 +1,10 @@
 
-from matrix import Matrix
+from array import array
+from itertools import repeat
+from operator import add, mul, sub
+import math
+
+from matrix import Matrix, StridedView
 
 class Vector:
     def __init__(self, data):
@@ -72,15 +77,172 @@ class Vector:
     def __str__(self):
         return f"({', '.join(map(str, self.data))})"
 
+class VectorBatch:
+    """
+    k real vectors of dimension n stored back to back in one array('d'),
+    vector i at [i * n, (i + 1) * n). The batched kernels walk the buffer
+    through memoryview windows, so they build no Vector objects.
+    """
+    __slots__ = ("_buf", "_count", "_n")
+
+    def __init__(self, vectors):
+        vectors = [v.data if isinstance(v, Vector) else v for v in vectors]
+        if not vectors or not vectors[0]:
+            raise ValueError("VectorBatch needs at least one non-empty vector.")
+        n = len(vectors[0])
+        if any(len(v) != n for v in vectors):
+            raise ValueError("Dimension mismatch.")
+        self._buf = array('d', [x for v in vectors for x in v])
+        self._count = len(vectors)
+        self._n = n
+
+    @staticmethod
+    def from_flat(values, count, n):
+        """Wrap row-major values (an array('d') is used as is)."""
+        if len(values) != count * n:
+            raise ValueError("Size mismatch for batch shape.")
+        batch = VectorBatch.__new__(VectorBatch)
+        batch._buf = values if isinstance(values, array) else array('d', values)
+        batch._count = count
+        batch._n = n
+        return batch
+
+    @property
+    def dimension(self):
+        return self._count, self._n
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        """Vector i as a zero-copy view; writes go to the batch."""
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("Vector index out of range.")
+        return StridedView(self._buf, i * self._n, self._n, 1)
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+    def flat(self):
+        return self._buf
+
+    def to_vectors(self):
+        return [Vector(list(v)) for v in self]
+
+    def as_matrix(self):
+        """The batch as a count x n Matrix sharing this buffer (one vector per row)."""
+        return Matrix.from_flat(self._buf, self._count, self._n)
+
+    def _rows(self, other):
+        """Per-row windows onto other: another batch of the same shape, or one vector repeated."""
+        n = self._n
+        if isinstance(other, VectorBatch):
+            if other.dimension != self.dimension:
+                raise ValueError("Dimension mismatch.")
+            view = memoryview(other._buf)
+            return [view[i * n:(i + 1) * n] for i in range(self._count)]
+        other = other.data if isinstance(other, Vector) else other
+        if len(other) != n:
+            raise ValueError("Dimension mismatch.")
+        return [other] * self._count
+
+    def dot(self, other):
+        """Row-wise dot products with another batch or with a single vector."""
+        n, view = self._n, memoryview(self._buf)
+        rows = self._rows(other)
+        return array('d', (sum(map(mul, view[i * n:(i + 1) * n], rows[i])) for i in range(self._count)))
+
+    def norm(self):
+        return array('d', map(math.sqrt, self.dot(self)))
+
+    def axpy(self, alpha, x):
+        """In place: vector i += alpha_i * x_i (alpha a scalar or one per vector)."""
+        n, buf = self._n, self._buf
+        rows = self._rows(x)
+        alphas = repeat(alpha) if isinstance(alpha, (int, float)) else alpha
+        for i, a in zip(range(self._count), alphas):
+            if a:
+                s = i * n
+                buf[s:s + n] = array('d', map(add, buf[s:s + n], map(mul, rows[i], repeat(a))))
+        return self
+
+    def cross(self, other):
+        """Row-wise cross products of 3-D vectors, as a new batch."""
+        if self._n != 3:
+            raise ValueError("Cross product only defined for 3D vectors.")
+        b = self._buf
+        if isinstance(other, VectorBatch):
+            if other.dimension != self.dimension:
+                raise ValueError("Dimension mismatch.")
+            o = other._buf
+            x2, y2, z2 = o[0::3], o[1::3], o[2::3]
+        else:
+            other = other.data if isinstance(other, Vector) else other
+            if len(other) != 3:
+                raise ValueError("Dimension mismatch.")
+            x2, y2, z2 = (array('d', [c]) * self._count for c in other)
+        x1, y1, z1 = b[0::3], b[1::3], b[2::3]
+        out = array('d', bytes(len(b) * 8))
+        out[0::3] = array('d', map(sub, map(mul, y1, z2), map(mul, z1, y2)))
+        out[1::3] = array('d', map(sub, map(mul, z1, x2), map(mul, x1, z2)))
+        out[2::3] = array('d', map(sub, map(mul, x1, y2), map(mul, y1, x2)))
+        return VectorBatch.from_flat(out, self._count, 3)
+
+    def orthonormalize(self, reorthogonalize=True, tol=1e-12):
+        """
+        Modified Gram-Schmidt: each vector is orthogonalized
+        against the already accepted ones, one projection at a time, then
+        normalized. With reorthogonalize, a vector whose norm fell below
+        1/sqrt(2) of its size before the pass (heavy cancellation) gets a
+        second pass, which restores orthogonality to working precision
+        ("twice is enough"). Vectors that shrink below tol times their
+        original norm are linearly dependent on earlier ones and are
+        dropped, so the batch may get shorter. Returns self.
+
+        The work happens in the batch's own buffer: each vector is copied
+        into one scratch row, projected there against memoryview windows
+        onto the accepted rows, and written back normalized over the next
+        free row. If vectors were dropped, the shortened batch is then
+        copied into a new buffer, since matrices from as_matrix() may still
+        share the old one and rely on its length.
+        """
+        n, buf = self._n, self._buf
+        view = memoryview(buf)
+        scratch = array('d', bytes(8 * n))
+        row = memoryview(scratch)
+        kept = 0
+        for i in range(self._count):
+            row[:] = view[i * n:(i + 1) * n]
+            original = before = math.sqrt(sum(map(mul, scratch, scratch)))
+            for _ in range(2 if reorthogonalize else 1):
+                for k in range(kept):
+                    q = view[k * n:(k + 1) * n]
+                    r = sum(map(mul, q, scratch))
+                    row[:] = array('d', map(sub, scratch, map(mul, q, repeat(r))))
+                norm = math.sqrt(sum(map(mul, scratch, scratch)))
+                # Another pass can only shrink v, so a dependent vector is final.
+                if norm > before * 0.7071067811865476 or norm <= tol * original:
+                    break
+                before = norm
+            if norm == 0 or norm <= tol * original:
+                continue
+            view[kept * n:(kept + 1) * n] = array('d', map(mul, scratch, repeat(1 / norm)))
+            kept += 1
+        view.release()
+        if kept < self._count:
+            self._buf = buf[:kept * n]
+            self._count = kept
+        return self
+
+    def __repr__(self):
+        return f"VectorBatch({[list(v) for v in self]})"
+
+
 def gram_schmidt(vectors):
-    """Perform Gram-Schmidt orthogonalization on a list of Vectors."""
-    orthogonal = []
-    for v in vectors:
-        for u in orthogonal:
-            proj = u * (v.dot(u) / u.dot(u))  # Properly use Vector operations
-            v = v - proj  # Subtract projection
-        orthogonal.append(v)
-    return orthogonal
+    """Orthonormal basis for the span of a list of Vectors (modified Gram-Schmidt)."""
+    return VectorBatch(vectors).orthonormalize().to_vectors()
 
 
 v1 = Vector([1, 2, 3])
@@ -101,7 +263,7 @@ print("Projection of v1 onto v2:", v1.projection_onto(v2))
 
 v1 = Vector([1, 2, 3])
 v2 = Vector([4, 5, 6])
-orthonormal_basis = gram_schmidt([v1.as_matrix(), v2.as_matrix()])
+orthonormal_basis = gram_schmidt([v1, v2])
 print("Orthonormal Basis:")
 for vec in orthonormal_basis:
     print(vec)
\ No newline at end of file